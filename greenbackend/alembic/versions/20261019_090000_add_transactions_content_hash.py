@@ -0,0 +1,27 @@
+"""add content_hash to transactions
+
+Revision ID: 20261019_090000
+Revises: 20250920_025900
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_090000'
+down_revision: str | None = '20250920_025900'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,136 @@
+"""partition transactions by month (PostgreSQL only)
+
+Revision ID: 20261019_100000
+Revises: 20261019_090000
+Create Date: 2026-10-19 10:00:00.000000
+
+Converts `transactions` into a RANGE (date) partitioned table with one partition per
+month plus a DEFAULT partition. PostgreSQL requires the partition key in every unique
+constraint, so the primary key becomes (id, date) and the external_id constraint becomes
+(external_id, date); the app still resolves rows by external_id before writing. The
+receipt_items -> transactions foreign key cannot target a partitioned table without the
+date column, so its ON DELETE CASCADE is replaced by a row trigger.
+
+On SQLite (the default dev setup) this migration does nothing.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_100000'
+down_revision: str | None = '20261019_090000'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+_INDEXES = {
+    # name: columns
+    'ix_transactions_user_date': 'user_id, date',
+    'ix_transactions_user_id': 'user_id',
+    'ix_transactions_plaid_item_id': 'plaid_item_id',
+    'ix_transactions_date': 'date',
+}
+
+
+def _add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def _month_partitions(bind, first: date, last: date) -> None:
+    cur = date(first.year, first.month, 1)
+    while cur <= last:
+        nxt = _add_months(cur, 1)
+        name = f"transactions_{cur:%Y_%m}"
+        bind.execute(sa.text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{cur.isoformat()}') TO ('{nxt.isoformat()}')"
+        ))
+        cur = nxt
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Free the names used by the new parent table
+    op.execute("ALTER TABLE receipt_items DROP CONSTRAINT IF EXISTS receipt_items_transaction_id_fkey")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute("ALTER TABLE transactions_unpartitioned RENAME CONSTRAINT uq_transactions_external_id TO uq_transactions_unpartitioned_external_id")
+    for name in _INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_old")
+
+    op.execute(
+        "CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (date)"
+    )
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT transactions_pkey_part PRIMARY KEY (id, date)")
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT uq_transactions_external_id UNIQUE (external_id, date)")
+    op.execute("ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE")
+    op.execute("ALTER TABLE transactions ADD FOREIGN KEY (plaid_item_id) REFERENCES plaid_items(id) ON DELETE SET NULL")
+    for name, cols in _INDEXES.items():
+        op.execute(f"CREATE INDEX {name} ON transactions ({cols})")
+    # Keep the id sequence alive once the old table is dropped
+    op.execute("ALTER SEQUENCE IF EXISTS transactions_id_seq OWNED BY transactions.id")
+
+    bounds = bind.execute(sa.text("SELECT MIN(date), MAX(date) FROM transactions_unpartitioned")).one()
+    today = date.today()
+    first = bounds[0] or today
+    last = max(bounds[1] or today, _add_months(today, MONTHS_AHEAD))
+    _month_partitions(bind, first, last)
+    op.execute("CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT")
+
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_unpartitioned")
+    op.execute("DROP TABLE transactions_unpartitioned")
+
+    # ON DELETE CASCADE replacement for receipt_items
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION receipt_items_cascade_delete() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM receipt_items WHERE transaction_id = OLD.id;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER trg_transactions_receipt_items_cascade AFTER DELETE ON transactions "
+        "FOR EACH ROW EXECUTE FUNCTION receipt_items_cascade_delete()"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS trg_transactions_receipt_items_cascade ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS receipt_items_cascade_delete()")
+
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    for name in _INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_part")
+    op.execute("ALTER TABLE transactions_partitioned RENAME CONSTRAINT uq_transactions_external_id TO uq_transactions_partitioned_external_id")
+
+    op.execute("CREATE TABLE transactions (LIKE transactions_partitioned INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE transactions ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE transactions ADD CONSTRAINT uq_transactions_external_id UNIQUE (external_id)")
+    op.execute("ALTER TABLE transactions ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE")
+    op.execute("ALTER TABLE transactions ADD FOREIGN KEY (plaid_item_id) REFERENCES plaid_items(id) ON DELETE SET NULL")
+    for name, cols in _INDEXES.items():
+        if name != 'ix_transactions_date':
+            op.execute(f"CREATE INDEX {name} ON transactions ({cols})")
+    op.execute("ALTER SEQUENCE IF EXISTS transactions_id_seq OWNED BY transactions.id")
+    op.execute("INSERT INTO transactions SELECT * FROM transactions_partitioned")
+    op.execute("DROP TABLE transactions_partitioned CASCADE")
+    op.execute(
+        "ALTER TABLE receipt_items ADD CONSTRAINT receipt_items_transaction_id_fkey "
+        "FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE"
+    )
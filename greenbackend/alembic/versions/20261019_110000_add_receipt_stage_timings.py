@@ -0,0 +1,73 @@
+"""add receipt_stage_timings table
+
+Revision ID: 20261019_110000
+Revises: 20261019_100000
+Create Date: 2026-10-19 11:00:00.000000
+
+Per-stage timings of receipt uploads. When `transactions` is partitioned (PostgreSQL),
+the foreign key is replaced by the same delete trigger used for receipt_items.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_110000'
+down_revision: str | None = '20261019_100000'
+branch_labels = None
+depends_on = None
+
+_CASCADE_FN = """
+CREATE OR REPLACE FUNCTION receipt_items_cascade_delete() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM receipt_items WHERE transaction_id = OLD.id;{extra}
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _partitioned(bind) -> bool:
+    if bind.dialect.name != 'postgresql':
+        return False
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('transactions')"
+    )).first() is not None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    partitioned = _partitioned(bind)
+    tx_fk = [] if partitioned else [sa.ForeignKey('transactions.id', ondelete='CASCADE')]
+    op.create_table(
+        'receipt_stage_timings',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('transaction_id', sa.Integer(), *tx_fk, nullable=False),
+        sa.Column('trace_id', sa.String(length=32), nullable=False),
+        sa.Column('stage', sa.String(length=64), nullable=False),
+        sa.Column('calls', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('duration_ms', sa.Float(), nullable=False),
+        sa.Column('error', sa.String(length=512), nullable=True),
+        sa.Column('input_bytes', sa.Integer(), nullable=True),
+        sa.Column('image_width', sa.Integer(), nullable=True),
+        sa.Column('image_height', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_receipt_stage_timings_transaction_id', 'receipt_stage_timings', ['transaction_id'])
+    op.create_index('ix_receipt_stage_timings_trace_id', 'receipt_stage_timings', ['trace_id'])
+    op.create_index('ix_receipt_stage_timings_stage_duration', 'receipt_stage_timings', ['stage', 'duration_ms'])
+    if partitioned:
+        op.execute(_CASCADE_FN.format(
+            extra="\n    DELETE FROM receipt_stage_timings WHERE transaction_id = OLD.id;"
+        ))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if _partitioned(bind):
+        op.execute(_CASCADE_FN.format(extra=""))
+    op.drop_index('ix_receipt_stage_timings_stage_duration', table_name='receipt_stage_timings')
+    op.drop_index('ix_receipt_stage_timings_trace_id', table_name='receipt_stage_timings')
+    op.drop_index('ix_receipt_stage_timings_transaction_id', table_name='receipt_stage_timings')
+    op.drop_table('receipt_stage_timings')
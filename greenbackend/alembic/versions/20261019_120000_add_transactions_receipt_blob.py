@@ -0,0 +1,31 @@
+"""add receipt blob reference to transactions
+
+Revision ID: 20261019_120000
+Revises: 20261019_110000
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_120000'
+down_revision: str | None = '20261019_110000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('receipt_sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('receipt_content_type', sa.String(length=128), nullable=True))
+        batch_op.create_index('ix_transactions_receipt_sha256', ['receipt_sha256'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_index('ix_transactions_receipt_sha256')
+        batch_op.drop_column('receipt_content_type')
+        batch_op.drop_column('receipt_sha256')
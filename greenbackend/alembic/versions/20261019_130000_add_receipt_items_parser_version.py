@@ -0,0 +1,27 @@
+"""add parser_version to receipt_items
+
+Revision ID: 20261019_130000
+Revises: 20261019_120000
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_130000'
+down_revision: str | None = '20261019_120000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('receipt_items') as batch_op:
+        batch_op.add_column(sa.Column('parser_version', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('receipt_items') as batch_op:
+        batch_op.drop_column('parser_version')
@@ -0,0 +1,38 @@
+"""add merchant_profiles table
+
+Revision ID: 20261019_140000
+Revises: 20261019_130000
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_140000'
+down_revision: str | None = '20261019_130000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'merchant_profiles',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('merchant_key', sa.String(length=255), nullable=False),
+        sa.Column('categories_key', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('rules_version', sa.String(length=16), nullable=False),
+        sa.Column('is_mixed', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('kg_co2e_per_usd', sa.Float(), nullable=False),
+        sa.Column('sector_hints', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('merchant_key', 'categories_key', name='uq_merchant_profiles_key'),
+    )
+    op.create_index('ix_merchant_profiles_rules_version', 'merchant_profiles', ['rules_version'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_merchant_profiles_rules_version', table_name='merchant_profiles')
+    op.drop_table('merchant_profiles')
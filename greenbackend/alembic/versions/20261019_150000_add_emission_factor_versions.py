@@ -0,0 +1,41 @@
+"""add emission_factor_versions table and factor_key columns
+
+Revision ID: 20261019_150000
+Revises: 20261019_140000
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_150000'
+down_revision: str | None = '20261019_140000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'emission_factor_versions',
+        sa.Column('id', sa.Integer(), primary_key=True, nullable=False),
+        sa.Column('factors', sa.JSON(), nullable=False),
+        sa.Column('note', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('factor_key', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_transactions_factor_key', ['factor_key'])
+    with op.batch_alter_table('merchant_profiles') as batch_op:
+        batch_op.add_column(sa.Column('factor_key', sa.String(length=64), nullable=False, server_default='default'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('merchant_profiles') as batch_op:
+        batch_op.drop_column('factor_key')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_index('ix_transactions_factor_key')
+        batch_op.drop_column('factor_key')
+    op.drop_table('emission_factor_versions')
@@ -0,0 +1,125 @@
+"""guard partitioned transactions: partition moves and external_id uniqueness
+
+Revision ID: 20261019_160000
+Revises: 20261019_150000
+Create Date: 2026-10-19 16:00:00.000000
+
+Two fixes for the partitioned layout from 20261019_100000 (PostgreSQL only):
+
+- An UPDATE that changes `date` across months runs as DELETE + INSERT, so the
+  AFTER DELETE cascade trigger removed the row's receipt items and stage timings.
+  The trigger now skips rows whose id still exists after the statement.
+- The unique constraint has to include the partition key, so it only covers
+  (external_id, date). Global uniqueness moves to `transaction_external_ids`
+  (external_id primary key -> transaction id), kept up to date by triggers. A
+  duplicate external_id fails with the same unique_violation as before.
+
+On SQLite (the default dev setup) this migration does nothing.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_160000'
+down_revision: str | None = '20261019_150000'
+branch_labels = None
+depends_on = None
+
+_CASCADE_FN = """
+CREATE OR REPLACE FUNCTION receipt_items_cascade_delete() RETURNS trigger AS $$
+BEGIN{guard}
+    DELETE FROM receipt_items WHERE transaction_id = OLD.id;
+    DELETE FROM receipt_stage_timings WHERE transaction_id = OLD.id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+_MOVED_GUARD = """
+    -- A cross-partition UPDATE deletes and re-inserts the row under the same id.
+    -- AFTER triggers run once the statement is done, so a moved row is visible here.
+    IF EXISTS (SELECT 1 FROM transactions WHERE id = OLD.id) THEN
+        RETURN OLD;
+    END IF;
+    DELETE FROM transaction_external_ids WHERE external_id = OLD.external_id AND transaction_id = OLD.id;"""
+
+# ON CONFLICT waits for a concurrent writer of the same key, like a unique index would,
+# and needs no subtransaction per row (bulk COPY goes through this trigger too)
+_EXTERNAL_ID_FN = """
+CREATE OR REPLACE FUNCTION transactions_external_id_unique() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.external_id = OLD.external_id THEN
+            RETURN NEW;
+        END IF;
+        DELETE FROM transaction_external_ids WHERE external_id = OLD.external_id AND transaction_id = OLD.id;
+    END IF;
+    INSERT INTO transaction_external_ids (external_id, transaction_id) VALUES (NEW.external_id, NEW.id)
+        ON CONFLICT (external_id) DO NOTHING;
+    -- A cross-partition UPDATE fires this as an INSERT on the destination partition;
+    -- the key then already belongs to the same id
+    IF NOT FOUND AND NOT EXISTS (
+        SELECT 1 FROM transaction_external_ids WHERE external_id = NEW.external_id AND transaction_id = NEW.id
+    ) THEN
+        RAISE EXCEPTION USING
+            ERRCODE = 'unique_violation',
+            CONSTRAINT = 'uq_transactions_external_id',
+            MESSAGE = format('duplicate key value violates unique constraint "uq_transactions_external_id": external_id %L already exists', NEW.external_id);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _partitioned(bind) -> bool:
+    if bind.dialect.name != 'postgresql':
+        return False
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('transactions')"
+    )).first() is not None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not _partitioned(bind):
+        return
+
+    op.create_table(
+        'transaction_external_ids',
+        sa.Column('external_id', sa.String(length=128), primary_key=True, nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+    )
+    # Earliest row wins where the (external_id, date) constraint already let duplicates in
+    op.execute(
+        "INSERT INTO transaction_external_ids (external_id, transaction_id) "
+        "SELECT DISTINCT ON (external_id) external_id, id FROM transactions ORDER BY external_id, id"
+    )
+    duplicates = bind.execute(sa.text(
+        "SELECT count(*) FROM transactions t "
+        "WHERE NOT EXISTS (SELECT 1 FROM transaction_external_ids e WHERE e.transaction_id = t.id)"
+    )).scalar()
+    if duplicates:
+        print(f"[migration] {duplicates} transactions repeat an earlier external_id; they are kept, "
+              f"but their external_id can't be changed until the duplicates are removed")
+
+    op.execute(_CASCADE_FN.format(guard=_MOVED_GUARD))
+    op.execute(_EXTERNAL_ID_FN)
+    # Row triggers on a partitioned table are cloned to every current and future partition
+    op.execute(
+        "CREATE TRIGGER trg_transactions_external_id_unique BEFORE INSERT OR UPDATE OF external_id "
+        "ON transactions FOR EACH ROW EXECUTE FUNCTION transactions_external_id_unique()"
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not _partitioned(bind):
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS trg_transactions_external_id_unique ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS transactions_external_id_unique()")
+    op.execute(_CASCADE_FN.format(guard=""))
+    op.drop_table('transaction_external_ids')
@@ -0,0 +1,27 @@
+"""add receipt_parser_version to transactions
+
+Revision ID: 20261019_170000
+Revises: 20261019_160000
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_170000'
+down_revision: str | None = '20261019_160000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('receipt_parser_version', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('receipt_parser_version')
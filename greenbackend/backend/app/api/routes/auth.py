@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from pydantic import BaseModel, EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ...db.session import get_db
+from ...db.session import get_db, get_async_db
 from ...models.user import User
-from ...core.security import authenticate, create_access_token, decode_access_token
+from ...core.security import authenticate_async, create_access_token, decode_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -23,8 +24,8 @@ class LoginResponse(BaseModel):
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate(db, payload.email, payload.password)
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_async(db, payload.email, payload.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     token = create_access_token({"id": user.id, "email": user.email, "name": user.full_name or ""})
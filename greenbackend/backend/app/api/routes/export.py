@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ...models.user import User
+from ...services.export import FORMATS, TABLES, available_formats, stream_export
+from .transactions import get_current_user
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+@router.get("/{table}")
+def export_table(
+    table: str,
+    format: str = Query("parquet", description="parquet | arrow | csv (gzip)"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream the caller's rows of a table (optionally filtered by date) as one file.
+
+    receipt_items are filtered through their parent transaction's user and date.
+    Exports across users go through export_data.py.
+    """
+    if table not in TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table. Choose from: {', '.join(TABLES)}")
+    if format not in available_formats():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format '{format}' is not available. Choose from: {', '.join(available_formats())}",
+        )
+    ext, media_type = FORMATS[format]
+    return StreamingResponse(
+        stream_export(table, format, user_id=current_user.id, start_date=start_date, end_date=end_date),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{ext}"'},
+    )
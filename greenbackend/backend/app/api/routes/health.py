@@ -4,7 +4,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from ...core.config import get_settings, AppInfo
-from ...db.session import get_db
+from ...core.security import password_hash_stats
+from ...db.session import get_db, pool_stats
+from ...db.replicas import replica_stats
 
 router = APIRouter()
 
@@ -20,9 +22,22 @@ async def health(db: Session = Depends(get_db)):
     return {
         "status": "ok",
         "db_ok": db_ok,
+        "password_hashing": password_hash_stats(),
         "app": AppInfo(
             name=settings.app_name,
             environment=settings.environment,
             version="0.1.0",
         ).model_dump(),
     }
+
+
+@router.get("/health/db_pool")
+async def db_pool():
+    """Connection pool usage, to help size DB_POOL_SIZE / DB_MAX_OVERFLOW."""
+    return pool_stats()
+
+
+@router.get("/health/replicas")
+def replicas():
+    """Configured read replicas with their last measured lag and pool usage."""
+    return replica_stats()
@@ -1,20 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Request
 
-from ...db.session import get_db
-from ...services.plaid_service import sync_by_item_id
+from ...services.webhook_queue import sync_queue
 
 router = APIRouter(prefix="/plaid", tags=["plaid-webhook"])
 
 
 @router.post("/webhook")
-async def plaid_webhook(request: Request, db: Session = Depends(get_db)):
+async def plaid_webhook(request: Request):
     """Minimal Plaid webhook handler.
 
-    Expects a JSON body with at least `item_id`. For Plaid Transactions webhooks,
-    this will trigger a sync for that item. Returns a simple status.
+    Expects a JSON body with at least `item_id`. The webhook is acknowledged immediately
+    and a sync for that item is queued; bursts for the same item collapse into one sync.
     """
     payload = await request.json()
     item_id = payload.get("item_id")
@@ -22,9 +20,11 @@ async def plaid_webhook(request: Request, db: Session = Depends(get_db)):
         # Return 200 to avoid Plaid retry storms, but note missing item
         return {"received": True, "action": "ignored", "reason": "missing item_id"}
 
-    try:
-        upserted = sync_by_item_id(db, item_id)
-        return {"received": True, "action": "synced", "item_id": item_id, "transactions_upserted": upserted}
-    except Exception as e:
-        # Don't fail the webhook; log-like response
-        return {"received": True, "action": "error", "item_id": item_id, "error": str(e)}
+    action = sync_queue.enqueue(item_id)
+    return {"received": True, "action": action, "item_id": item_id, "webhook_code": payload.get("webhook_code")}
+
+
+@router.get("/webhook/stats")
+async def plaid_webhook_stats():
+    """Queue depth and counters for webhook-triggered syncs."""
+    return sync_queue.stats()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from ...core.config import get_settings
+from ...core.profiling import get_store
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+_MEDIA_TYPES = {"html": "text/html", "prof": "application/octet-stream"}
+
+
+def require_profiling_token(x_profile_token: str | None = Header(default=None)) -> None:
+    token = get_settings().profiling_token
+    if not token:
+        # Admin endpoints are only exposed when a token is configured
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_profile_token or not hmac.compare_digest(x_profile_token, token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("", response_model=list[dict], dependencies=[Depends(require_profiling_token)])
+def list_profiles():
+    """Stored request profiles, newest first."""
+    return get_store().list()
+
+
+@router.get("/{profile_id}", dependencies=[Depends(require_profiling_token)])
+def download_profile(profile_id: str):
+    """Download one profile: pyinstrument HTML, or a cProfile .prof for pstats/snakeviz."""
+    found = get_store().get(profile_id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path, meta = found
+    ext = meta["file"].rsplit(".", 1)[-1]
+    return FileResponse(path, media_type=_MEDIA_TYPES.get(ext, "application/octet-stream"), filename=meta["file"])
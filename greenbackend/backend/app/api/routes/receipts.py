@@ -2,27 +2,40 @@ from __future__ import annotations
 
 from typing import List, Optional
 import inspect
+import logging
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query, status
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ...db.session import get_db
+from ...db.session import get_db, get_async_db
+from ...db.replicas import get_read_db
 from ...models.plaid import Transaction
-from ...models.receipt import ReceiptItem
+from ...models.receipt import ReceiptItem, ReceiptStageTiming
 from ...models.user import User
+from ...core import tracing
+from ...core.config import get_settings
 from ...core.security import decode_access_token
 from ...services.integrations.ocr_google_vision import (
     parse_receipt,
     parse_receipt_diagnostics,
     extract_text,
     get_local_ocr_text,
+    PARSER_VERSION,
 )
 from ...services.integrations.cerebras_client import parse_items_with_cerebras
 from ...services.integrations.climatiq_client import estimate_item_footprint
+from ...services.blob_store import BlobNotFound, blob_key, get_blob_store
+from ...services.receipt_pipeline import score_items
+from ...services.receipt_image import PreparedReceipt, ReceiptTooLarge, prepare_upload
 from ...services.eco_scoring import score_from_co2e_per_dollar, compute_cashback
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/receipts", tags=["receipts"])
 
 
@@ -51,16 +64,104 @@ async def upload_receipt(
     transaction_id: int = Form(..., gt=0),
     file: UploadFile = File(...),
     debug_raw_text: bool = Form(False),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    tx: Transaction | None = db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == current_user.id).first()
+    tx: Transaction | None = (
+        await db.execute(select(Transaction).where(Transaction.id == transaction_id, Transaction.user_id == current_user.id))
+    ).scalars().first()
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found for user")
 
-    # Read file bytes
-    content = await file.read()
-    items, ocr_flow = await parse_receipt_diagnostics(content)
+    if not get_settings().receipt_tracing_enabled:
+        prepared = await _prepare(db, tx, file)
+        resp = await _process_receipt(db, tx, prepared.data, debug_raw_text)
+        await db.commit()
+        return resp
+
+    transaction_id = tx.id  # a rollback expires `tx`
+    prepared: PreparedReceipt | None = None
+    resp = None
+    try:
+        with tracing.start_trace("receipt.upload", transaction_id=transaction_id, content_type=file.content_type) as root:
+            prepared = await _prepare(db, tx, file)
+            root.set("input_bytes", prepared.original_bytes)
+            root.set("image_width", prepared.original_width)
+            root.set("image_height", prepared.original_height)
+            resp = await _process_receipt(db, tx, prepared.data, debug_raw_text)
+    finally:
+        # Failed uploads are the ones worth diagnosing, so their timings are kept too
+        timings = await _store_stage_timings(db, transaction_id, root, prepared, failed=resp is None)
+    resp["trace_id"] = root.trace.trace_id
+    resp["timings_ms"] = timings
+    return resp
+
+
+async def _prepare(db: AsyncSession, tx: Transaction, file: UploadFile) -> PreparedReceipt:
+    """Spool the upload under the size cap, store the original and shrink images to OCR resolution.
+
+    The blob reference is committed before parsing, so receipts that fail to parse
+    can still be reprocessed later (reparse_receipts.py --retry-failed). Items parsed
+    from a different receipt are deleted in the same commit, so a failed parse never
+    leaves the old receipt's items behind the new image.
+    """
+    try:
+        prepared = await prepare_upload(file)
+    except ReceiptTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if prepared.blob is not None:
+        if tx.receipt_sha256 != prepared.sha256:
+            await db.execute(delete(ReceiptItem).where(ReceiptItem.transaction_id == tx.id).execution_options(synchronize_session=False))
+        tx.receipt_sha256 = prepared.sha256
+        tx.receipt_content_type = file.content_type
+        tx.receipt_parser_version = PARSER_VERSION  # parsed right below
+        await db.commit()
+    return prepared
+
+
+async def _store_stage_timings(
+    db: AsyncSession, transaction_id: int, root: tracing.Span, prepared: PreparedReceipt | None, failed: bool
+) -> dict:
+    """Persist one row per stage (plus "total") and return {stage: ms}.
+
+    After a successful upload the rows are committed together with the receipt items.
+    After a failure the pending writes are rolled back first, and an error while
+    storing is logged rather than raised over the original one.
+    """
+    stages = root.trace.stages()
+    stages["total"] = stages.pop(root.name)
+    input_bytes = prepared.original_bytes if prepared else None
+    width, height = (prepared.original_width, prepared.original_height) if prepared and prepared.original_width else (None, None)
+    rows = [
+        ReceiptStageTiming(
+            transaction_id=transaction_id,
+            trace_id=root.trace.trace_id,
+            stage=name,
+            calls=agg["calls"],
+            duration_ms=round(agg["duration_ms"], 3),
+            error=agg["error"],
+            input_bytes=agg["attributes"].get("input_bytes", input_bytes),
+            image_width=width,
+            image_height=height,
+        )
+        for name, agg in stages.items()
+    ]
+    if not failed:
+        db.add_all(rows)
+        await db.commit()
+        return {r.stage: r.duration_ms for r in rows}
+    try:
+        await db.rollback()
+        db.add_all(rows)
+        await db.commit()
+    except Exception:
+        logger.exception("Could not store stage timings for transaction %s", transaction_id)
+    return {r.stage: r.duration_ms for r in rows}
+
+
+async def _process_receipt(db: AsyncSession, tx: Transaction, content: bytes, debug_raw_text: bool) -> dict:
+    with tracing.span("receipt.parse", input_bytes=len(content)):
+        items, ocr_flow = await parse_receipt_diagnostics(content)
     raw_text = ""
     ocr_diagnostics = {}
     if debug_raw_text:
@@ -69,58 +170,23 @@ async def upload_receipt(
         raise HTTPException(status_code=400, detail="Could not parse receipt")
 
     # Clear any previous items if reprocessing
-    db.query(ReceiptItem).filter(ReceiptItem.transaction_id == tx.id).delete(synchronize_session=False)
-
-    total_price = Decimal("0")
-    weighted_score_sum = Decimal("0")
+    with tracing.span("db.clear_items"):
+        await db.execute(delete(ReceiptItem).where(ReceiptItem.transaction_id == tx.id).execution_options(synchronize_session=False))
 
-    for it in items:
-        name = it.get("name") or "Unknown"
-        price = it.get("price")
-        qty = it.get("qty")
-        # Estimate footprint (new signature may return a tuple)
-        est = estimate_item_footprint(name, price, qty)
-        res = await est if inspect.isawaitable(est) else est
-        if isinstance(res, tuple) and len(res) == 3:
-            kg, climatiq_source, climatiq_factor_id = res
-        else:
-            kg, climatiq_source, climatiq_factor_id = res, "fallback", None
-        # Compute item score using kgCO2e per dollar if price available; otherwise fallback to 5
-        if price and price > 0:
-            co2_per_usd = float(kg) / float(price)
-            item_score = score_from_co2e_per_dollar(co2_per_usd)
-        else:
-            item_score = 5
-        db.add(ReceiptItem(
-            transaction_id=tx.id,
-            name=name,
-            price=Decimal(str(price)) if price is not None else None,
-            qty=qty,
-            kg_co2e=Decimal(str(kg)),
-            item_score=item_score,
-        ))
-        if price and price > 0:
-            p = Decimal(str(price))
-            total_price += p
-            weighted_score_sum += p * Decimal(item_score)
-
-    # Aggregate transaction score (price-weighted mean if prices exist; else avg of items)
-    if total_price > 0:
-        tx_score = int((weighted_score_sum / total_price).quantize(Decimal("1")))
-    else:
-        # average simple
-        scores = [it.get("item_score") for it in db.query(ReceiptItem).filter(ReceiptItem.transaction_id == tx.id).all() if it.item_score is not None]
-        tx_score = int(sum(scores) / len(scores)) if scores else 5
-
-    tx.eco_score = max(0, min(10, tx_score))
+    scored, tx.eco_score = await score_items(items)
+    db.add_all([ReceiptItem(**item.row(tx.id)) for item in scored])
     tx.needs_receipt = False
+    tx.factor_key = None  # scored from its items, not the factor table
     tx.cashback_usd = compute_cashback(tx.amount, tx.eco_score)
 
     db.add(tx)
-    db.commit()
+    # Flushed here and committed by the caller, together with the stage timings
+    with tracing.span("db.write", items=len(items)):
+        await db.flush()
 
     # Build detailed items list from DB (including kg_co2e and item_score)
-    stored = db.query(ReceiptItem).filter(ReceiptItem.transaction_id == tx.id).all()
+    with tracing.span("db.read_items"):
+        stored = (await db.execute(select(ReceiptItem).where(ReceiptItem.transaction_id == tx.id))).scalars().all()
     # We don't persist diagnostics on the model; rerun a lightweight mapping for response enrichment
     items_detailed = []
     for r in stored:
@@ -165,6 +231,7 @@ async def upload_receipt(
         "parser_used": ocr_flow.get("parser_used"),
         "text_source": ocr_flow.get("text_source"),
         "items_detailed": items_detailed,
+        "receipt_sha256": tx.receipt_sha256,
     }
     if debug_raw_text:
         # Include local OCR text to help debug prices if Vision fails
@@ -198,7 +265,7 @@ async def parse_receipt_text_debug(payload: ReceiptText):
 
 
 @router.post("/ingest_text", response_model=dict)
-async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def ingest_receipt_text(payload: ReceiptText, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """Use Cerebras to parse provided receipt text and persist items to a transaction.
 
     This bypasses OCR. Requires user_id and transaction_id. Returns the same response
@@ -208,10 +275,10 @@ async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db
         raise HTTPException(status_code=400, detail="transaction_id is required")
 
     tx: Transaction | None = (
-        db.query(Transaction)
-        .filter(Transaction.id == payload.transaction_id, Transaction.user_id == current_user.id)
-        .first()
-    )
+        await db.execute(
+            select(Transaction).where(Transaction.id == payload.transaction_id, Transaction.user_id == current_user.id)
+        )
+    ).scalars().first()
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found for user")
 
@@ -220,7 +287,7 @@ async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db
         raise HTTPException(status_code=400, detail="Could not parse items from text")
 
     # Clear previous items
-    db.query(ReceiptItem).filter(ReceiptItem.transaction_id == tx.id).delete(synchronize_session=False)
+    await db.execute(delete(ReceiptItem).where(ReceiptItem.transaction_id == tx.id).execution_options(synchronize_session=False))
 
     total_price = Decimal("0")
     for it in items:
@@ -247,12 +314,13 @@ async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db
             qty=qty,
             kg_co2e=kg_co2e,
             item_score=item_score,
+            parser_version=PARSER_VERSION,
         )
         db.add(row)
 
     # Compute transaction eco_score weighted by price
-    db.flush()
-    stored = db.query(ReceiptItem).filter(ReceiptItem.transaction_id == tx.id).all()
+    await db.flush()
+    stored = (await db.execute(select(ReceiptItem).where(ReceiptItem.transaction_id == tx.id))).scalars().all()
     if stored:
         # weighted average by price
         numerator = sum((r.item_score or 5) * float(r.price or 0) for r in stored)
@@ -263,6 +331,7 @@ async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db
 
     tx.eco_score = max(0, min(10, tx_score))
     tx.needs_receipt = False
+    tx.factor_key = None
     # New cashback/eco bonus logic based on item scores and subtotal
     subtotal = sum((r.price or Decimal("0")) for r in stored) if stored else Decimal("0")
     sum_scores = sum((r.item_score or 5) for r in stored) if stored else 0
@@ -272,7 +341,7 @@ async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db
     total_rate = base_cashback_rate + eco_bonus_rate
     tx.cashback_usd = subtotal * Decimal(str(total_rate))
     db.add(tx)
-    db.commit()
+    await db.commit()
 
     items_detailed = [
         {
@@ -303,7 +372,7 @@ async def ingest_receipt_text(payload: ReceiptText, db: Session = Depends(get_db
         "items_detailed": items_detailed,
     }
 @router.get("/{transaction_id}/items", response_model=list[dict])
-def list_receipt_items(transaction_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_receipt_items(transaction_id: int, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
     """Fetch stored parsed receipt items for a user's transaction."""
     tx: Transaction | None = db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == current_user.id).first()
     if not tx:
@@ -317,7 +386,98 @@ def list_receipt_items(transaction_id: int, db: Session = Depends(get_db), curre
             "qty": r.qty,
             "kg_co2e": str(r.kg_co2e) if r.kg_co2e is not None else None,
             "item_score": r.item_score,
+            "parser_version": r.parser_version,
             "created_at": r.created_at.isoformat(),
         }
         for r in rows
     ]
+
+
+@router.get("/{transaction_id}/image")
+def download_receipt_image(
+    transaction_id: int,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream the original uploaded receipt for a user's transaction.
+
+    The URL is per transaction and a re-upload replaces the receipt, so clients must
+    revalidate (no-cache); the ETag is the content digest, and a matching
+    If-None-Match gets a 304 without touching the blob store.
+    """
+    tx: Transaction | None = db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == current_user.id).first()
+    if not tx:
+        raise HTTPException(status_code=404, detail="Transaction not found for user")
+    store = get_blob_store()
+    if store is None or not tx.receipt_sha256:
+        raise HTTPException(status_code=404, detail="No stored receipt for this transaction")
+    etag = f'"{tx.receipt_sha256}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    try:
+        chunks = store.open(blob_key(tx.receipt_sha256))
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="Stored receipt is missing from the blob store")
+    return StreamingResponse(
+        chunks,
+        media_type=tx.receipt_content_type or "application/octet-stream",
+        headers=headers,
+    )
+
+
+def _timing_dict(r: ReceiptStageTiming) -> dict:
+    return {
+        "transaction_id": r.transaction_id,
+        "trace_id": r.trace_id,
+        "stage": r.stage,
+        "calls": r.calls,
+        "duration_ms": r.duration_ms,
+        "error": r.error,
+        "input_bytes": r.input_bytes,
+        "image_width": r.image_width,
+        "image_height": r.image_height,
+        "created_at": r.created_at.isoformat(),
+    }
+
+
+@router.get("/{transaction_id}/timings", response_model=list[dict])
+def list_receipt_timings(transaction_id: int, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    """Per-stage timings of the uploads for a user's transaction, newest upload first."""
+    tx: Transaction | None = db.query(Transaction).filter(Transaction.id == transaction_id, Transaction.user_id == current_user.id).first()
+    if not tx:
+        raise HTTPException(status_code=404, detail="Transaction not found for user")
+    rows = (
+        db.query(ReceiptStageTiming)
+        .filter(ReceiptStageTiming.transaction_id == transaction_id)
+        .order_by(ReceiptStageTiming.created_at.desc(), ReceiptStageTiming.id)
+        .all()
+    )
+    return [_timing_dict(r) for r in rows]
+
+
+@router.get("/timings/slowest", response_model=list[dict])
+def slowest_receipt_stages(
+    stage: str = Query("total", description="Span name, e.g. total, ocr.vision, parse.cerebras, footprint, db.write"),
+    min_width: Optional[int] = Query(None, ge=0),
+    min_height: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """The user's slowest uploads for one stage, optionally limited to large images."""
+    q = (
+        db.query(ReceiptStageTiming)
+        .join(Transaction, Transaction.id == ReceiptStageTiming.transaction_id)
+        .filter(Transaction.user_id == current_user.id, ReceiptStageTiming.stage == stage)
+    )
+    if min_width is not None:
+        q = q.filter(ReceiptStageTiming.image_width >= min_width)
+    if min_height is not None:
+        q = q.filter(ReceiptStageTiming.image_height >= min_height)
+    rows = q.order_by(ReceiptStageTiming.duration_ms.desc()).limit(limit).all()
+    return [_timing_dict(r) for r in rows]
@@ -4,64 +4,107 @@ from datetime import date
 from typing import List, Optional
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form, Header, status
-from sqlalchemy import and_, desc, asc
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form, Header, Response, status
+from sqlalchemy import and_, desc, asc, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import uuid4
+import asyncio
 import csv
+import itertools
+import orjson
 from io import StringIO, TextIOWrapper
 from datetime import datetime, timedelta
 
-from ...db.session import get_db
+from ...db.session import get_db, get_async_db
+from ...db.replicas import get_read_db, note_write, router as replica_router
 from ...models.plaid import Transaction
 from ...models.user import User
 from ...models.user import User
 from ...core.security import hash_password
 from ...core.security import decode_access_token
-from ...schemas.transaction import TransactionRead, TransactionIngestRequest
+from ...core.config import get_settings
+from ...schemas.transaction import TransactionRead, TransactionCreate, TransactionIngestRequest
 from ...services.eco_scoring import (
     is_mixed_merchant,
+    quick_factor_key,
     quick_merchant_score,
     compute_cashback,
     score_from_co2e_per_dollar,
 )
 from ...services.integrations.climatiq_client import estimate_item_footprint
+from ...services.fingerprint import transaction_fingerprint
 import inspect
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 
-@router.get("/", response_model=List[TransactionRead])
-def list_transactions(
-    user_id: int = Query(..., gt=0),
-    start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None),
-    merchant: Optional[str] = Query(None, description="Substring match on merchant name"),
-    min_amount: Optional[float] = Query(None),
-    max_amount: Optional[float] = Query(None),
-    category: Optional[str] = Query(None, description="Keyword to match in name or merchant as a proxy for category"),
-    sort_by: str = Query("date", pattern="^(date|amount|name)$"),
-    sort_dir: str = Query("desc", pattern="^(asc|desc)$"),
-    offset: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
-):
-    q = db.query(Transaction).filter(Transaction.user_id == user_id)
+# Columns served by the list endpoints, in TransactionRead field order
+_READ_COLUMNS = {name: getattr(Transaction, name) for name in TransactionRead.model_fields}
+
+
+def _json_default(obj):
+    # Match pydantic's JSON output for Decimal fields (string, scale preserved)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError
+
+
+class _TransactionListResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # OPT_UTC_Z: pydantic writes UTC datetimes with "Z", not "+00:00"
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_UTC_Z)
+
+
+def _parse_fields(fields: Optional[str]) -> list[str]:
+    if not fields:
+        return list(_READ_COLUMNS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [n for n in names if n not in _READ_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names or list(_READ_COLUMNS)
+
+
+def _list_response(
+    db: Session,
+    *,
+    user_id: int,
+    fields: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    merchant: Optional[str],
+    min_amount: Optional[float],
+    max_amount: Optional[float],
+    category: Optional[str],
+    sort_by: str,
+    sort_dir: str,
+    offset: int,
+    limit: int,
+) -> Response:
+    """Select only the requested columns as tuples and encode them with orjson.
+
+    Skips ORM entity loading and per-row pydantic validation.
+    """
+    names = _parse_fields(fields)
+    q = select(*(_READ_COLUMNS[n] for n in names)).where(Transaction.user_id == user_id)
 
     if start_date is not None:
-        q = q.filter(Transaction.date >= start_date)
+        q = q.where(Transaction.date >= start_date)
     if end_date is not None:
-        q = q.filter(Transaction.date <= end_date)
+        q = q.where(Transaction.date <= end_date)
     if merchant:
-        q = q.filter(Transaction.merchant_name.ilike(f"%{merchant}%"))
+        q = q.where(Transaction.merchant_name.ilike(f"%{merchant}%"))
     if min_amount is not None:
-        q = q.filter(Transaction.amount >= min_amount)
+        q = q.where(Transaction.amount >= min_amount)
     if max_amount is not None:
-        q = q.filter(Transaction.amount <= max_amount)
+        q = q.where(Transaction.amount <= max_amount)
     if category:
         # Portable proxy: match keyword in transaction name or merchant
         like = f"%{category}%"
-        q = q.filter((Transaction.name.ilike(like)) | (Transaction.merchant_name.ilike(like)))
+        q = q.where((Transaction.name.ilike(like)) | (Transaction.merchant_name.ilike(like)))
 
     # Sorting
     sort_column = {
@@ -71,8 +114,42 @@ def list_transactions(
     }[sort_by]
     order = desc if sort_dir == "desc" else asc
     q = q.order_by(order(sort_column), order(Transaction.id)).offset(offset).limit(limit)
-    results = q.all()
-    return results
+    rows = db.execute(q).all()
+    payload = [dict(zip(names, row)) for row in rows]
+    return _TransactionListResponse(content=payload)
+
+
+@router.get("/", response_model=List[TransactionRead])
+def list_transactions(
+    user_id: int = Query(..., gt=0),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    merchant: Optional[str] = Query(None, description="Substring match on merchant name"),
+    min_amount: Optional[float] = Query(None),
+    max_amount: Optional[float] = Query(None),
+    category: Optional[str] = Query(None, description="Keyword to match in name or merchant as a proxy for category"),
+    sort_by: str = Query("date", pattern="^(date|amount|name)$"),
+    sort_dir: str = Query("desc", pattern="^(asc|desc)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return (default: all)"),
+    db: Session = Depends(get_read_db),
+):
+    return _list_response(
+        db,
+        user_id=user_id,
+        fields=fields,
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        category=category,
+        sort_by=sort_by,
+        sort_dir=sort_dir,
+        offset=offset,
+        limit=limit,
+    )
 
 
 # --- Auth helpers ---
@@ -108,134 +185,168 @@ def list_my_transactions(
     sort_dir: str = Query("desc", pattern="^(asc|desc)$"),
     offset: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
-    db: Session = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return (default: all)"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    q = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    return _list_response(
+        db,
+        user_id=current_user.id,
+        fields=fields,
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        category=category,
+        sort_by=sort_by,
+        sort_dir=sort_dir,
+        offset=offset,
+        limit=limit,
+    )
 
-    if start_date is not None:
-        q = q.filter(Transaction.date >= start_date)
-    if end_date is not None:
-        q = q.filter(Transaction.date <= end_date)
-    if merchant:
-        q = q.filter(Transaction.merchant_name.ilike(f"%{merchant}%"))
-    if min_amount is not None:
-        q = q.filter(Transaction.amount >= min_amount)
-    if max_amount is not None:
-        q = q.filter(Transaction.amount <= max_amount)
-    if category:
-        like = f"%{category}%"
-        q = q.filter((Transaction.name.ilike(like)) | (Transaction.merchant_name.ilike(like)))
 
-    sort_column = {
-        "date": Transaction.date,
-        "amount": Transaction.amount,
-        "name": Transaction.name,
-    }[sort_by]
-    order = desc if sort_dir == "desc" else asc
-    q = q.order_by(order(sort_column), order(Transaction.id)).offset(offset).limit(limit)
-    return q.all()
+# external_ids resolved per lookup query; stays under SQLite/asyncpg bind-parameter limits
+_INGEST_LOOKUP_CHUNK = 10_000
+
+
+def _estimate_key(label: str, amount, category) -> tuple:
+    return (label, amount, tuple(category) if category is not None else None)
+
+
+def _estimated_factor_key(label: str, category, source: str) -> Optional[str]:
+    """factor_key for a score from estimate_item_footprint: only factor-table ("fallback")
+    estimates have one; live Climatiq factors don't change with a factor version."""
+    return quick_factor_key(label, category) if source == "fallback" else None
+
+
+async def _estimate_scores(keys, limit: int) -> dict:
+    """Run one footprint estimate per distinct (label, amount, category), `limit` at a time.
+
+    Returns key -> (eco score, estimate source), or None where the estimate failed
+    (callers fall back to the quick score).
+    """
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def _one(key):
+        label, amount, category = key
+        async with sem:
+            try:
+                est = estimate_item_footprint(label, float(amount), 1, list(category) if category is not None else None)
+                res = await est if inspect.isawaitable(est) else est
+                if isinstance(res, tuple) and len(res) == 3:
+                    kg_co2e, src, _fid = res
+                else:
+                    kg_co2e, src = res, "fallback"
+                amt = float(amount) if amount else 0.0
+                co2_per_usd = (float(kg_co2e) / amt) if amt > 0 else float(kg_co2e)
+                return score_from_co2e_per_dollar(co2_per_usd), src
+            except Exception:
+                return None
+
+    keys = list(keys)
+    scores = await asyncio.gather(*(_one(k) for k in keys))
+    return dict(zip(keys, scores))
 
 
 @router.post("/ingest", response_model=dict)
-async def ingest_transactions(payload: TransactionIngestRequest, db: Session = Depends(get_db)):
+async def ingest_transactions(payload: TransactionIngestRequest, db: AsyncSession = Depends(get_async_db)):
     """Bulk insert hardcoded transactions for testing purposes.
 
     If an incoming transaction is missing `external_id`, one will be generated.
-    Existing transactions (matched by `external_id`) will be updated.
+    Existing transactions (matched by `external_id`) will be updated; rows whose content
+    is unchanged since the last ingest are skipped.
+
+    All external_ids are resolved up front, each distinct merchant/amount/category is
+    estimated once (concurrently), and rows are written with bulk INSERT/UPDATE.
     """
-    created, updated = 0, 0
+    settings = get_settings()
+    # Later duplicates of an external_id win, as when rows were applied one at a time
+    incoming: dict[str, TransactionCreate] = {}
     for t in payload.transactions:
-        ext_id = t.external_id or f"seed-{uuid4()}"
-        existing = db.query(Transaction).filter(Transaction.external_id == ext_id).first()
-        if existing:
-            existing.user_id = payload.user_id
-            existing.account_id = "Capital One"
-            existing.date = t.date
-            existing.name = t.name
-            existing.merchant_name = t.merchant_name
-            existing.amount = t.amount
-            existing.iso_currency_code = t.iso_currency_code
-            existing.category = t.category
-            existing.location = t.location
-            # eco/cashback
-            if is_mixed_merchant(existing.merchant_name):
-                existing.needs_receipt = True
-                existing.eco_score = None
-                existing.cashback_usd = compute_cashback(existing.amount, None)
-            else:
-                # Compute eco using Climatiq (live if enabled) for the whole transaction amount
-                try:
-                    est = estimate_item_footprint(existing.merchant_name or existing.name, float(existing.amount), 1, existing.category)
-                    res = await est if inspect.isawaitable(est) else est
-                    if isinstance(res, tuple) and len(res) == 3:
-                        kg_co2e, _src, _fid = res
-                    else:
-                        kg_co2e = res
-                    amt = float(existing.amount) if existing.amount else 0.0
-                    co2_per_usd = (float(kg_co2e) / amt) if amt > 0 else float(kg_co2e)
-                    score = score_from_co2e_per_dollar(co2_per_usd)
-                    eco_bonus_rate = (Decimal(score) / Decimal(10)) * Decimal("0.04")
-                    base_cashback_rate = Decimal("0.01")
-                    total_rate = base_cashback_rate + eco_bonus_rate
-                    existing.eco_score = score
-                    existing.needs_receipt = False
-                    existing.cashback_usd = (Decimal(str(existing.amount)) * total_rate).quantize(Decimal("0.01"))
-                except Exception:
-                    # Fallback to legacy quick score path
-                    score = quick_merchant_score(existing.merchant_name, existing.category)
-                    existing.eco_score = score
-                    existing.needs_receipt = False
-                    existing.cashback_usd = compute_cashback(existing.amount, score)
-            db.add(existing)
-            updated += 1
+        incoming[t.external_id or f"seed-{uuid4()}"] = t
+
+    ext_ids = list(incoming)
+    existing: dict[str, tuple[int, Optional[str]]] = {}
+    for i in range(0, len(ext_ids), _INGEST_LOOKUP_CHUNK):
+        rows = await db.execute(
+            select(Transaction.external_id, Transaction.id, Transaction.content_hash)
+            .where(Transaction.external_id.in_(ext_ids[i:i + _INGEST_LOOKUP_CHUNK]))
+        )
+        existing.update({ext_id: (tx_id, content_hash) for ext_id, tx_id, content_hash in rows})
+
+    new_rows, updates, unchanged = [], [], 0
+    for ext_id, t in incoming.items():
+        content_hash = transaction_fingerprint(
+            user_id=payload.user_id,
+            date=t.date,
+            name=t.name,
+            merchant_name=t.merchant_name,
+            amount=t.amount,
+            iso_currency_code=t.iso_currency_code,
+            category=t.category,
+            location=t.location,
+        )
+        found = existing.get(ext_id)
+        if found and found[1] == content_hash:
+            unchanged += 1
+            continue
+        values = {
+            "user_id": payload.user_id,
+            "account_id": "Capital One",
+            "date": t.date,
+            "name": t.name,
+            "merchant_name": t.merchant_name,
+            "amount": t.amount,
+            "iso_currency_code": t.iso_currency_code,
+            "category": t.category,
+            "location": t.location,
+            "content_hash": content_hash,
+        }
+        if found:
+            values["id"] = found[0]
+            updates.append(values)
         else:
-            # eco/cashback
-            if is_mixed_merchant(t.merchant_name):
-                eco_score = None
-                needs_receipt = True
-                cashback = compute_cashback(t.amount, None)
-            else:
-                # Compute eco for non-mixed: live Climatiq when available; fallback to quick score
-                try:
-                    est = estimate_item_footprint(t.merchant_name or t.name, float(t.amount), 1, t.category)
-                    res = await est if inspect.isawaitable(est) else est
-                    if isinstance(res, tuple) and len(res) == 3:
-                        kg_co2e, _src, _fid = res
-                    else:
-                        kg_co2e = res
-                    amt = float(t.amount) if t.amount else 0.0
-                    co2_per_usd = (float(kg_co2e) / amt) if amt > 0 else float(kg_co2e)
-                    eco_score = score_from_co2e_per_dollar(co2_per_usd)
-                    eco_bonus_rate = (Decimal(eco_score) / Decimal(10)) * Decimal("0.04")
-                    base_cashback_rate = Decimal("0.01")
-                    total_rate = base_cashback_rate + eco_bonus_rate
-                    needs_receipt = False
-                    cashback = (Decimal(str(t.amount)) * total_rate).quantize(Decimal("0.01"))
-                except Exception:
-                    eco_score = quick_merchant_score(t.merchant_name, t.category)
-                    needs_receipt = False
-                    cashback = compute_cashback(t.amount, eco_score)
-
-            db.add(Transaction(
-                user_id=payload.user_id,
-                plaid_item_id=None,
-                external_id=ext_id,
-                account_id="Capital One",
-                date=t.date,
-                name=t.name,
-                merchant_name=t.merchant_name,
-                amount=t.amount,
-                iso_currency_code=t.iso_currency_code,
-                category=t.category,
-                location=t.location,
-                eco_score=eco_score,
-                cashback_usd=cashback,
-                needs_receipt=needs_receipt,
-            ))
-            created += 1
-    db.commit()
-    return {"created": created, "updated": updated, "total": created + updated}
+            values["external_id"] = ext_id
+            values["plaid_item_id"] = None
+            new_rows.append(values)
+
+    # eco/cashback: mixed merchants wait for a receipt; others get one estimate per distinct key
+    to_estimate = {
+        _estimate_key(v["merchant_name"] or v["name"], v["amount"], v["category"])
+        for v in itertools.chain(new_rows, updates)
+        if not is_mixed_merchant(v["merchant_name"])
+    }
+    scores = await _estimate_scores(to_estimate, settings.ingest_estimate_concurrency)
+    for v in itertools.chain(new_rows, updates):
+        if is_mixed_merchant(v["merchant_name"]):
+            v.update(eco_score=None, needs_receipt=True, cashback_usd=compute_cashback(v["amount"], None), factor_key=None)
+            continue
+        label = v["merchant_name"] or v["name"]
+        estimate = scores.get(_estimate_key(label, v["amount"], v["category"]))
+        if estimate is None:
+            # Fallback to legacy quick score path
+            score = quick_merchant_score(label, v["category"])
+            cashback = compute_cashback(v["amount"], score)
+            factor_key = quick_factor_key(label, v["category"])
+        else:
+            score, source = estimate
+            eco_bonus_rate = (Decimal(score) / Decimal(10)) * Decimal("0.04")
+            base_cashback_rate = Decimal("0.01")
+            cashback = (Decimal(str(v["amount"])) * (base_cashback_rate + eco_bonus_rate)).quantize(Decimal("0.01"))
+            factor_key = _estimated_factor_key(label, v["category"], source)
+        v.update(eco_score=score, needs_receipt=False, cashback_usd=cashback, factor_key=factor_key)
+
+    if new_rows:
+        await db.execute(insert(Transaction), new_rows)
+    if updates:
+        await db.execute(update(Transaction), updates)
+    await db.commit()
+    if (new_rows or updates) and replica_router.replicas:
+        # Bulk statements bypass the flush hook that pins reads to the primary
+        note_write(payload.user_id)
+    created, updated = len(new_rows), len(updates)
+    return {"created": created, "updated": updated, "unchanged": unchanged, "total": created + updated}
 
 
 @router.post("/seed_rich", response_model=dict)
@@ -256,13 +367,16 @@ def seed_rich_dataset(
     today = datetime.utcnow().date()
     start = today - timedelta(days=days)
 
-    # Ensure users exist
+    # Ensure users exist (hash the shared default password once, only if needed)
     users: list[User] = []
+    default_hash: str | None = None
     for i in range(1, number_of_users + 1):
         email = f"{email_prefix}+{i}@example.com"
         u = db.query(User).filter(User.email == email).first()
         if not u:
-            u = User(email=email, hashed_password=hash_password("password123"), full_name=f"Seed User {i}")
+            if default_hash is None:
+                default_hash = hash_password("password123")
+            u = User(email=email, hashed_password=default_hash, full_name=f"Seed User {i}")
             db.add(u)
             db.flush()  # get ID
         users.append(u)
@@ -289,6 +403,14 @@ def seed_rich_dataset(
         ("McDonald's", "Fast Food", 9.0, ["Food", "Fast Food"]),
     ]
 
+    # One lookup for ids seeded on earlier runs instead of a query per synthetic row
+    seen = set(db.scalars(
+        select(Transaction.external_id).where(
+            Transaction.user_id.in_([u.id for u in users]),
+            Transaction.external_id.like("rich-%"),
+        )
+    ))
+
     created = 0
     for u in users:
         for d in range(days):
@@ -303,7 +425,7 @@ def seed_rich_dataset(
             for j, (merchant, base_name, base_amt, cats) in enumerate(day_tx[: 2 + (d % 3) - (1 if is_weekend else 0) ]):
                 amt = round(base_amt * (0.8 + ((j + u.id % 3) * 0.12)), 2)
                 ext_id = f"rich-{u.id}-{tx_date.isoformat()}-{j}-{merchant.replace(' ', '')}"
-                if db.query(Transaction).filter(Transaction.external_id == ext_id).first():
+                if ext_id in seen:
                     continue
                 db.add(Transaction(
                     user_id=u.id,
@@ -346,6 +468,10 @@ def seed_demo_data(user_id: int = Form(..., gt=0), db: Session = Depends(get_db)
         ("CATA Bus", "Bus Pass", 2.75, ["Travel", "Public Transit"]),
     ]
 
+    seen = set(db.scalars(
+        select(Transaction.external_id).where(Transaction.external_id.like(f"seed-{user_id}-%"))
+    ))
+
     created = 0
     for i in range(1, 31):
         tx_date = start + timedelta(days=i)
@@ -354,18 +480,19 @@ def seed_demo_data(user_id: int = Form(..., gt=0), db: Session = Depends(get_db)
         for j, (merchant, base_name, base_amt, cats) in enumerate(daily[: 2 + (i % 3)]):
             amt = round(base_amt * (0.8 + (j * 0.1)), 2)
             ext_id = f"seed-{user_id}-{tx_date.isoformat()}-{j}"
-            exists = db.query(Transaction).filter(Transaction.external_id == ext_id).first()
-            if exists:
+            if ext_id in seen:
                 continue
             # determine eco/cashback
             if is_mixed_merchant(merchant):
                 eco_score = None
                 needs_receipt = True
                 cashback = compute_cashback(amt, None)
+                factor_key = None
             else:
                 eco_score = quick_merchant_score(merchant, cats)
                 needs_receipt = False
                 cashback = compute_cashback(amt, eco_score)
+                factor_key = quick_factor_key(merchant, cats)
 
             db.add(Transaction(
                 user_id=user_id,
@@ -382,6 +509,7 @@ def seed_demo_data(user_id: int = Form(..., gt=0), db: Session = Depends(get_db)
                 eco_score=eco_score,
                 cashback_usd=cashback,
                 needs_receipt=needs_receipt,
+                factor_key=factor_key,
             ))
             created += 1
     db.commit()
@@ -393,7 +521,7 @@ async def recompute_all(
     user_id: int | None = None,
     only_missing: bool = True,
     limit: int = 200,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Backfill eco_score and cashback_usd for existing transactions.
 
@@ -401,12 +529,12 @@ async def recompute_all(
     - Non-mixed merchants: compute kgCO2e via Climatiq (if enabled) on full transaction amount,
       map to eco_score, then compute cashback as base 1% + up to 4% bonus.
     """
-    q = db.query(Transaction)
+    q = select(Transaction)
     if user_id is not None:
-        q = q.filter(Transaction.user_id == user_id)
+        q = q.where(Transaction.user_id == user_id)
     # Process the most recent transactions first
     q = q.order_by(desc(Transaction.date), desc(Transaction.id)).limit(max(1, min(limit, 1000)))
-    rows = q.all()
+    rows = (await db.execute(q)).scalars().all()
     updated = 0
     for tx in rows:
         try:
@@ -416,6 +544,7 @@ async def recompute_all(
                 if not only_missing:
                     tx.eco_score = None
                     tx.cashback_usd = None
+                    tx.factor_key = None
                 db.add(tx)
                 updated += 1
                 continue
@@ -424,12 +553,13 @@ async def recompute_all(
             if only_missing and (tx.eco_score is not None and tx.cashback_usd is not None):
                 continue
 
-            est = estimate_item_footprint(tx.merchant_name or tx.name, float(tx.amount), 1, tx.category)
+            label = tx.merchant_name or tx.name
+            est = estimate_item_footprint(label, float(tx.amount), 1, tx.category)
             res = await est if inspect.isawaitable(est) else est
             if isinstance(res, tuple) and len(res) == 3:
-                kg_co2e, _src, _fid = res
+                kg_co2e, src, _fid = res
             else:
-                kg_co2e = res
+                kg_co2e, src = res, "fallback"
             amt = float(tx.amount) if tx.amount else 0.0
             co2_per_usd = (float(kg_co2e) / amt) if amt > 0 else float(kg_co2e)
             score = score_from_co2e_per_dollar(co2_per_usd)
@@ -439,24 +569,26 @@ async def recompute_all(
             tx.eco_score = score
             tx.needs_receipt = False
             tx.cashback_usd = (Decimal(str(tx.amount)) * total_rate).quantize(Decimal("0.01"))
+            tx.factor_key = _estimated_factor_key(label, tx.category, src)
             db.add(tx)
             updated += 1
         except Exception:
             # Fallback: compute quick score and cashback with the same rate formula
             try:
-                score = quick_merchant_score(tx.merchant_name, tx.category)
+                score = quick_merchant_score(tx.merchant_name or tx.name, tx.category)
                 eco_bonus_rate = (Decimal(score) / Decimal(10)) * Decimal("0.04")
                 base_cashback_rate = Decimal("0.01")
                 total_rate = base_cashback_rate + eco_bonus_rate
                 tx.eco_score = score
                 tx.needs_receipt = False
                 tx.cashback_usd = (Decimal(str(tx.amount)) * total_rate).quantize(Decimal("0.01"))
+                tx.factor_key = quick_factor_key(tx.merchant_name or tx.name, tx.category)
                 db.add(tx)
                 updated += 1
             except Exception:
                 # If even fallback fails, leave as-is
                 continue
-    db.commit()
+    await db.commit()
     return {"processed": len(rows), "updated": updated}
 
 
@@ -464,7 +596,7 @@ async def recompute_all(
 async def upload_csv(
     user_id: int = Form(..., gt=0),
     file: UploadFile = File(..., description="CSV with headers: date,name,merchant_name,amount,external_id(optional),account_id(optional),iso_currency_code(optional),category(optional comma/pipe-separated)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Ingest transactions from an uploaded CSV file.
 
@@ -475,7 +607,7 @@ async def upload_csv(
     text = contents.decode("utf-8", errors="replace")
     reader = csv.DictReader(StringIO(text))
 
-    created, updated = 0, 0
+    created, updated, unchanged = 0, 0, 0
     for row in reader:
         # Normalize fields
         ext_id = row.get("external_id") or f"csv-{uuid4()}"
@@ -510,8 +642,23 @@ async def upload_csv(
         if not loc:
             loc = None
 
-        existing = db.query(Transaction).filter(Transaction.external_id == ext_id).first()
+        content_hash = transaction_fingerprint(
+            user_id=user_id,
+            date=tx_date,
+            name=name,
+            merchant_name=merchant,
+            amount=amount,
+            iso_currency_code=iso,
+            category=cats,
+            location=loc,
+        )
+        existing = (await db.execute(select(Transaction).where(Transaction.external_id == ext_id))).scalars().first()
+        if existing and existing.content_hash == content_hash:
+            # Same row re-uploaded: skip the UPDATE and the re-estimate
+            unchanged += 1
+            continue
         if existing:
+            existing.content_hash = content_hash
             existing.user_id = user_id
             existing.account_id = "Capital One"
             existing.date = tx_date
@@ -526,14 +673,16 @@ async def upload_csv(
                 existing.needs_receipt = True
                 existing.eco_score = None
                 existing.cashback_usd = compute_cashback(existing.amount, None)
+                existing.factor_key = None
             else:
+                label = existing.merchant_name or existing.name
                 try:
-                    est = estimate_item_footprint(existing.merchant_name or existing.name, float(existing.amount), 1)
+                    est = estimate_item_footprint(label, float(existing.amount), 1, existing.category)
                     res = await est if inspect.isawaitable(est) else est
                     if isinstance(res, tuple) and len(res) == 3:
-                        kg_co2e, _src, _fid = res
+                        kg_co2e, src, _fid = res
                     else:
-                        kg_co2e = res
+                        kg_co2e, src = res, "fallback"
                     amt = float(existing.amount) if existing.amount else 0.0
                     co2_per_usd = (float(kg_co2e) / amt) if amt > 0 else float(kg_co2e)
                     score = score_from_co2e_per_dollar(co2_per_usd)
@@ -543,26 +692,30 @@ async def upload_csv(
                     existing.eco_score = score
                     existing.needs_receipt = False
                     existing.cashback_usd = (Decimal(str(existing.amount)) * total_rate).quantize(Decimal("0.01"))
+                    existing.factor_key = _estimated_factor_key(label, existing.category, src)
                 except Exception:
-                    score = quick_merchant_score(existing.merchant_name, existing.category)
+                    score = quick_merchant_score(label, existing.category)
+                    existing.factor_key = quick_factor_key(label, existing.category)
                     existing.eco_score = score
                     existing.needs_receipt = False
                     existing.cashback_usd = compute_cashback(existing.amount, score)
             db.add(existing)
             updated += 1
         else:
+            factor_key = None
             if is_mixed_merchant(merchant):
                 eco_score = None
                 needs_receipt = True
                 cashback = compute_cashback(amount, None)
             else:
+                label = merchant or name
                 try:
-                    est = estimate_item_footprint(merchant or name, float(amount), 1, cats)
+                    est = estimate_item_footprint(label, float(amount), 1, cats)
                     res = await est if inspect.isawaitable(est) else est
                     if isinstance(res, tuple) and len(res) == 3:
-                        kg_co2e, _src, _fid = res
+                        kg_co2e, src, _fid = res
                     else:
-                        kg_co2e = res
+                        kg_co2e, src = res, "fallback"
                     amt = float(amount) if amount else 0.0
                     co2_per_usd = (float(kg_co2e) / amt) if amt > 0 else float(kg_co2e)
                     eco_score = score_from_co2e_per_dollar(co2_per_usd)
@@ -571,8 +724,10 @@ async def upload_csv(
                     total_rate = base_cashback_rate + eco_bonus_rate
                     needs_receipt = False
                     cashback = (Decimal(str(amount)) * total_rate).quantize(Decimal("0.01"))
+                    factor_key = _estimated_factor_key(label, cats, src)
                 except Exception:
-                    eco_score = quick_merchant_score(merchant, cats)
+                    eco_score = quick_merchant_score(label, cats)
+                    factor_key = quick_factor_key(label, cats)
                     needs_receipt = False
                     cashback = compute_cashback(amount, eco_score)
 
@@ -591,7 +746,9 @@ async def upload_csv(
                 eco_score=eco_score,
                 cashback_usd=cashback,
                 needs_receipt=needs_receipt,
+                factor_key=factor_key,
+                content_hash=content_hash,
             ))
             created += 1
-    db.commit()
-    return {"created": created, "updated": updated, "total": created + updated}
+    await db.commit()
+    return {"created": created, "updated": updated, "unchanged": unchanged, "total": created + updated}
@@ -3,35 +3,40 @@ from __future__ import annotations
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ...db.session import get_db
+from ...db.session import get_async_db
+from ...db.replicas import get_read_db
 from ...models import user as user_model
 from ...schemas.user import UserCreate, UserRead
-from ...core.security import hash_password
+from ...core.security import hash_password_async
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/", response_model=List[UserRead])
-def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     users = db.query(user_model.User).offset(skip).limit(limit).all()
     return users
 
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user(payload: UserCreate, db: Session = Depends(get_db)):
+async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if email already exists
-    existing = db.query(user_model.User).filter(user_model.User.email == payload.email).first()
+    existing = (
+        await db.execute(select(user_model.User).where(user_model.User.email == payload.email))
+    ).scalars().first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user = user_model.User(
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await hash_password_async(payload.password),
         full_name=payload.full_name,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
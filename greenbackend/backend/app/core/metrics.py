@@ -0,0 +1,162 @@
+"""Prometheus metrics: request timings, DB queries per request, external calls.
+
+`MetricsMiddleware` times every request and labels it with the matched route
+template (e.g. /transactions/{tx_id}), so label cardinality stays bounded. Queries
+are counted through SQLAlchemy cursor events into a per-request context variable;
+a high `greenbucks_db_queries_per_request` for a route is the signature of an
+N+1 loop. Everything is exposed at GET /metrics.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import tracing
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+HTTP_REQUESTS = Counter(
+    "greenbucks_http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "greenbucks_http_request_duration_seconds", "HTTP request latency, until the response body is sent",
+    ["method", "route"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "greenbucks_http_requests_in_flight", "Requests currently being served", ["method"]
+)
+
+DB_QUERIES = Counter(
+    "greenbucks_db_queries_total", "SQL statements executed, by the route that issued them", ["route"]
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "greenbucks_db_queries_per_request", "SQL statements per request", ["route"], buckets=_QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "greenbucks_db_time_per_request_seconds", "Time spent in SQL per request", ["route"], buckets=_LATENCY_BUCKETS,
+)
+
+EXTERNAL_CALL_DURATION = Histogram(
+    "greenbucks_external_call_duration_seconds", "Calls to external services",
+    ["provider", "operation", "outcome"], buckets=_LATENCY_BUCKETS,
+)
+
+OCR_IN_PROGRESS = Gauge(
+    "greenbucks_ocr_jobs_in_progress", "Receipts currently in OCR/parsing (queue depth)"
+)
+PLAID_SYNC_DURATION = Histogram(
+    "greenbucks_plaid_sync_duration_seconds", "Duration of one item's transactions sync",
+    ["outcome"], buckets=_LATENCY_BUCKETS,
+)
+PLAID_SYNC_UPSERTED = Counter(
+    "greenbucks_plaid_sync_upserted_total", "Transactions inserted or updated by Plaid syncs"
+)
+PLAID_SYNC_QUEUE = Gauge(
+    "greenbucks_plaid_sync_queue", "Webhook-triggered syncs waiting or running", ["state"]
+)
+
+
+class _QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Set per request by the middleware. Sync routes and asyncio.to_thread copy the
+# context, so queries run in worker threads land on the same object.
+_query_stats: ContextVar[Optional[_QueryStats]] = ContextVar("greenbucks_query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_metrics_t0")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+@contextmanager
+def track_external(provider: str, operation: str) -> Iterator[dict]:
+    """Time a call to an external service.
+
+    The outcome label is "error" if the block raises, else "ok"; the caller may
+    set call["outcome"] (e.g. to the HTTP status code) to refine it. Inside a
+    trace the call is also recorded as a "<provider>.<operation>" span.
+    """
+    call = {"outcome": "ok"}
+    with tracing.span(f"{provider}.{operation}") as sp:
+        t0 = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            call["outcome"] = "error"
+            raise
+        finally:
+            EXTERNAL_CALL_DURATION.labels(provider, operation, str(call["outcome"])).observe(time.perf_counter() - t0)
+            if sp is not None:
+                sp.set("outcome", str(call["outcome"]))
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status, in-flight count and DB usage per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = _QueryStats()
+        token = _query_stats.set(stats)
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            in_flight.dec()
+            _query_stats.reset(token)
+            route = _route_label(scope)
+            HTTP_REQUESTS.labels(method, route, str(status["code"])).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            DB_QUERIES.labels(route).inc(stats.count)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.seconds)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
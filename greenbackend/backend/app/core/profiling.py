@@ -0,0 +1,213 @@
+"""Opt-in request profiler writing to a bounded on-disk ring.
+
+A request is profiled when it is sampled (PROFILING_SAMPLE_RATE, optionally
+restricted to PROFILING_PATHS prefixes) or when it carries
+`X-Profile: <PROFILING_TOKEN>`. pyinstrument (statistical, async-aware, HTML
+output) is used when installed; otherwise cProfile writes a .prof file for
+pstats/snakeviz. Only one request is profiled at a time; others run untouched.
+
+When neither a sample rate nor a token is configured the middleware is not
+installed at all, so the disabled cost is zero.
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import hmac
+import marshal
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import orjson
+
+from .config import get_settings
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+    HAS_PYINSTRUMENT = True
+except Exception:
+    HAS_PYINSTRUMENT = False
+
+PROFILE_HEADER = b"x-profile"
+_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{6}$")
+
+
+def enabled() -> bool:
+    s = get_settings()
+    return s.profiling_sample_rate > 0 or bool(s.profiling_token)
+
+
+class ProfileStore:
+    """Directory of profiles plus JSON sidecars, trimmed to the newest `max_files`."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+
+    def _meta_path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, data: bytes, ext: str, meta: dict) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        # Sortable by time, so the ring can drop the oldest by name
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{os.urandom(3).hex()}"
+        meta = {**meta, "id": profile_id, "file": f"{profile_id}.{ext}", "bytes": len(data)}
+        with self._lock:
+            with open(os.path.join(self.directory, meta["file"]), "wb") as f:
+                f.write(data)
+            with open(self._meta_path(profile_id), "wb") as f:
+                f.write(orjson.dumps(meta))
+            self._trim()
+        return meta
+
+    def _trim(self) -> None:
+        metas = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in metas[: max(0, len(metas) - self.max_files)]:
+            profile_id = name[:-5]
+            for fn in os.listdir(self.directory):
+                if fn.startswith(profile_id + "."):
+                    try:
+                        os.remove(os.path.join(self.directory, fn))
+                    except OSError:
+                        pass
+
+    def list(self) -> list[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    out.append(orjson.loads(f.read()))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def get(self, profile_id: str) -> Optional[tuple[str, dict]]:
+        """(file path, metadata) for a stored profile, or None."""
+        if not _ID_RE.match(profile_id):
+            return None
+        try:
+            with open(self._meta_path(profile_id), "rb") as f:
+                meta = orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        path = os.path.join(self.directory, meta["file"])
+        return (path, meta) if os.path.exists(path) else None
+
+
+_store: Optional[ProfileStore] = None
+
+
+def get_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        s = get_settings()
+        _store = ProfileStore(s.profiling_dir, s.profiling_max_files)
+    return _store
+
+
+class _Capture:
+    """Wraps pyinstrument or cProfile behind start/stop/render."""
+
+    def __init__(self, interval: float):
+        if HAS_PYINSTRUMENT:
+            self._p = _Pyinstrument(interval=interval, async_mode="enabled")
+            self.ext = "html"
+        else:
+            self._p = cProfile.Profile()
+            self.ext = "prof"
+
+    def start(self) -> None:
+        if HAS_PYINSTRUMENT:
+            self._p.start()
+        else:
+            self._p.enable()
+
+    def stop(self) -> None:
+        if HAS_PYINSTRUMENT:
+            self._p.stop()
+        else:
+            self._p.disable()
+
+    def render(self) -> bytes:
+        if HAS_PYINSTRUMENT:
+            return self._p.output_html().encode()
+        self._p.create_stats()
+        return marshal.dumps(self._p.stats)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles sampled or explicitly requested requests."""
+
+    def __init__(self, app):
+        self.app = app
+        s = get_settings()
+        self.sample_rate = s.profiling_sample_rate
+        self.token = (s.profiling_token or "").encode() or None
+        self.paths = tuple(p.strip() for p in (s.profiling_paths or "").split(",") if p.strip())
+        self.interval = s.profiling_interval_ms / 1000.0
+        self._busy = threading.Lock()
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.token is not None:
+            for k, v in scope.get("headers") or ():
+                if k == PROFILE_HEADER and hmac.compare_digest(v, self.token):
+                    return "header"
+        if self.sample_rate > 0 and (not self.paths or scope["path"].startswith(self.paths)):
+            if random.random() < self.sample_rate:
+                return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        capture = _Capture(self.interval)
+        t0 = time.perf_counter()
+        capture.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            capture.stop()
+            self._busy.release()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            meta = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": (scope.get("query_string") or b"").decode("latin-1")[:500],
+                "status": status["code"],
+                "duration_ms": round(elapsed_ms, 3),
+                "trigger": trigger,
+                "profiler": "pyinstrument" if HAS_PYINSTRUMENT else "cprofile",
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            # Rendering HTML can take a while for long requests; keep it off the event loop
+            try:
+                await asyncio.to_thread(self._save, capture, meta)
+            except Exception as e:
+                print(f"[profiling] could not store profile: {e}")
+
+    @staticmethod
+    def _save(capture: _Capture, meta: dict) -> None:
+        get_store().save(capture.render(), capture.ext, meta)
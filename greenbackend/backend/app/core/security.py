@@ -2,14 +2,65 @@ from __future__ import annotations
 
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
 import jwt
 
 from ..core.config import get_settings
 from ..models.user import User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Dedicated pool for bcrypt so a login burst can't starve the shared request threadpool
+_hash_executor: ThreadPoolExecutor | None = None
+_hash_lock = threading.Lock()
+_hash_pending = 0
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_lock:
+            if _hash_executor is None:
+                workers = max(1, get_settings().password_hash_workers)
+                _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwd-hash")
+    return _hash_executor
+
+
+async def _run_in_hash_pool(fn, *args):
+    global _hash_pending
+    with _hash_lock:
+        _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), fn, *args)
+    finally:
+        with _hash_lock:
+            _hash_pending -= 1
+
+
+def password_hash_stats() -> dict:
+    """Return hashing pool size and queue depth (submitted but not yet finished)."""
+    workers = max(1, get_settings().password_hash_workers)
+    pending = _hash_pending
+    return {
+        "workers": workers,
+        "in_flight": pending,
+        "queued": max(0, pending - workers),
+    }
+
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    with _hash_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False)
+            _hash_executor = None
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -19,6 +70,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(subject: dict, expires_minutes: int | None = None) -> str:
     settings = get_settings()
     expire_delta = timedelta(minutes=expires_minutes or settings.jwt_access_token_expires_minutes)
@@ -48,3 +107,14 @@ def authenticate(db: Session, email: str, password: str) -> User | None:
     if not verify_password(password, user.hashed_password):
         return None
     return user
+
+
+async def authenticate_async(db: AsyncSession, email: str, password: str) -> User | None:
+    """Same as `authenticate` for async routes: the lookup uses the async session and
+    the bcrypt check runs on the hashing pool, so neither blocks the event loop."""
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
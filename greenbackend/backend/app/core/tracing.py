@@ -0,0 +1,159 @@
+"""Minimal span tracing with OpenTelemetry-compatible output.
+
+A trace is opened with `start_trace()`; `span()` blocks nested inside it (in the
+same task, or in threads started with asyncio.to_thread, which copy the context)
+become its children. Outside a trace `span()` is a no-op, so library code can be
+instrumented unconditionally. Finished traces are exported as OTLP/JSON
+`resourceSpans` lines to TRACE_EXPORT_PATH, which an OpenTelemetry collector's
+file receiver (or `jq`) can read.
+"""
+from __future__ import annotations
+
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+import orjson
+
+from .config import get_settings
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        out = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attr(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def stages(self) -> dict[str, dict]:
+        """Finished spans grouped by name: call count, summed duration and first-seen attributes."""
+        out: dict[str, dict] = {}
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            agg = out.setdefault(s.name, {"calls": 0, "duration_ms": 0.0, "attributes": dict(s.attributes), "error": None})
+            agg["calls"] += 1
+            agg["duration_ms"] += s.duration_ms
+            agg["error"] = agg["error"] or s.error
+        return out
+
+
+def _otlp_attr(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        v = {"boolValue": value}
+    elif isinstance(value, int):
+        v = {"intValue": str(value)}
+    elif isinstance(value, float):
+        v = {"doubleValue": value}
+    else:
+        v = {"stringValue": str(value)}
+    return {"key": key, "value": v}
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("greenbucks_current_span", default=None)
+_export_lock = threading.Lock()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def _run(span: Span) -> Iterator[Span]:
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current.reset(token)
+        span.trace._finish(span)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current span; yields None (and records nothing) outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    with _run(Span(parent.trace, name, parent.span_id, attributes)) as s:
+        yield s
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Span]:
+    """Open a new trace with a root span and export it when the block exits."""
+    root = Span(Trace(), name, None, attributes)
+    try:
+        with _run(root):
+            yield root
+    finally:
+        export(root.trace)
+
+
+def export(trace: Trace) -> None:
+    path = get_settings().trace_export_path
+    if not path or not trace.spans:
+        return
+    settings = get_settings()
+    line = orjson.dumps({"resourceSpans": [{
+        "resource": {"attributes": [
+            _otlp_attr("service.name", settings.app_name),
+            _otlp_attr("deployment.environment", settings.environment),
+        ]},
+        "scopeSpans": [{
+            "scope": {"name": "greenbucks.tracing"},
+            "spans": [s.to_otlp() for s in sorted(trace.spans, key=lambda s: s.start_ns)],
+        }],
+    }]})
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _export_lock, open(path, "ab") as f:
+            f.write(line + b"\n")
+    except OSError as e:
+        print(f"[tracing] export to {path} failed: {e}")
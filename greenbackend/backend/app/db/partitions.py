@@ -0,0 +1,161 @@
+"""Monthly partition maintenance for `transactions` (PostgreSQL only).
+
+The partitioned layout is created by migration 20261019_100000. These helpers keep
+partitions created ahead of time and let old months be detached (archived) or dropped.
+On other dialects, or before the migration has run, every function is a no-op.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+PARENT = "transactions"
+DEFAULT_PARTITION = "transactions_default"
+EXTERNAL_IDS = "transaction_external_ids"  # global external_id uniqueness, see migration 20261019_160000
+_CASCADE_TRIGGER = "trg_transactions_receipt_items_cascade"
+# Rows keyed by transaction_id; the cascade trigger, not a foreign key, removes them
+CHILD_TABLES = ("receipt_items", "receipt_stage_timings")
+
+
+def _add_months(d: date, n: int) -> date:
+    m = d.month - 1 + n
+    return date(d.year + m // 12, m % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month:%Y_%m}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    row = conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {"t": PARENT},
+    ).first()
+    return row is not None
+
+
+def list_partitions(conn: Connection) -> list[dict]:
+    """Attached partitions with their bounds and estimated row counts, oldest first."""
+    if not is_partitioned(conn):
+        return []
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname"
+    ), {"t": PARENT}).all()
+    return [{"name": r[0], "bounds": r[1], "estimated_rows": max(int(r[2]), 0)} for r in rows]
+
+
+def _exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name}).scalar()
+
+
+def _create_month(conn: Connection, month: date) -> None:
+    """Create one month's partition, moving any rows that already landed in DEFAULT.
+
+    PostgreSQL refuses to add a partition whose range overlaps rows in the DEFAULT
+    partition, so those rows go into a standalone table first, which is then attached.
+    """
+    name = partition_name(month)
+    lo, hi = month.isoformat(), _add_months(month, 1).isoformat()
+    has_default = _exists(conn, DEFAULT_PARTITION)
+    stray = has_default and conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= :lo AND date < :hi)"),
+        {"lo": lo, "hi": hi},
+    ).scalar()
+    if not stray:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES FROM ('{lo}') TO ('{hi}')"
+        ))
+        return
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE date >= '{lo}' AND date < '{hi}'"
+    ))
+    # Rows are moving, not being deleted: keep their receipt items
+    conn.execute(text(f"ALTER TABLE {DEFAULT_PARTITION} DISABLE TRIGGER {_CASCADE_TRIGGER}"))
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= '{lo}' AND date < '{hi}'"))
+    conn.execute(text(f"ALTER TABLE {DEFAULT_PARTITION} ENABLE TRIGGER {_CASCADE_TRIGGER}"))
+    conn.execute(text(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"
+    ))
+
+
+def ensure_partitions(conn: Connection, months_ahead: int, today: Optional[date] = None) -> list[str]:
+    """Create any missing monthly partitions from the current month through `months_ahead`."""
+    if not is_partitioned(conn):
+        return []
+    today = today or date.today()
+    start = date(today.year, today.month, 1)
+    created: list[str] = []
+    for i in range(months_ahead + 1):
+        month = _add_months(start, i)
+        if not _exists(conn, partition_name(month)):
+            _create_month(conn, month)
+            created.append(partition_name(month))
+    return created
+
+
+def detach_partitions_before(conn: Connection, cutoff: date, drop: bool = False) -> list[str]:
+    """Detach every monthly partition for months earlier than `cutoff`'s month.
+
+    Detached tables keep their data and stay queryable by name (for export or
+    cold storage); pass drop=True to remove them instead. Their external_ids are
+    released, as the rows are no longer in `transactions`.
+
+    Neither DETACH nor DROP fires the cascade trigger, so the partition's receipt
+    items and stage timings are removed here first. On a plain detach they are
+    copied into `<partition>_<child table>` archive tables beside the partition.
+    """
+    if not is_partitioned(conn):
+        return []
+    limit = partition_name(date(cutoff.year, cutoff.month, 1))
+    names = [
+        p["name"] for p in list_partitions(conn)
+        if p["name"] != DEFAULT_PARTITION and p["name"] < limit
+    ]
+    track_ids = _exists(conn, EXTERNAL_IDS)
+    children = [c for c in CHILD_TABLES if _exists(conn, c)]
+    for name in names:
+        for child in children:
+            if not drop:
+                conn.execute(text(
+                    f"CREATE TABLE {name}_{child} AS "
+                    f"SELECT c.* FROM {child} c JOIN {name} p ON c.transaction_id = p.id"
+                ))
+            conn.execute(text(f"DELETE FROM {child} c USING {name} p WHERE c.transaction_id = p.id"))
+        if track_ids:
+            conn.execute(text(
+                f"DELETE FROM {EXTERNAL_IDS} e USING {name} p "
+                f"WHERE e.external_id = p.external_id AND e.transaction_id = p.id"
+            ))
+        conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {name}"))
+    return names
+
+
+def orphaned_child_rows(conn: Connection) -> dict[str, int]:
+    """Receipt items and stage timings whose transaction no longer exists, per table."""
+    if not is_partitioned(conn):
+        return {}
+    return {
+        child: conn.execute(text(
+            f"SELECT count(*) FROM {child} c WHERE NOT EXISTS (SELECT 1 FROM {PARENT} t WHERE t.id = c.transaction_id)"
+        )).scalar()
+        for child in CHILD_TABLES if _exists(conn, child)
+    }
+
+
+def maintain(eng: Engine, months_ahead: int) -> list[str]:
+    """Scheduler entry point: create upcoming partitions in one transaction."""
+    if eng.dialect.name != "postgresql":
+        return []
+    with eng.begin() as conn:
+        return ensure_partitions(conn, months_ahead)
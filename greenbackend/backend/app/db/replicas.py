@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from typing import Generator, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import get_settings
+from ..core.security import decode_access_token
+from .session import SessionLocal, engine, make_engine, pool_stats
+
+_settings = get_settings()
+
+# Postgres standby lag in seconds; 0 when fully replayed (or when run on a primary)
+_PG_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """Round-robin over replica engines, skipping any whose lag exceeds the limit."""
+
+    def __init__(self, primary: Engine, urls: list[str], max_lag: float, check_interval: float):
+        self.primary = primary
+        self.replicas: list[Engine] = [make_engine(u) for u in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._rr = itertools.count()
+        self._lag: dict[int, tuple[float, Optional[float]]] = {}  # idx -> (checked_at, lag or None if down)
+        self._lock = threading.Lock()
+
+    def _measure_lag(self, eng: Engine) -> Optional[float]:
+        try:
+            with eng.connect() as conn:
+                if eng.dialect.name == "postgresql":
+                    return float(conn.execute(_PG_LAG_SQL).scalar() or 0.0)
+                # No replication metadata (e.g. two SQLite files): reachable means usable
+                conn.execute(text("SELECT 1"))
+                return 0.0
+        except Exception:
+            return None
+
+    def lag(self, idx: int) -> Optional[float]:
+        now = time.monotonic()
+        cached = self._lag.get(idx)
+        if cached and now - cached[0] < self.check_interval:
+            return cached[1]
+        value = self._measure_lag(self.replicas[idx])
+        with self._lock:
+            self._lag[idx] = (now, value)
+        return value
+
+    def pick(self) -> Engine:
+        n = len(self.replicas)
+        if not n:
+            return self.primary
+        start = next(self._rr)
+        for i in range(n):
+            idx = (start + i) % n
+            lag = self.lag(idx)
+            if lag is not None and lag <= self.max_lag:
+                return self.replicas[idx]
+        # Every replica is down or too far behind
+        return self.primary
+
+    def stats(self) -> list[dict]:
+        out = []
+        for idx, eng in enumerate(self.replicas):
+            checked = self._lag.get(idx)
+            out.append({
+                "url": eng.url.render_as_string(hide_password=True),
+                "lag_seconds": checked[1] if checked else None,
+                "pool": pool_stats(eng),
+            })
+        return out
+
+
+def _replica_urls() -> list[str]:
+    raw = _settings.database_replica_urls or ""
+    return [u.strip() for u in raw.split(",") if u.strip()]
+
+
+router = ReplicaRouter(
+    engine,
+    _replica_urls(),
+    max_lag=_settings.replica_max_lag_seconds,
+    check_interval=_settings.replica_lag_check_interval_seconds,
+)
+
+
+# --- Read-after-write stickiness ---
+_recent_writes: dict[int, float] = {}
+_writes_lock = threading.Lock()
+
+
+def note_write(user_id: int) -> None:
+    """Pin a user's reads to the primary for `replica_read_after_write_seconds`."""
+    until = time.monotonic() + _settings.replica_read_after_write_seconds
+    with _writes_lock:
+        _recent_writes[int(user_id)] = until
+        if len(_recent_writes) > 10_000:
+            now = time.monotonic()
+            for uid in [u for u, t in _recent_writes.items() if t < now]:
+                _recent_writes.pop(uid, None)
+
+
+def must_read_primary(user_id: Optional[int]) -> bool:
+    if user_id is None:
+        return False
+    until = _recent_writes.get(int(user_id))
+    return until is not None and until > time.monotonic()
+
+
+@event.listens_for(Session, "after_flush")
+def _record_writes(session: Session, flush_context) -> None:
+    if not router.replicas:
+        return
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        uid = getattr(obj, "user_id", None)
+        if uid is not None:
+            note_write(uid)
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica unless `use_primary` is set.
+
+    Flushes always go to the primary, so an accidental write can't land on a replica.
+    The replica is chosen once per session so all reads in a request see one snapshot.
+    """
+
+    use_primary: bool = False
+    _replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, **kw):
+        if self.use_primary or self._flushing:
+            return engine
+        if self._replica is None:
+            self._replica = router.pick()
+        return self._replica
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
+def _request_user_id(request: Request) -> Optional[int]:
+    uid = request.query_params.get("user_id")
+    if uid and uid.isdigit():
+        return int(uid)
+    authorization = request.headers.get("authorization") or ""
+    if authorization.lower().startswith("bearer "):
+        payload = decode_access_token(authorization.split(" ", 1)[1]) or {}
+        sub = payload.get("sub") or {}
+        if isinstance(sub, dict) and sub.get("id"):
+            return int(sub["id"])
+    return None
+
+
+def get_read_db(request: Request) -> Generator:
+    """Dependency for read-only endpoints.
+
+    Routes to a replica when DATABASE_REPLICA_URLS is set. Falls back to the primary when
+    the caller sends `X-Read-Primary: 1` or wrote within the read-after-write window.
+    """
+    if not router.replicas:
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+        forced = (request.headers.get("x-read-primary") or "").lower() in ("1", "true", "yes")
+        db.use_primary = forced or must_read_primary(_request_user_id(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def replica_stats() -> dict:
+    return {
+        "max_lag_seconds": router.max_lag,
+        "replicas": router.stats(),
+    }
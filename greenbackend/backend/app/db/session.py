@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from ..core.config import get_settings
@@ -13,13 +15,127 @@ DATABASE_URL = _settings.database_url or "sqlite:///./greenbucks.db"
 if isinstance(DATABASE_URL, str) and DATABASE_URL.strip() == "":
     DATABASE_URL = "sqlite:///./greenbucks.db"
 
-# For SQLite we need check_same_thread=False for multi-threaded uvicorn
-connect_args = {"check_same_thread": False} if DATABASE_URL and DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, connect_args=connect_args)
+def to_async_url(url: str) -> str:
+    """Swap a sync driver for its async counterpart (aiosqlite / asyncpg)."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if backend == "postgresql":
+        return u.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+
+ASYNC_DATABASE_URL = (_settings.async_database_url or "").strip() or to_async_url(DATABASE_URL)
+
+
+def _is_sqlite(url: str) -> bool:
+    return bool(url) and url.startswith("sqlite")
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    """sqlite://, :memory:, and URI forms such as file::memory:?cache=shared or mode=memory."""
+    if not _is_sqlite(url):
+        return False
+    u = make_url(url)
+    database = u.database or ""
+    return database in ("", ":memory:") or database.startswith("file::memory:") or u.query.get("mode") == "memory"
+
+
+def _engine_kwargs(url: str) -> dict:
+    """Pool options from Settings. In-memory SQLite uses a singleton pool, so sizing is skipped."""
+    kwargs: dict = {"pool_pre_ping": _settings.db_pool_pre_ping}
+    if _is_sqlite(url):
+        # For SQLite we need check_same_thread=False for multi-threaded uvicorn
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_sqlite_memory(url):
+        kwargs.update(
+            pool_size=_settings.db_pool_size,
+            max_overflow=_settings.db_max_overflow,
+            pool_timeout=_settings.db_pool_timeout,
+            pool_recycle=_settings.db_pool_recycle,
+        )
+    return kwargs
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        # Off by default in SQLite; the ON DELETE CASCADE clauses depend on it
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if _settings.sqlite_journal_mode:
+            cursor.execute(f"PRAGMA journal_mode={_settings.sqlite_journal_mode}")
+        if _settings.sqlite_synchronous:
+            cursor.execute(f"PRAGMA synchronous={_settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(_settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(_settings.sqlite_mmap_size)}")
+    finally:
+        cursor.close()
+
+
+def make_engine(url: str) -> Engine:
+    eng = create_engine(url, **_engine_kwargs(url))
+    if _is_sqlite(url):
+        event.listen(eng, "connect", _apply_sqlite_pragmas)
+    return eng
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    eng = create_async_engine(url, **_engine_kwargs(url))
+    if _is_sqlite(url):
+        event.listen(eng.sync_engine, "connect", _apply_sqlite_pragmas)
+    return eng
+
+
+engine = make_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# Async engine for `async def` routes so DB I/O doesn't block the event loop.
+# Created lazily: the driver (aiosqlite/asyncpg) is only needed once an async route runs.
+_async_engine: AsyncEngine | None = None
+_async_session_factory: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = make_async_engine(ASYNC_DATABASE_URL)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
+
+
+def pool_stats(eng: Engine | None = None) -> dict:
+    """Snapshot of connection pool usage for sizing pool_size/max_overflow."""
+    eng = eng or engine
+    pool = eng.pool
+    stats: dict = {"pool_class": type(pool).__name__, "status": pool.status()}
+    for key in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, key, None)
+        if callable(fn):
+            try:
+                stats[key] = fn()
+            except Exception:
+                pass
+    return stats
+
 
 def get_db() -> Generator:
     db = SessionLocal()
@@ -27,3 +143,8 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -11,11 +11,22 @@ from .api.routes.transactions import router as transactions_router
 from .api.routes.auth import router as auth_router
 from .api.routes.receipts import router as receipts_router
 from .api.routes.plaid_webhook import router as plaid_webhook_router
+from .api.routes.export import router as export_router
+from .api.routes.metrics import router as metrics_router
+from .api.routes.profiles import router as profiles_router
+from .core.metrics import MetricsMiddleware
+from .core import profiling
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import timedelta
-from .db.session import SessionLocal
+from datetime import datetime, timedelta
+from .db.session import SessionLocal, dispose_async_engine, engine
+from .db import partitions
+from .core.security import shutdown_hash_executor
+from .services import emission_factors
+from .services.merchant_profile import shutdown_profile_writer
 from .services.plaid_service import sync_all_items
+from .services.receipt_image import UploadSizeLimitMiddleware
+from .services.webhook_queue import sync_queue
 
 
 @asynccontextmanager
@@ -36,14 +47,38 @@ async def lifespan(app: FastAPI):
             print(f"[scheduler] Plaid sync failed: {e}")
 
     scheduler.add_job(_scheduled_sync_job, "interval", minutes=30, id="plaid_sync_interval", replace_existing=True)
+
+    def _partition_job():
+        try:
+            created = partitions.maintain(engine, settings.transactions_partition_months_ahead)
+            if created:
+                print(f"[scheduler] Created transaction partitions: {', '.join(created)}")
+        except Exception as e:
+            print(f"[scheduler] Partition maintenance failed: {e}")
+
+    def _factors_job():
+        emission_factors.reload_factors()
+
+    if settings.emission_factors_reload_seconds > 0:
+        scheduler.add_job(_factors_job, "interval", seconds=settings.emission_factors_reload_seconds, id="emission_factors_reload", replace_existing=True)
+
+    if engine.dialect.name == "postgresql":
+        scheduler.add_job(_partition_job, "interval", days=1, id="transactions_partitions", replace_existing=True, next_run_time=datetime.now())
     scheduler.start()
     app.state.scheduler = scheduler
 
+    # Workers that drain webhook-triggered Plaid syncs
+    sync_queue.start()
+
     try:
         yield
     finally:
         # Cleanup resources here if needed
         scheduler.shutdown(wait=False)
+        await sync_queue.stop()
+        shutdown_hash_executor()
+        shutdown_profile_writer()
+        await dispose_async_engine()
 
 
 def create_app() -> FastAPI:
@@ -57,6 +92,10 @@ def create_app() -> FastAPI:
         swagger_ui_parameters={"persistAuthorization": True},
     )
 
+    # Oversized receipt uploads are refused before their body is read (inside CORS, so the
+    # 413 still carries CORS headers)
+    application.add_middleware(UploadSizeLimitMiddleware, max_bytes=settings.receipt_max_upload_bytes)
+
     # CORS (adjust origins for your frontend URL)
     application.add_middleware(
         CORSMiddleware,
@@ -66,6 +105,14 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Only installed when configured, so disabled profiling costs nothing per request
+    if profiling.enabled():
+        application.add_middleware(profiling.ProfilingMiddleware)
+
+    # Outermost, so timings cover CORS handling and the full response body
+    if settings.metrics_enabled:
+        application.add_middleware(MetricsMiddleware)
+
     # Routers
     application.include_router(health_router, prefix="", tags=["health"]) 
     application.include_router(users_router)
@@ -74,6 +121,10 @@ def create_app() -> FastAPI:
     application.include_router(auth_router)
     application.include_router(receipts_router)
     application.include_router(plaid_webhook_router)
+    application.include_router(export_router)
+    if settings.metrics_enabled:
+        application.include_router(metrics_router)
+    application.include_router(profiles_router)
 
     # Inject OpenAPI security scheme so Swagger shows the Authorize button
     def custom_openapi():
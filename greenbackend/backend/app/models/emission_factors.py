@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+
+
+class EmissionFactorVersion(Base):
+    """One published version of the emission-factor tables (see services/emission_factors.py).
+
+    Rows are append-only; the highest id is the active version. `factors` has the
+    same layout as the JSON files read by update_emission_factors.py.
+    """
+    __tablename__ = "emission_factor_versions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    factors: Mapped[dict] = mapped_column(JSON, nullable=False)
+    note: Mapped[Optional[str]] = mapped_column(String(255))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
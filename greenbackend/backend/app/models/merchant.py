@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+
+
+class MerchantProfileRecord(Base):
+    """Persisted copy of a merchant_profile.MerchantProfile (see MERCHANT_PROFILES_PERSIST).
+
+    One row per normalized merchant and category set. `rules_version` identifies the
+    classification rules and emission-factor version that produced it; rows from other
+    versions are ignored and overwritten.
+    """
+    __tablename__ = "merchant_profiles"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    merchant_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    categories_key: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    rules_version: Mapped[str] = mapped_column(String(16), index=True, nullable=False)
+
+    is_mixed: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    kg_co2e_per_usd: Mapped[float] = mapped_column(Float, nullable=False)
+    factor_key: Mapped[str] = mapped_column(String(64), nullable=False, default="default")
+    sector_hints: Mapped[Optional[list[str]]] = mapped_column(JSON)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("merchant_key", "categories_key", name="uq_merchant_profiles_key"),
+    )
@@ -41,6 +41,12 @@ class PlaidItem(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # This is the unpartitioned schema (SQLite, create_all). On PostgreSQL after migration
+    # 20261019_100000 the table is partitioned by date: the primary key is (id, date) and
+    # uq_transactions_external_id covers (external_id, date). `id` still comes from one
+    # sequence and stays the ORM identity. external_id stays globally unique through the
+    # transaction_external_ids table and its trigger (20261019_160000), which raises the
+    # same unique violation under the same constraint name.
     __table_args__ = (
         UniqueConstraint("external_id", name="uq_transactions_external_id"),
         Index("ix_transactions_user_date", "user_id", "date"),
@@ -70,6 +76,18 @@ class Transaction(Base):
     eco_score: Mapped[Optional[int]] = mapped_column(Integer)
     cashback_usd: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 2))
     needs_receipt: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    # Factor-table entry the eco score was derived from ("category:gas", "name:uber", "default");
+    # NULL when the score came from receipt items. See services/emission_factors.py.
+    factor_key: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+
+    # Hash of the source payload (Plaid/CSV); identical re-syncs are skipped without an UPDATE
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64))
+
+    # Original receipt upload in the blob store (services/blob_store.py), keyed by its SHA-256
+    receipt_sha256: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    receipt_content_type: Mapped[Optional[str]] = mapped_column(String(128))
+    # PARSER_VERSION last run on that receipt, whether it parsed or not (see receipt_pipeline.py)
+    receipt_parser_version: Mapped[Optional[str]] = mapped_column(String(32))
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -4,7 +4,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import Integer, DateTime, ForeignKey, Numeric, String
+from sqlalchemy import Integer, DateTime, Float, ForeignKey, Index, Numeric, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.base import Base
@@ -22,5 +22,35 @@ class ReceiptItem(Base):
 
     kg_co2e: Mapped[Optional[Decimal]] = mapped_column(Numeric(14, 6))
     item_score: Mapped[Optional[int]] = mapped_column(Integer)  # 0..10 per item
+    # ocr_google_vision.PARSER_VERSION that produced this row (NULL: before versioning)
+    parser_version: Mapped[Optional[str]] = mapped_column(String(32))
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+
+class ReceiptStageTiming(Base):
+    """Time spent in one stage of a receipt upload (one row per stage per upload).
+
+    `stage` is the span name, e.g. "ocr.vision", "parse.cerebras", "footprint.climatiq",
+    "db.write", or "total" for the whole request.
+    """
+    __tablename__ = "receipt_stage_timings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    transaction_id: Mapped[int] = mapped_column(ForeignKey("transactions.id", ondelete="CASCADE"), index=True, nullable=False)
+    trace_id: Mapped[str] = mapped_column(String(32), index=True, nullable=False)
+
+    stage: Mapped[str] = mapped_column(String(64), nullable=False)
+    calls: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(String(512))
+
+    input_bytes: Mapped[Optional[int]] = mapped_column(Integer)
+    image_width: Mapped[Optional[int]] = mapped_column(Integer)
+    image_height: Mapped[Optional[int]] = mapped_column(Integer)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_receipt_stage_timings_stage_duration", "stage", "duration_ms"),
+    )
@@ -0,0 +1,203 @@
+"""Content-addressed storage for original receipt uploads.
+
+Blobs are keyed by the SHA-256 of their bytes (`receipts/ab/cd/<sha256>`), so the
+same image uploaded twice is stored once. Two backends:
+
+- local filesystem under RECEIPT_BLOB_DIR (default)
+- S3-compatible object storage (AWS, MinIO, ...) when S3_BUCKET_NAME is set;
+  S3_ENDPOINT_URL points at a non-AWS endpoint. Credentials come from the usual
+  AWS environment variables / config files via boto3.
+
+Both upload from a file path or an open binary file (such as an UploadFile's
+spooled temp file) and download as an iterator of chunks, so a blob is never held
+in memory whole.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional, Union
+
+from ..core.config import get_settings
+from ..core.metrics import track_external
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    HAS_BOTO3 = True
+except Exception:
+    HAS_BOTO3 = False
+
+CHUNK_SIZE = 1 << 20
+
+
+class BlobNotFound(KeyError):
+    pass
+
+
+@dataclass
+class BlobRef:
+    sha256: str
+    key: str
+    size: int
+    content_type: Optional[str]
+    created: bool  # False when an identical blob was already stored
+
+
+def blob_key(sha256: str) -> str:
+    return f"receipts/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+@contextmanager
+def _open_source(src: Union[str, BinaryIO]) -> Iterator[BinaryIO]:
+    """Open a path, or rewind an already open file (which stays open)."""
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            yield f
+    else:
+        src.seek(0)
+        yield src
+
+
+class BlobStore(ABC):
+    backend = "base"
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def _put(self, key: str, src: BinaryIO, content_type: Optional[str]) -> None:
+        """Upload `src` (positioned at its start) under `key`."""
+
+    @abstractmethod
+    def open(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream a blob's bytes; raises BlobNotFound."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def put_file(self, src: Union[str, BinaryIO], sha256: str, content_type: Optional[str] = None) -> BlobRef:
+        """Store a file (path or open binary file) under its digest unless it is already there."""
+        key = blob_key(sha256)
+        with _open_source(src) as f:
+            size = f.seek(0, os.SEEK_END)
+            if self.exists(key):
+                return BlobRef(sha256, key, size, content_type, created=False)
+            f.seek(0)
+            self._put(key, f, content_type)
+        return BlobRef(sha256, key, size, content_type, created=True)
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.open(key))
+
+
+class LocalBlobStore(BlobStore):
+    backend = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def _put(self, key: str, src: BinaryIO, content_type: Optional[str]) -> None:
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # Copy to a sibling temp file and rename, so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := src.read(CHUNK_SIZE):
+                    out.write(chunk)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def open(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+        def _iter():
+            with f:
+                while chunk := f.read(chunk_size):
+                    yield chunk
+        return _iter()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BlobStore):
+    backend = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None):
+        if not HAS_BOTO3:
+            raise RuntimeError("boto3 is required when S3_BUCKET_NAME is set")
+        self.bucket = bucket
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def exists(self, key: str) -> bool:
+        with track_external("s3", "head_object") as call:
+            try:
+                self.client.head_object(Bucket=self.bucket, Key=key)
+                return True
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                call["outcome"] = code or "error"
+                if code in ("404", "NoSuchKey", "NotFound"):
+                    return False
+                raise
+
+    def _put(self, key: str, src: BinaryIO, content_type: Optional[str]) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        # upload_fileobj switches to multipart for large files and reads in chunks
+        with track_external("s3", "upload_fileobj"):
+            self.client.upload_fileobj(src, self.bucket, key, ExtraArgs=extra)
+
+    def open(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with track_external("s3", "get_object") as call:
+            try:
+                obj = self.client.get_object(Bucket=self.bucket, Key=key)
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code")
+                call["outcome"] = code or "error"
+                if code in ("404", "NoSuchKey", "NotFound"):
+                    raise BlobNotFound(key)
+                raise
+        return obj["Body"].iter_chunks(chunk_size)
+
+    def delete(self, key: str) -> None:
+        with track_external("s3", "delete_object"):
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """The configured store, or None when RECEIPT_BLOB_STORE_ENABLED is false."""
+    global _store
+    s = get_settings()
+    if not s.receipt_blob_store_enabled:
+        return None
+    if _store is None:
+        if s.s3_bucket_name:
+            _store = S3BlobStore(s.s3_bucket_name, s.s3_endpoint_url)
+        else:
+            _store = LocalBlobStore(s.receipt_blob_dir)
+    return _store
@@ -1,16 +1,15 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from typing import Optional
+from typing import Iterable, Optional
 
-MIXED_MERCHANTS = {"walmart", "target", "amazon", "costco"}
+from .merchant_profile import MIXED_MERCHANTS, merchant_profile  # noqa: F401
 
 
 def is_mixed_merchant(merchant_name: Optional[str]) -> bool:
     if not merchant_name:
         return False
-    m = merchant_name.lower()
-    return any(x in m for x in MIXED_MERCHANTS)
+    return merchant_profile(merchant_name).mixed
 
 
 def score_from_co2e_per_dollar(co2e_per_usd: float | None) -> int:
@@ -62,18 +61,19 @@ def map_score_to_multiplier(score: int) -> float:
     return 0.15 + (score / 10.0) * (5.0 - 0.15)
 
 
+def cashback_rate(score: Optional[int]) -> Decimal:
+    """Cashback as a fraction of the amount: 1% base plus the eco bonus (base only if score is None)."""
+    if score is None:
+        return Decimal("0.01")
+    return Decimal("0.01") + Decimal("0.01") * Decimal(str(map_score_to_multiplier(score)))
+
+
 def compute_cashback(amount: Decimal | float, score: Optional[int]) -> Decimal:
     """Compute cashback USD. Base 1% guaranteed, plus eco bonus scaled by multiplier.
     If score is None: only base 1%.
     """
     amt = Decimal(str(amount))
-    base = amt * Decimal("0.01")
-    if score is None:
-        return base.quantize(Decimal("0.01"))
-    m = map_score_to_multiplier(score)
-    bonus = amt * Decimal("0.01") * Decimal(str(m))
-    total = base + bonus
-    return total.quantize(Decimal("0.01"))
+    return (amt * cashback_rate(score)).quantize(Decimal("0.01"))
 
 
 def quick_merchant_score(merchant_name: Optional[str], category: Optional[list[str]]) -> int:
@@ -82,10 +82,37 @@ def quick_merchant_score(merchant_name: Optional[str], category: Optional[list[s
     Uses the same CO2 per dollar factors as receipt items to ensure consistency
     across all transactions, whether they have receipts or not.
     """
-    from .integrations.item_category_map import lookup_kg_co2e_per_usd
-    
-    # Use the same CO2 lookup logic as receipt items
-    co2e_per_usd = lookup_kg_co2e_per_usd(merchant_name or "", category)
+    # Same factor lookup as receipt items, memoized per (merchant, category)
+    co2e_per_usd = merchant_profile(merchant_name, category).kg_co2e_per_usd
     
     # Convert CO2 per USD to eco score using the same logic as receipt items
     return score_from_co2e_per_dollar(co2e_per_usd)
+
+
+def quick_factor_key(merchant_name: Optional[str], category: Optional[list[str]]) -> str:
+    """Factor-table entry behind quick_merchant_score for the same arguments (Transaction.factor_key)."""
+    return merchant_profile(merchant_name, category).factor_key
+
+
+def apply_quick_scores(transactions: Iterable) -> int:
+    """Score Transaction rows in bulk with the category/keyword map (no network calls).
+
+    The score depends only on merchant (or name) and category, so each row is one merchant
+    profile cache lookup. Mixed merchants are flagged needs_receipt and keep any
+    receipt-based score they already have; their cashback follows the current amount.
+    Returns the number of rows scored.
+    """
+    scored = 0
+    for tx in transactions:
+        profile = merchant_profile(tx.merchant_name or tx.name, tx.category)
+        if tx.merchant_name and profile.mixed:
+            tx.needs_receipt = True
+            tx.cashback_usd = compute_cashback(tx.amount, tx.eco_score)
+            continue
+        score = score_from_co2e_per_dollar(profile.kg_co2e_per_usd)
+        tx.eco_score = score
+        tx.factor_key = profile.factor_key
+        tx.needs_receipt = False
+        tx.cashback_usd = compute_cashback(tx.amount, score)
+        scored += 1
+    return scored
@@ -0,0 +1,215 @@
+"""Versioned, hot-reloadable emission-factor tables.
+
+The factor tables (category keyword -> kgCO2e/USD, name keyword -> kgCO2e/USD,
+default, per-item cap) are published as rows of `emission_factor_versions`. The
+highest id is active. Version 0 is the set of literals in item_category_map, used
+until anything is published.
+
+Each version is compiled into an immutable FactorTable. `current_factors()`
+returns the active one, and `reload_factors()` swaps in a newer one with a single
+assignment, so readers never see a half-updated table. The app polls for new
+versions every EMISSION_FACTORS_RELOAD_SECONDS.
+
+A lookup also reports which entry matched ("category:gas", "name:uber",
+"default"), and scored transactions store it in `factor_key`. `affected_keys`
+lists the keys whose rows can score differently under a new version, so
+`rescore_factor_change` only revisits those rows.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from .integrations.item_category_map import (
+    CATEGORY_KG_CO2E_PER_USD,
+    DEFAULT_KG_CO2E_PER_USD,
+    MAX_CO2E_PER_ITEM,
+    NAME_KG_CO2E_PER_USD,
+)
+
+DEFAULT_KEY = "default"
+_MAX_KEYWORD_LEN = 48  # "category:" + keyword must fit transactions.factor_key
+
+
+class FactorTableError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FactorTable:
+    """One compiled version of the factor tables. Never mutated once built."""
+    version: int
+    categories: tuple[tuple[str, float], ...]  # in precedence order
+    names: tuple[tuple[str, float], ...]  # in precedence order
+    default: float
+    max_per_item: float
+    _category_rank: dict = field(repr=False, compare=False, default_factory=dict)
+    _name_rank: dict = field(repr=False, compare=False, default_factory=dict)
+    _name_re: Optional[re.Pattern] = field(repr=False, compare=False, default=None)
+
+    @classmethod
+    def build(cls, version: int, categories, names, default: float, max_per_item: float) -> "FactorTable":
+        categories = tuple((str(k).lower(), float(v)) for k, v in (categories.items() if isinstance(categories, dict) else categories))
+        names = tuple((str(k).lower(), float(v)) for k, v in names)
+        for k, v in categories + names:
+            if not k or len(k) > _MAX_KEYWORD_LEN:
+                raise FactorTableError(f"keyword must be 1-{_MAX_KEYWORD_LEN} characters: {k!r}")
+            if v < 0:
+                raise FactorTableError(f"negative factor for {k!r}")
+        if float(default) < 0 or float(max_per_item) <= 0:
+            raise FactorTableError("default must be >= 0 and max_per_item > 0")
+        # Earlier entries win, so keep the first rank of a repeated keyword
+        category_rank: dict = {}
+        for i, (k, v) in enumerate(categories):
+            category_rank.setdefault(k, (i, k, v))
+        name_rank: dict = {}
+        for i, (k, v) in enumerate(names):
+            name_rank.setdefault(k, (i, k, v))
+        # At each position a lookahead alternation picks the earliest-listed keyword that
+        # starts there, so the lowest rank over all positions is the first listed match
+        name_re = re.compile("(?=(" + "|".join(re.escape(k) for k in name_rank) + "))") if name_rank else None
+        return cls(version, categories, names, float(default), float(max_per_item), category_rank, name_rank, name_re)
+
+    @classmethod
+    def from_json(cls, version: int, data: dict) -> "FactorTable":
+        try:
+            return cls.build(version, data["categories"], data["names"], data["default"], data["max_per_item"])
+        except (KeyError, TypeError, AttributeError) as e:
+            raise FactorTableError(f"invalid factor table: {e!r}")
+
+    def to_json(self) -> dict:
+        return {
+            "categories": dict(self.categories),
+            "names": [[k, v] for k, v in self.names],
+            "default": self.default,
+            "max_per_item": self.max_per_item,
+        }
+
+    def match(self, name: str, categories: Optional[Iterable[str]] = None) -> tuple[float, str]:
+        """(kgCO2e per USD, matched key) for a name and its categories.
+
+        A category keyword equal to one of the (lowercased) categories wins first, in
+        table order; then the first name keyword contained in the lowercased name.
+        """
+        best = None
+        for c in categories or ():
+            hit = self._category_rank.get(c.lower())
+            if hit is not None and (best is None or hit < best):
+                best = hit
+        if best is not None:
+            return best[2], f"category:{best[1]}"
+        if self._name_re is not None and name:
+            for m in self._name_re.finditer(name.lower()):
+                hit = self._name_rank[m.group(1)]
+                if best is None or hit < best:
+                    best = hit
+                    if hit[0] == 0:
+                        break
+            if best is not None:
+                return best[2], f"name:{best[1]}"
+        return self.default, DEFAULT_KEY
+
+
+BUILTIN_FACTORS = FactorTable.build(0, CATEGORY_KG_CO2E_PER_USD, NAME_KG_CO2E_PER_USD, DEFAULT_KG_CO2E_PER_USD, MAX_CO2E_PER_ITEM)
+
+
+def affected_keys(old: FactorTable, new: FactorTable) -> set[str]:
+    """Keys whose rows may score differently under `new` than under `old`.
+
+    A changed value affects its own key. A keyword added, removed or moved can
+    change which entry wins, so every keyword from the first difference in a list
+    onwards is included, along with everything of lower precedence: name keywords
+    and the default after a category change, and the default after a name change.
+    """
+    keys: set[str] = set()
+    lower_precedence = False
+    for prefix, old_list, new_list in (("category", old.categories, new.categories), ("name", old.names, new.names)):
+        old_keys, new_keys = [k for k, _ in old_list], [k for k, _ in new_list]
+        if lower_precedence:
+            keys.update(f"{prefix}:{k}" for k in old_keys)
+            continue
+        new_values = dict(reversed(new_list))  # first occurrence wins
+        for k, v in dict(reversed(old_list)).items():
+            if k in new_values and new_values[k] != v:
+                keys.add(f"{prefix}:{k}")
+        if old_keys != new_keys:
+            i = next((i for i, (a, b) in enumerate(zip(old_keys, new_keys)) if a != b), min(len(old_keys), len(new_keys)))
+            keys.update(f"{prefix}:{k}" for k in old_keys[i:])
+            lower_precedence = True
+    if lower_precedence or old.default != new.default:
+        keys.add(DEFAULT_KEY)
+    return keys
+
+
+_current: Optional[FactorTable] = None
+_lock = threading.Lock()
+
+
+def load_version(version: Optional[int] = None) -> FactorTable:
+    """The given version (latest if None) from the database; version 0 if none is published."""
+    from sqlalchemy import select
+
+    from ..db.session import engine
+    from ..models.emission_factors import EmissionFactorVersion as V
+
+    if version == 0:
+        return BUILTIN_FACTORS
+    q = select(V.id, V.factors)
+    q = q.where(V.id == version) if version is not None else q.order_by(V.id.desc()).limit(1)
+    with engine.connect() as conn:
+        row = conn.execute(q).first()
+    if row is None:
+        if version is not None:
+            raise FactorTableError(f"no emission factor version {version}")
+        return BUILTIN_FACTORS
+    return FactorTable.from_json(row.id, row.factors)
+
+
+def current_factors() -> FactorTable:
+    """The active table. Loaded from the database on first use; see reload_factors()."""
+    if _current is None:
+        reload_factors()
+    return _current
+
+
+def reload_factors() -> bool:
+    """Load the latest published version and swap it in if it is new. True if swapped."""
+    global _current
+    with _lock:
+        try:
+            latest = load_version()
+        except Exception as e:
+            if _current is None:
+                print(f"[emission_factors] using built-in factors: {str(e).splitlines()[0]}")
+                _current = BUILTIN_FACTORS
+            else:
+                print(f"[emission_factors] reload failed, keeping version {_current.version}: {str(e).splitlines()[0]}")
+            return False
+        if _current is not None and latest.version == _current.version:
+            return False
+        previous = _current
+        _current = latest
+    if previous is not None:
+        # Profiles embed factors; drop them only after the new table is visible
+        from .merchant_profile import clear_profile_cache
+        clear_profile_cache()
+        print(f"[emission_factors] switched from version {previous.version} to {latest.version}")
+    return True
+
+
+def publish_factors(data: dict, note: Optional[str] = None) -> FactorTable:
+    """Validate and store a new version; it becomes active here and, after their next
+    reload, in every other process."""
+    from ..db.session import SessionLocal
+    from ..models.emission_factors import EmissionFactorVersion
+
+    data = FactorTable.from_json(0, data).to_json()  # validate and normalize before writing
+    with SessionLocal() as db:
+        row = EmissionFactorVersion(factors=data, note=note)
+        db.add(row)
+        db.commit()
+        version = row.id
+    reload_factors()
+    return load_version(version)
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value.quantize(Decimal("0.01")))
+    if isinstance(value, float):
+        return str(Decimal(str(value)).quantize(Decimal("0.01")))
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def transaction_fingerprint(**fields: Any) -> str:
+    """Stable sha256 over the source fields of a transaction.
+
+    Amounts are normalized to cents so 12.5, "12.50" and Decimal("12.50") hash the same.
+    """
+    canonical = json.dumps(
+        {k: _normalize(v) for k, v in fields.items()},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -6,6 +6,7 @@ from typing import List, TypedDict, Optional
 import requests
 
 from ...core.config import get_settings
+from ...core.metrics import track_external
 
 
 class ParsedItem(TypedDict, total=False):
@@ -45,7 +46,7 @@ def parse_items_with_cerebras(text: str) -> List[ParsedItem]:
         return []
 
     # Cerebras endpoint (OpenAI compatible v1/chat/completions)
-    url = "https://api.cerebras.ai/v1/chat/completions"
+    url = f"{settings.cerebras_base_url.rstrip('/')}/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -60,7 +61,9 @@ def parse_items_with_cerebras(text: str) -> List[ParsedItem]:
         ],
     }
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
+        with track_external("cerebras", "chat_completions") as call:
+            resp = requests.post(url, headers=headers, json=payload, timeout=30)
+            call["outcome"] = resp.status_code
         resp.raise_for_status()
         data = resp.json()
         content = (
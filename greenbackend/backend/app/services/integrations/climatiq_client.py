@@ -2,23 +2,28 @@ from __future__ import annotations
 
 from typing import Optional, Tuple, Iterable
 from decimal import Decimal
+import asyncio
 import requests
 
 from ...core.config import get_settings
-from .item_category_map import lookup_kg_co2e_per_usd
+from ...core.metrics import track_external
+from ..emission_factors import current_factors
+from ..merchant_profile import merchant_profile
 
 
 def _mock_estimate(name: str, price: float | None, qty: int | None, categories: Optional[Iterable[str]] = None) -> float:
     """Category-aware deterministic estimate: factor(kgCO2e/$) * price, capped at reasonable values."""
-    from .item_category_map import MAX_CO2E_PER_ITEM
-    
-    factor = lookup_kg_co2e_per_usd(name or "", categories)
+    factor = merchant_profile(name, categories).kg_co2e_per_usd
     if price is None:
         price = 1.0
     
     # Calculate CO2 and cap it at maximum value
     co2e = float(Decimal(str(factor)) * Decimal(str(price)))
-    return min(co2e, MAX_CO2E_PER_ITEM)
+    return min(co2e, current_factors().max_per_item)
+
+
+def _base_url() -> str:
+    return get_settings().climatiq_base_url.rstrip("/")
 
 
 def _best_effort_search_money_factor(session: requests.Session, api_key: str, query: str) -> Optional[dict]:
@@ -26,8 +31,10 @@ def _best_effort_search_money_factor(session: requests.Session, api_key: str, qu
     Returns the factor dict or None.
     """
     try:
-        url = "https://api.climatiq.io/emission-factors"
-        resp = session.get(url, params={"query": query, "results_per_page": 10}, headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
+        url = f"{_base_url()}/emission-factors"
+        with track_external("climatiq", "search") as call:
+            resp = session.get(url, params={"query": query, "results_per_page": 10}, headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
+            call["outcome"] = resp.status_code
         if resp.status_code != 200:
             return None
         data = resp.json() or {}
@@ -47,7 +54,7 @@ def _best_effort_search_money_factor(session: requests.Session, api_key: str, qu
 def _estimate_using_factor(session: requests.Session, api_key: str, factor: dict, price: float) -> Optional[Tuple[float, str]]:
     """Try Climatiq /estimate. If not supported, return None to fallback. Returns (co2e, factor_id)."""
     try:
-        url = "https://api.climatiq.io/estimate"
+        url = f"{_base_url()}/estimate"
         # Many factors accept a payload with emission_factor.id and parameters for money
         # The request schema can vary; we attempt a generic money estimation.
         body = {
@@ -60,7 +67,9 @@ def _estimate_using_factor(session: requests.Session, api_key: str, factor: dict
                 }
             },
         }
-        resp = session.post(url, json=body, headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
+        with track_external("climatiq", "estimate") as call:
+            resp = session.post(url, json=body, headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
+            call["outcome"] = resp.status_code
         if resp.status_code != 200:
             return None
         data = resp.json() or {}
@@ -92,57 +101,38 @@ async def estimate_item_footprint(
     settings = get_settings()
     if not settings.use_real_climatiq or not settings.climatiq_api_key:
         return (_mock_estimate(name, price, qty, category), "fallback", None)
+    # Live lookups use blocking `requests`; run them off the event loop
+    return await asyncio.to_thread(_estimate_live, name, price, qty, category)
 
+
+def _estimate_live(
+    name: str,
+    price: float | None,
+    qty: int | None,
+    category: Optional[Iterable[str]] = None,
+) -> Tuple[float, str, Optional[str]]:
+    settings = get_settings()
     try:
         if price is None or price <= 0:
             # Without spend, fallback
             return (_mock_estimate(name, price, qty, category), "fallback", None)
         session = requests.Session()
-        # 1) Search a relevant factor for the item name with sector hints
-        def sector_hints(nm: str, cats: Optional[Iterable[str]]) -> list[str]:
-            nm_l = (nm or "").lower()
-            cats_l = {c.lower() for c in (cats or [])}
-            hints: list[str] = []
-            # Ride share / taxi
-            if any(k in nm_l for k in ["uber", "lyft", "ride"]) or any("ride share" in c for c in cats_l):
-                hints += ["taxi services", "ride hailing services", "transportation services"]
-            # Public transit / rail / subway
-            if any(k in nm_l for k in ["mta", "subway", "metro", "amtrak"]) or any(k in cats_l for k in ["public transit", "rail"]):
-                hints += ["public transit services", "rail passenger transport"]
-            # Gasoline / fuel
-            if "shell" in nm_l or any(k in cats_l for k in ["gas", "fuel"]):
-                hints += ["gasoline retail", "petroleum fuel retail"]
-            # Utilities electricity
-            if any(k in nm_l for k in ["utility", "utilities"]) or any(k in cats_l for k in ["electric", "utilities"]):
-                hints += ["electric utilities spend", "electricity services"]
-            # Groceries / retail food
-            if any(k in cats_l for k in ["groceries"]) or any(k in nm_l for k in ["grocery", "market", "mart", "costco", "h mart", "whole foods", "trader joe"]):
-                hints += ["grocery retail", "food retail"]
-            # Coffee shops / restaurants
-            if any(k in cats_l for k in ["coffee shop", "restaurant", "fast food"]) or any(k in nm_l for k in ["starbucks", "chipotle", "mcdonald", "blue bottle"]):
-                hints += ["food services", "coffee shop services"]
-            # Transport rail generic
-            if "amtrak" in nm_l:
-                hints += ["rail passenger transport"]
-            return hints
-
-        hints = sector_hints(name, category)
+        # 1) Search a relevant factor for the item name with sector hints: name + first hint
+        #    that yields a factor; else name alone
+        profile = merchant_profile(name, category)
+        hints = profile.sector_hints
         factor = None
-        # Try: name + first hint that yields a factor; else name alone
-        for h in hints:
-            factor = _best_effort_search_money_factor(session, settings.climatiq_api_key, f"{name} {h}")
+        for query in profile.climatiq_queries:
+            factor = _best_effort_search_money_factor(session, settings.climatiq_api_key, query)
             if factor:
                 break
-        if not factor:
-            factor = _best_effort_search_money_factor(session, settings.climatiq_api_key, name)
         # 2) If found, try estimate
         if factor:
             res = _estimate_using_factor(session, settings.climatiq_api_key, factor, float(price))
             if res is not None:
                 co2e, fid = res
                 # Cap the live API result as well
-                from .item_category_map import MAX_CO2E_PER_ITEM
-                co2e = min(co2e, MAX_CO2E_PER_ITEM)
+                co2e = min(co2e, current_factors().max_per_item)
                 return (co2e, "live", fid)
         # 3) Fallback path: if we had sector hints but couldn't find a specific factor,
         #    prefer deterministic category mapping to avoid uniform scores.
@@ -155,8 +145,7 @@ async def estimate_item_footprint(
             if res is not None:
                 co2e, fid = res
                 # Cap the generic factor result as well
-                from .item_category_map import MAX_CO2E_PER_ITEM
-                co2e = min(co2e, MAX_CO2E_PER_ITEM)
+                co2e = min(co2e, current_factors().max_per_item)
                 return (co2e, "live", fid)
         # 4) Final fallback: deterministic mapping
         return (_mock_estimate(name, price, qty, category), "fallback", None)
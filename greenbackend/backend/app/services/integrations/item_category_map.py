@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from typing import Iterable, Optional
 
+# Built-in factor tables: version 0 in services/emission_factors.py, active until a
+# version is published to the emission_factor_versions table. Lookups go through
+# the active version, so tune factors by publishing, not by editing these.
+
 # Category keyword -> kgCO2e per USD (sector-level defaults) - Balanced for 0-30 range
 CATEGORY_KG_CO2E_PER_USD: dict[str, float] = {
     # Very low (Eco++ items: 9-10 score)
@@ -90,17 +94,8 @@ def lookup_kg_co2e_per_usd(name: str, categories: Optional[Iterable[str]] = None
     """Return a best-effort kgCO2e per USD based on categories or name keywords.
 
     Categories, if present, take precedence to ensure sector separation (e.g., transit vs ride share).
+    Uses the active emission-factor version.
     """
-    cats = {c.lower() for c in (categories or [])}
-    for cat_key, val in CATEGORY_KG_CO2E_PER_USD.items():
-        # Match exact token in categories set
-        if cat_key in cats:
-            return val
-
-    # Fall back to name-based hints
-    n = (name or "").lower()
-    for key, val in NAME_KG_CO2E_PER_USD:
-        if key in n:
-            return val
+    from ..emission_factors import current_factors
 
-    return DEFAULT_KG_CO2E_PER_USD
+    return current_factors().match(name or "", categories)[0]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 from typing import List, Optional, TypedDict
@@ -23,8 +24,15 @@ except Exception:
     HAS_CV = False
 
 from ...core.config import get_settings
+from ...core import tracing
+from ...core.metrics import OCR_IN_PROGRESS, track_external
 from .cerebras_client import parse_items_with_cerebras
 
+# Stored on every ReceiptItem. Bump when parse_items_from_text, the Tesseract
+# heuristics or the Cerebras prompt change; `reparse_receipts.py` then re-runs
+# stored receipts whose items carry an older version.
+PARSER_VERSION = "2026.10.1"
+
 
 class ParsedItem(TypedDict, total=False):
     name: str
@@ -52,13 +60,19 @@ async def extract_text(image_bytes: bytes) -> tuple[str, dict]:
     if not settings.use_real_ocr or not settings.google_vision_api_key:
         # Don't call Vision; let caller optionally run local OCR
         return "", {"note": "Vision disabled; consider local OCR"}
+    # Vision calls use blocking `requests`; run them off the event loop
+    return await asyncio.to_thread(_extract_text_vision, image_bytes)
+
 
+def _extract_text_vision(image_bytes: bytes) -> tuple[str, dict]:
+    settings = get_settings()
+    base_url = settings.google_vision_base_url.rstrip("/")
     diagnostics: dict = {}
     session = requests.Session()
     try:
         if _looks_like_pdf(image_bytes):
             # Use files:annotate for PDFs (sync for first few pages)
-            url = f"https://vision.googleapis.com/v1/files:annotate?key={settings.google_vision_api_key}"
+            url = f"{base_url}/v1/files:annotate?key={settings.google_vision_api_key}"
             payload = {
                 "requests": [
                     {
@@ -72,7 +86,9 @@ async def extract_text(image_bytes: bytes) -> tuple[str, dict]:
                     }
                 ]
             }
-            resp = session.post(url, json=payload, timeout=30)
+            with track_external("vision", "files_annotate") as call:
+                resp = session.post(url, json=payload, timeout=30)
+                call["outcome"] = resp.status_code
             diagnostics.update({
                 "last_url": url.split("?")[0],
                 "status_code": resp.status_code,
@@ -104,7 +120,7 @@ async def extract_text(image_bytes: bytes) -> tuple[str, dict]:
             # Fall through to try image path as a fallback
 
         # Image path with DOCUMENT_TEXT_DETECTION
-        url_img = f"https://vision.googleapis.com/v1/images:annotate?key={settings.google_vision_api_key}"
+        url_img = f"{base_url}/v1/images:annotate?key={settings.google_vision_api_key}"
         img_b64 = base64.b64encode(image_bytes).decode("utf-8")
         payload_img = {
             "requests": [
@@ -114,7 +130,9 @@ async def extract_text(image_bytes: bytes) -> tuple[str, dict]:
                 }
             ]
         }
-        resp_img = session.post(url_img, json=payload_img, timeout=20)
+        with track_external("vision", "images_annotate") as call:
+            resp_img = session.post(url_img, json=payload_img, timeout=20)
+            call["outcome"] = resp_img.status_code
         diagnostics.update({
             "last_url": url_img.split("?")[0],
             "status_code": resp_img.status_code,
@@ -133,7 +151,9 @@ async def extract_text(image_bytes: bytes) -> tuple[str, dict]:
                     }
                 ]
             }
-            resp_txt = session.post(url_img, json=payload_txt, timeout=20)
+            with track_external("vision", "images_annotate_text") as call:
+                resp_txt = session.post(url_img, json=payload_txt, timeout=20)
+                call["outcome"] = resp_txt.status_code
             diagnostics.update({
                 "last_url": url_img.split("?")[0] + "#TEXT_DETECTION",
                 "status_code": resp_txt.status_code,
@@ -314,10 +334,26 @@ def parse_items_from_text(text: str) -> List[ParsedItem]:
     return items
 
 
+def _upscale_factor(w: int, h: int) -> float:
+    """Scale for small images before Tesseract (short side to ~900px), capped so the
+    long side stays within RECEIPT_OCR_MAX_SIDE and undoes none of the upload downscale.
+    1.0 means leave the size alone."""
+    short, long_ = min(w, h), max(w, h)
+    if short <= 0 or short >= 900:
+        return 1.0
+    scale = max(1.5, 900.0 / float(short))
+    return max(1.0, min(scale, get_settings().receipt_ocr_max_side / float(long_)))
+
+
 def _preprocess_image_bytes_cv(image_bytes: bytes) -> Optional[Image.Image]:
     """Use OpenCV to enhance image for OCR: grayscale, denoise, adaptive threshold, morphology."""
     if not HAS_CV:
         return None
+    with tracing.span("ocr.preprocess", input_bytes=len(image_bytes)):
+        return _preprocess_cv(image_bytes)
+
+
+def _preprocess_cv(image_bytes: bytes) -> Optional[Image.Image]:
     try:
         data = np.frombuffer(image_bytes, dtype=np.uint8)
         img = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
@@ -325,8 +361,8 @@ def _preprocess_image_bytes_cv(image_bytes: bytes) -> Optional[Image.Image]:
             return None
         # Resize up if small
         h, w = img.shape[:2]
-        if min(h, w) < 900:
-            scale = max(1.5, 900.0 / float(min(h, w)))
+        scale = _upscale_factor(w, h)
+        if scale > 1.0:
             img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_CUBIC)
         # Denoise and enhance edges
         img = cv2.bilateralFilter(img, 9, 75, 75)
@@ -355,14 +391,15 @@ def _local_ocr_image_bytes(image_bytes: bytes) -> str:
             # Resize up for better OCR if small
             try:
                 w, h = img.size
-                if min(w, h) < 900:
-                    scale = max(1.5, 900 / float(min(w, h)))
+                scale = _upscale_factor(w, h)
+                if scale > 1.0:
                     img = img.resize((int(w * scale), int(h * scale)))
             except Exception:
                 pass
             img = ImageOps.autocontrast(img)
             img = img.filter(ImageFilter.SHARPEN)
-        text = pytesseract.image_to_string(img)
+        with track_external("tesseract", "image_to_string"):
+            text = pytesseract.image_to_string(img)
         return text or ""
     except Exception:
         return ""
@@ -387,7 +424,8 @@ def _local_text_from_data(image_bytes: bytes) -> str:
             img = Image.open(BytesIO(image_bytes))
             img = ImageOps.grayscale(img)
             img = ImageOps.autocontrast(img)
-        data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, config='--oem 3 --psm 6')
+        with track_external("tesseract", "image_to_data"):
+            data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, config='--oem 3 --psm 6')
         n = len(data.get("text", []))
         words = []
         for i in range(n):
@@ -423,17 +461,29 @@ def _local_text_from_data(image_bytes: bytes) -> str:
 
 async def parse_receipt_diagnostics(image_bytes: bytes) -> tuple[List[ParsedItem], dict]:
     """Parse receipt items and return diagnostics including parser_used and text_source."""
+    OCR_IN_PROGRESS.inc()
+    try:
+        return await _parse_receipt_diagnostics(image_bytes)
+    finally:
+        OCR_IN_PROGRESS.dec()
+
+
+async def _parse_receipt_diagnostics(image_bytes: bytes) -> tuple[List[ParsedItem], dict]:
     diag: dict = {"parser_used": None, "text_source": None}
     settings = get_settings()
     # First try Google Vision if enabled
     text = ""
     if settings.use_real_ocr and settings.google_vision_api_key:
-        text, _diag = await extract_text(image_bytes)
+        with tracing.span("ocr.vision", input_bytes=len(image_bytes)) as sp:
+            text, _diag = await extract_text(image_bytes)
+            if sp is not None:
+                sp.set("output_chars", len(text))
         diag["text_source"] = "google_vision" if text else None
     # If Vision yielded nothing and it's an image, try local OCR
     if not text and not _looks_like_pdf(image_bytes):
-        local_text = _local_ocr_image_bytes(image_bytes)
-        data_text = _local_text_from_data(image_bytes)
+        with tracing.span("ocr.local", input_bytes=len(image_bytes)):
+            local_text = _local_ocr_image_bytes(image_bytes)
+            data_text = _local_text_from_data(image_bytes)
         # Heuristic: prefer the text with stronger price signal (more decimal prices)
         def price_signal(s: str) -> int:
             import re
@@ -457,7 +507,10 @@ async def parse_receipt_diagnostics(image_bytes: bytes) -> tuple[List[ParsedItem
     # Try Cerebras first
     if text and settings.use_cerebras_parser:
         try:
-            items = parse_items_with_cerebras(text)
+            with tracing.span("parse.cerebras", input_chars=len(text)) as sp:
+                items = parse_items_with_cerebras(text)
+                if sp is not None:
+                    sp.set("items", len(items))
             if items:
                 diag["parser_used"] = "cerebras"
         except Exception as e:
@@ -465,13 +518,17 @@ async def parse_receipt_diagnostics(image_bytes: bytes) -> tuple[List[ParsedItem
             items = []
     # Fallback to regex/text parsing
     if not items:
-        items = parse_items_from_text(text)
+        with tracing.span("parse.regex", input_chars=len(text)) as sp:
+            items = parse_items_from_text(text)
+            if sp is not None:
+                sp.set("items", len(items))
         if items:
             diag["parser_used"] = "regex"
     # If we have few items from text and it's an image, try data-based extraction to capture right-aligned prices
     if (not _looks_like_pdf(image_bytes)) and len(items) < 5 and HAS_LOCAL_OCR:
         try:
-            extra = _local_items_by_tesseract_data(image_bytes)
+            with tracing.span("parse.tesseract_data", input_bytes=len(image_bytes)):
+                extra = _local_items_by_tesseract_data(image_bytes)
             # Merge dedup by (name, price)
             seen = {(it.get("name", "").lower(), round((it.get("price") or 0.0), 2)) for it in items}
             added = 0
@@ -513,7 +570,8 @@ def _local_items_by_tesseract_data(image_bytes: bytes) -> List[ParsedItem]:
             img = Image.open(BytesIO(image_bytes))
             img = ImageOps.grayscale(img)
             img = ImageOps.autocontrast(img)
-        return pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, config=f'--oem 3 --psm {psm}')
+        with track_external("tesseract", "image_to_data"):
+            return pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, config=f'--oem 3 --psm {psm}')
 
     try:
         data = _run_psm(6)
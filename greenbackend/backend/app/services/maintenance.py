@@ -0,0 +1,477 @@
+"""Bulk maintenance jobs over large tables, with bounded memory.
+
+Jobs either stream rows through a server-side cursor (`stream_results` /
+`yield_per`) and write back per chunk, or push the work into set-based SQL
+statements. Either way they commit once per chunk, so an interrupted run keeps
+every chunk committed so far.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import BigInteger, Boolean, Column, Integer, MetaData, Numeric, Table, Text, and_, case, cast, column, delete, func, or_, select, update, values
+
+from ..db.session import SessionLocal, engine
+from ..models.plaid import Transaction
+from ..models.receipt import ReceiptItem
+from .cache import LRUCache
+from .eco_scoring import cashback_rate, is_mixed_merchant, quick_factor_key, quick_merchant_score, score_from_co2e_per_dollar
+from .integrations.climatiq_client import estimate_item_footprint
+from .emission_factors import FactorTable, affected_keys, current_factors
+
+
+async def _gather_limited(keys: Iterable, fn: Callable, limit: int) -> dict:
+    """key -> await fn(key), at most `limit` at a time; exceptions are returned as values."""
+    sem = asyncio.Semaphore(max(1, limit))
+
+    async def _one(key):
+        async with sem:
+            try:
+                return await fn(key)
+            except Exception as e:
+                return e
+
+    keys = list(keys)
+    return dict(zip(keys, await asyncio.gather(*(_one(k) for k in keys))))
+
+
+@dataclass
+class RecalcStats:
+    scanned: int = 0
+    estimated: int = 0  # distinct (name, price, qty) keys sent to the estimator
+    cache_hits: int = 0  # distinct keys per chunk answered from the cache
+    updated: int = 0
+    errors: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def line(self) -> str:
+        rate = self.scanned / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"{self.scanned} items scanned ({rate:,.0f}/s), {self.estimated} estimates, "
+                f"{self.cache_hits} cache hits, {self.updated} updated, {self.errors} errors")
+
+
+async def _estimate_item(key) -> tuple[Decimal, int]:
+    name, price, qty = key
+    est = estimate_item_footprint(name, float(price), qty)
+    res = await est if inspect.isawaitable(est) else est
+    kg = float(res[0] if isinstance(res, tuple) else res)
+    co2_per_dollar = kg / float(price) if float(price) > 0 else 0
+    return Decimal(str(kg)), score_from_co2e_per_dollar(co2_per_dollar)
+
+
+async def recalculate_item_co2(
+    *,
+    chunk_size: int = 5000,
+    concurrency: int = 8,
+    cache_size: int = 100_000,
+    min_change: float = 0.1,
+    dry_run: bool = False,
+    progress: Optional[Callable[[RecalcStats], None]] = None,
+) -> RecalcStats:
+    """Re-estimate kg_co2e and item_score for every named, priced receipt item.
+
+    Items are streamed in chunks of `chunk_size`. Each distinct (name, price, qty)
+    in a chunk that is not already in the LRU cache is estimated once, at most
+    `concurrency` at a time. Rows whose CO2 moved by more than `min_change` kg, or
+    whose score changed, are written with one executemany UPDATE per chunk.
+    """
+    stats = RecalcStats()
+    cache = LRUCache(cache_size)
+    stmt = (
+        select(ReceiptItem.id, ReceiptItem.name, ReceiptItem.price, ReceiptItem.qty,
+               ReceiptItem.kg_co2e, ReceiptItem.item_score)
+        .where(ReceiptItem.name.isnot(None), ReceiptItem.name != "",
+               ReceiptItem.price.isnot(None), ReceiptItem.price != 0)
+        .order_by(ReceiptItem.id)
+    )
+    writer = SessionLocal()
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+            for rows in result.partitions():
+                stats.scanned += len(rows)
+                keys = {(r.name, r.price, r.qty) for r in rows}
+                # Take cached values first: adding this chunk's estimates may evict them
+                values = {k: cache.get(k) for k in keys if k in cache}
+                missing = keys - values.keys()
+                estimates = await _gather_limited(missing, _estimate_item, concurrency)
+                for key, value in estimates.items():
+                    if isinstance(value, Exception):
+                        print(f"[recalc] estimate failed for {key[0]!r}: {value}")
+                        stats.errors += 1
+                    else:
+                        cache.put(key, value)
+                        values[key] = value
+                stats.estimated += len(missing)
+                stats.cache_hits += len(keys) - len(missing)
+
+                changes = []
+                for r in rows:
+                    value = values.get((r.name, r.price, r.qty))
+                    if value is None:
+                        continue
+                    kg, score = value
+                    old = float(r.kg_co2e) if r.kg_co2e is not None else 0.0
+                    if abs(old - float(kg)) > min_change or r.item_score != score:
+                        changes.append({"id": r.id, "kg_co2e": kg, "item_score": score})
+                if changes and not dry_run:
+                    # ORM bulk UPDATE by primary key: one executemany per chunk
+                    writer.execute(update(ReceiptItem), changes)
+                    writer.commit()
+                stats.updated += len(changes)
+                if progress is not None:
+                    progress(stats)
+    finally:
+        writer.close()
+    return stats
+
+
+def receipt_item_co2_stats() -> dict:
+    """MIN/MAX/AVG/COUNT of kg_co2e, plus items over the per-item cap, in one query."""
+    kg = ReceiptItem.kg_co2e
+    cap = current_factors().max_per_item
+    with engine.connect() as conn:
+        row = conn.execute(select(
+            func.count(ReceiptItem.id).label("items"),
+            func.count(kg).label("with_co2"),
+            func.min(kg).label("min"),
+            func.max(kg).label("max"),
+            func.avg(kg).label("avg"),
+            func.sum(case((kg > cap, 1), else_=0)).label("over_cap"),
+        )).one()
+    return {
+        "items": row.items,
+        "with_co2": row.with_co2,
+        "min": float(row.min) if row.min is not None else None,
+        "max": float(row.max) if row.max is not None else None,
+        "avg": float(row.avg) if row.avg is not None else None,
+        "over_cap": int(row.over_cap or 0),
+        "cap": cap,
+    }
+
+
+# (merchant, category text, score, scaled cashback rate, tie direction, mixed merchant, factor key) per distinct pair
+_RESCORE_COLUMNS = (
+    ("m", Text), ("c", Text), ("score", Integer), ("rate", Integer), ("tie", Integer), ("mixed", Boolean), ("key", Text),
+)
+_RATE_SCALE = 10 ** 5
+
+
+def _scaled_rate(score: Optional[int]) -> tuple[int, int]:
+    """cashback_rate(score) as an integer number of 10^-5 units, plus which way it was rounded.
+
+    The rates are 5-decimal values carrying float noise from map_score_to_multiplier
+    (0.0212 is 0.021199999999999999). On any Numeric(12, 2) amount the noise moves
+    amount * rate by less than 10^-5 cents, so it only matters on an exact half-cent
+    tie: it rounds down (-1) or up (1) there, and a clean rate (0) rounds half to even.
+    """
+    exact = cashback_rate(score) * _RATE_SCALE
+    scaled = exact.to_integral_value()
+    # Shifts amount * rate by |cents| * 10^-12 units at most, under one unit for any Numeric(12, 2) amount
+    if abs(exact - scaled) > Decimal("1e-12"):
+        raise ValueError(f"cashback rate {cashback_rate(score)} has more than 5 decimals")
+    return int(scaled), (exact > scaled) - (exact < scaled)
+
+
+def _cashback_sql(amount, rate, tie, sqlite: bool):
+    """compute_cashback(amount, score) in SQL, for a rate and tie from _scaled_rate.
+
+    Integer arithmetic on cents, so SQLite (which stores amounts as floats) and
+    PostgreSQL both give exactly what Decimal.quantize gives in Python.
+    """
+    cents = cast(func.round(amount * 100), BigInteger)
+    scaled = func.abs(cents) * rate  # amount * rate in 10^-5 cents
+    whole = scaled // _RATE_SCALE
+    rest = scaled - whole * _RATE_SCALE
+    rounded = whole + case(
+        (rest * 2 > _RATE_SCALE, 1),
+        (rest * 2 == _RATE_SCALE, case((tie > 0, 1), (tie < 0, 0), else_=whole % 2)),
+        else_=0,
+    )
+    signed = case((cents < 0, -rounded), else_=rounded)
+    return signed / 100.0 if sqlite else cast(signed, Numeric(14, 2)) / 100
+
+
+@dataclass
+class RescoreStats:
+    keys: int = 0  # distinct (merchant_name, category) pairs scored
+    updated: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def _update_by_merchant(
+    build: Callable,
+    *,
+    scope: list,
+    chunk_size: int,
+    dry_run: bool,
+    progress: Optional[Callable[[RescoreStats], None]],
+) -> RescoreStats:
+    """Score each distinct (merchant, category) pair in `scope` and apply `build` per chunk.
+
+    `build(t, v, matched, mixed, cashback)` returns the UPDATE for one chunk: `v` holds
+    the chunk's scored pairs (_RESCORE_COLUMNS), `matched` joins it to the rows, `mixed`
+    is true for rows at a mixed merchant and `cashback` is the quick-score cashback.
+    """
+    stats = RescoreStats()
+    t = Transaction.__table__
+    # The label the routes score by (merchant_name, else name). COALESCE keeps the join a
+    # plain equality, so PostgreSQL can hash it; JSON is compared by its stored text,
+    # read back from the same expression
+    merchant = func.coalesce(t.c.merchant_name, t.c.name)
+    category = func.coalesce(cast(t.c.category, Text), "")
+    with engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        # Distinct pairs are few (merchants x categories), and reading them up front
+        # keeps SQLite from holding a read cursor open across the writes
+        keys = conn.execute(select(merchant, category).where(*scope).distinct()).all()
+        conn.rollback()
+        stats.keys = len(keys)
+        if sqlite:
+            # SQLite has no column list on a VALUES alias; stage each chunk in a temp table instead
+            staged = Table("rescore_keys", MetaData(), *(Column(n, t) for n, t in _RESCORE_COLUMNS), prefixes=["TEMPORARY"])
+            staged.create(conn, checkfirst=True)
+        for start in range(0, len(keys), chunk_size):
+            rows = []
+            for m, c in keys[start:start + chunk_size]:
+                cats = json.loads(c) if c else None
+                score = quick_merchant_score(m, cats)
+                rows.append((m, c, score, *_scaled_rate(score), is_mixed_merchant(m), quick_factor_key(m, cats)))
+            if sqlite:
+                conn.execute(staged.delete())
+                conn.execute(staged.insert(), [dict(zip((n for n, _ in _RESCORE_COLUMNS), r)) for r in rows])
+                v = staged
+            else:
+                v = values(*(column(n, t) for n, t in _RESCORE_COLUMNS), name="v").data(rows)
+            # Only a merchant_name makes a row mixed, as in the routes (is_mixed_merchant(merchant_name))
+            mixed = and_(t.c.merchant_name.isnot(None), v.c.mixed)
+            cashback = _cashback_sql(t.c.amount, v.c.rate, v.c.tie, sqlite)
+            res = conn.execute(build(t, v, and_(merchant == v.c.m, category == v.c.c, *scope), mixed, cashback))
+            stats.updated += res.rowcount
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+            if progress is not None:
+                progress(stats)
+    return stats
+
+
+def rescore_transactions(
+    *,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+    factor_keys: Optional[Iterable[str]] = None,
+    progress: Optional[Callable[[RescoreStats], None]] = None,
+) -> RescoreStats:
+    """Re-apply quick_merchant_score to every transaction, set-based.
+
+    The score depends only on (merchant_name or name, category), so it is computed
+    once per distinct pair. The pairs are then applied `chunk_size` at a time with
+    `UPDATE transactions ... FROM (VALUES ...)`, which also sets cashback,
+    needs_receipt and factor_key (NULL at mixed merchants, which wait for a
+    receipt). Rows that would not change are left alone. Each chunk is committed,
+    or rolled back with `dry_run`. With `factor_keys`, only rows whose stored
+    factor_key is one of them are rescored (see rescore_factor_change).
+
+    Cashback is computed in integer cents (see _cashback_sql) and matches
+    compute_cashback exactly on both PostgreSQL and SQLite.
+    """
+    t = Transaction.__table__
+    scope = []
+    if factor_keys is not None:
+        factor_keys = sorted(factor_keys)
+        if not factor_keys:
+            return RescoreStats()
+        scope.append(t.c.factor_key.in_(factor_keys))
+
+    def build(t, v, matched, mixed, cashback):
+        key = case((mixed, None), else_=v.c.key)
+        return (
+            update(t)
+            .where(matched)
+            .where(or_(
+                t.c.eco_score.is_distinct_from(v.c.score),
+                t.c.cashback_usd.is_distinct_from(cashback),
+                t.c.needs_receipt.is_distinct_from(mixed),
+                t.c.factor_key.is_distinct_from(key),
+            ))
+            .values(eco_score=v.c.score, cashback_usd=cashback, needs_receipt=mixed,
+                    factor_key=key, updated_at=datetime.utcnow())
+        )
+
+    return _update_by_merchant(build, scope=scope, chunk_size=chunk_size, dry_run=dry_run, progress=progress)
+
+
+def backfill_factor_keys(
+    *,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+    progress: Optional[Callable[[RescoreStats], None]] = None,
+) -> RescoreStats:
+    """Set factor_key on quick-scored rows that predate the column, leaving scores alone.
+
+    A row is taken as quick-scored when it has no factor_key and no receipt items, is
+    not at a mixed merchant, and its eco_score is the one the factor table gives its
+    (merchant, category) pair. Receipt-scored rows and estimates that differ from the
+    table (e.g. live Climatiq factors) keep a NULL factor_key, so factor changes
+    never overwrite them.
+    """
+    t = Transaction.__table__
+    scope = [
+        t.c.factor_key.is_(None),
+        t.c.eco_score.isnot(None),
+        ~select(ReceiptItem.id).where(ReceiptItem.transaction_id == t.c.id).exists(),
+    ]
+
+    def build(t, v, matched, mixed, cashback):
+        return (
+            update(t)
+            .where(matched, ~mixed, t.c.eco_score == v.c.score)
+            .values(factor_key=v.c.key)
+        )
+
+    return _update_by_merchant(build, scope=scope, chunk_size=chunk_size, dry_run=dry_run, progress=progress)
+
+
+def rescore_factor_change(
+    old: FactorTable,
+    *,
+    chunk_size: int = 1000,
+    dry_run: bool = False,
+    progress: Optional[Callable[[RescoreStats], None]] = None,
+) -> tuple[set[str], RescoreStats]:
+    """Rescore only the transactions a switch from `old` to the active factor version can change.
+
+    Rows are picked by their stored factor_key (see emission_factors.affected_keys), so
+    a one-keyword tweak touches that keyword's rows instead of the whole table. Rows
+    with no factor_key (receipt-scored, live estimates, mixed merchants) are left
+    alone; see backfill_factor_keys for rows scored before the column was added.
+    """
+    keys = affected_keys(old, current_factors())
+    return keys, rescore_transactions(chunk_size=chunk_size, dry_run=dry_run, factor_keys=keys, progress=progress)
+
+
+def transaction_score_stats() -> dict:
+    """Eco score distribution and total cashback, aggregated in SQL."""
+    with engine.connect() as conn:
+        dist = conn.execute(
+            select(Transaction.eco_score, func.count(), func.sum(Transaction.cashback_usd))
+            .group_by(Transaction.eco_score)
+            .order_by(Transaction.eco_score)
+        ).all()
+    return {
+        "transactions": sum(n for _, n, _ in dist),
+        "distribution": {score: n for score, n, _ in dist},
+        "total_cashback": sum((Decimal(str(c)) for _, _, c in dist if c is not None), Decimal("0")),
+    }
+
+
+@dataclass
+class DeleteStats:
+    matched: int = 0  # rows matching when the run started
+    deleted: int = 0
+    batches: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def line(self) -> str:
+        rate = self.deleted / self.elapsed if self.elapsed > 0 else 0.0
+        return f"{self.deleted}/{self.matched} rows deleted in {self.batches} batches ({rate:,.0f} rows/s)"
+
+
+def count_rows(model, *where) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model).where(*where)).scalar_one()
+
+
+def batched_delete(
+    model,
+    *where,
+    batch_size: int = 5000,
+    dry_run: bool = False,
+    progress: Optional[Callable[[DeleteStats], None]] = None,
+) -> DeleteStats:
+    """Delete rows of `model` matching `where`, `batch_size` rows per committed transaction.
+
+    Each batch is `DELETE ... WHERE id IN (SELECT id ... WHERE id > :last ORDER BY id
+    LIMIT n) RETURNING id`. Continuing from the last deleted id keeps each batch from
+    rescanning rows already checked, and no batch holds more than `batch_size` row locks.
+    Child rows go through the schema's ON DELETE CASCADE (on SQLite the engine turns on
+    PRAGMA foreign_keys for every connection; on partitioned PostgreSQL it is the
+    receipt_items cascade trigger). `dry_run` only counts.
+    """
+    stats = DeleteStats(matched=count_rows(model, *where))
+    if dry_run or not stats.matched:
+        return stats
+    pk = model.id
+    last_id = None
+    with engine.connect() as conn:
+        while True:
+            cond = list(where) + ([pk > last_id] if last_id is not None else [])
+            ids = select(pk).where(*cond).order_by(pk).limit(batch_size).scalar_subquery()
+            deleted = conn.execute(delete(model).where(pk.in_(ids)).returning(pk)).scalars().all()
+            conn.commit()
+            if not deleted:
+                break
+            stats.deleted += len(deleted)
+            stats.batches += 1
+            last_id = max(deleted)
+            if progress is not None:
+                progress(stats)
+    return stats
+
+
+def uncategorized_transactions():
+    """WHERE clause for transactions without a category: SQL NULL, JSON null or []."""
+    return or_(Transaction.category.is_(None), cast(Transaction.category, Text).in_(("[]", "null")))
+
+
+def uncategorized_preview(limit: int = 5) -> tuple[int, int, list]:
+    """(transactions, their receipt items, first `limit` rows) without loading the full set."""
+    cond = uncategorized_transactions()
+    ids = select(Transaction.id).where(cond)
+    with engine.connect() as conn:
+        tx_count = conn.execute(select(func.count()).select_from(Transaction).where(cond)).scalar_one()
+        item_count = conn.execute(
+            select(func.count()).select_from(ReceiptItem).where(ReceiptItem.transaction_id.in_(ids))
+        ).scalar_one()
+        examples = conn.execute(
+            select(Transaction.id, Transaction.merchant_name, Transaction.name, Transaction.amount, Transaction.date)
+            .where(cond)
+            .order_by(Transaction.id)
+            .limit(limit)
+        ).all()
+    return tx_count, item_count, examples
+
+
+def top_categories(limit: int = 10) -> list[tuple[str, int]]:
+    """Most common top-level categories across all categorized transactions."""
+    main = Transaction.category[0].as_string()
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(main.label("category"), func.count().label("n"))
+            .where(main.isnot(None))
+            .group_by(main)
+            .order_by(func.count().desc())
+            .limit(limit)
+        ).all()
+    return [(r.category, r.n) for r in rows]
@@ -0,0 +1,315 @@
+"""Merchant normalization and classification, memoized per merchant.
+
+`merchant_profile(name, categories)` normalizes a merchant (or item) string once and
+derives everything the scoring code asks of it:
+
+- the mixed-merchant flag (stores whose footprint depends on what was bought)
+- the sector hints used to search Climatiq factors, and the search queries
+- the kgCO2e-per-USD factor from the active emission-factor version, and the
+  factor-table entry it came from
+
+Profiles are kept in a bounded LRU cache (MERCHANT_PROFILE_CACHE_SIZE), so
+is_mixed_merchant, quick_merchant_score and the Climatiq client share one cache
+hit per merchant. With MERCHANT_PROFILES_PERSIST=true, each new profile is also
+upserted into the `merchant_profiles` table, and a new process warms its cache
+from the rows written by the current rules. The upserts are queued and written in
+batches by a background thread, so scoring never waits on (or contends with) a
+database write.
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from ..core.config import get_settings
+from .cache import LRUCache
+from .emission_factors import current_factors
+
+logger = logging.getLogger(__name__)
+
+MIXED_MERCHANTS = {"walmart", "target", "amazon", "costco"}
+
+# (name keywords, exact categories, category substrings, Climatiq sector hints).
+# Every matching rule contributes its hints, in this order.
+SECTOR_RULES: list[tuple[tuple[str, ...], tuple[str, ...], tuple[str, ...], tuple[str, ...]]] = [
+    # Ride share / taxi
+    (("uber", "lyft", "ride"), (), ("ride share",),
+     ("taxi services", "ride hailing services", "transportation services")),
+    # Public transit / rail / subway
+    (("mta", "subway", "metro", "amtrak"), ("public transit", "rail"), (),
+     ("public transit services", "rail passenger transport")),
+    # Gasoline / fuel
+    (("shell",), ("gas", "fuel"), (), ("gasoline retail", "petroleum fuel retail")),
+    # Utilities electricity
+    (("utility", "utilities"), ("electric", "utilities"), (), ("electric utilities spend", "electricity services")),
+    # Groceries / retail food
+    (("grocery", "market", "mart", "costco", "h mart", "whole foods", "trader joe"), ("groceries",), (),
+     ("grocery retail", "food retail")),
+    # Coffee shops / restaurants
+    (("starbucks", "chipotle", "mcdonald", "blue bottle"), ("coffee shop", "restaurant", "fast food"), (),
+     ("food services", "coffee shop services")),
+    # Transport rail generic
+    (("amtrak",), (), (), ("rail passenger transport",)),
+]
+
+
+_RULES_HASH = hashlib.sha256(json.dumps([sorted(MIXED_MERCHANTS), SECTOR_RULES]).encode()).hexdigest()[:8]
+
+
+def rules_version() -> str:
+    """Identifies the rules a profile was built with: these rules plus the factor version."""
+    return f"{_RULES_HASH}.{current_factors().version}"
+
+
+@dataclass(frozen=True)
+class MerchantProfile:
+    key: str  # normalized name
+    categories: tuple[str, ...]  # lowercased, sorted, de-duplicated
+    mixed: bool
+    kg_co2e_per_usd: float
+    factor_key: str  # emission_factors key the factor came from
+    sector_hints: tuple[str, ...]
+
+    @property
+    def categories_key(self) -> str:
+        return "|".join(self.categories)
+
+    @property
+    def climatiq_queries(self) -> tuple[str, ...]:
+        """Factor searches to try in order: name plus each sector hint, then the name alone."""
+        return tuple(f"{self.key} {h}" for h in self.sector_hints) + (self.key,)
+
+
+def normalize_merchant(name: Optional[str]) -> str:
+    """Lowercase and collapse whitespace: 'Whole  Foods Market ' -> 'whole foods market'."""
+    return " ".join((name or "").lower().split())
+
+
+def _normalize_categories(categories: Optional[Iterable[str]]) -> tuple[str, ...]:
+    return tuple(sorted({c.lower() for c in (categories or []) if c}))
+
+
+def _sector_hints(key: str, cats: tuple[str, ...]) -> tuple[str, ...]:
+    hints: list[str] = []
+    for names, exact, substrings, rule_hints in SECTOR_RULES:
+        if (
+            any(k in key for k in names)
+            or any(c in cats for c in exact)
+            or any(s in c for s in substrings for c in cats)
+        ):
+            hints += rule_hints
+    return tuple(hints)
+
+
+def build_profile(key: str, cats: tuple[str, ...]) -> MerchantProfile:
+    """Derive a profile from a normalized name and category tuple, bypassing the cache."""
+    factor, factor_key = current_factors().match(key, cats)
+    return MerchantProfile(
+        key=key,
+        categories=cats,
+        mixed=any(m in key for m in MIXED_MERCHANTS),
+        kg_co2e_per_usd=factor,
+        factor_key=factor_key,
+        sector_hints=_sector_hints(key, cats),
+    )
+
+
+_cache: Optional[LRUCache] = None
+_cache_lock = threading.Lock()
+_persist_failed = False
+
+_PERSIST_BATCH = 500
+_PERSIST_INTERVAL = 1.0  # seconds between flushes
+_PERSIST_MAX_BACKOFF = 60.0
+_PERSIST_MAX_PENDING = 10_000
+
+
+def _get_cache() -> LRUCache:
+    global _cache
+    if _cache is None:
+        current_factors()  # load before taking the lock: a version switch clears the cache under it
+        with _cache_lock:
+            if _cache is None:
+                cache = LRUCache(get_settings().merchant_profile_cache_size)
+                if get_settings().merchant_profiles_persist:
+                    _warm(cache)
+                _cache = cache
+    return _cache
+
+
+def merchant_profile(name: Optional[str], categories: Optional[Iterable[str]] = None) -> MerchantProfile:
+    """Cached profile for a merchant (or item) name and its categories."""
+    cache = _get_cache()
+    # Callers repeat the same raw strings, so look those up before normalizing. A raw
+    # key that is already normalized maps to its own profile, so the two can't clash.
+    raw = (name or "", tuple(categories or ()))
+    profile = cache.get(raw)
+    if profile is not None:
+        return profile
+    key, cats = normalize_merchant(name), _normalize_categories(raw[1])
+    profile = cache.get((key, cats))
+    if profile is None:
+        profile = build_profile(key, cats)
+        cache.put((key, cats), profile)
+        if get_settings().merchant_profiles_persist:
+            _persist(profile)
+    cache.put(raw, profile)
+    return profile
+
+
+def profile_cache_stats() -> dict:
+    cache = _get_cache()
+    return {"size": len(cache), "max_size": cache.max_size, "hits": cache.hits, "misses": cache.misses}
+
+
+def clear_profile_cache() -> None:
+    """Drop cached profiles, e.g. after the classification rules changed."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def _warm(cache: LRUCache) -> None:
+    """Fill the cache with persisted profiles from the current rules, newest first."""
+    global _persist_failed
+    from sqlalchemy import select
+
+    from ..db.session import engine
+    from ..models.merchant import MerchantProfileRecord as R
+
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(R.merchant_key, R.categories_key, R.is_mixed, R.kg_co2e_per_usd, R.factor_key, R.sector_hints)
+                .where(R.rules_version == rules_version())
+                .order_by(R.updated_at.desc())
+                .limit(cache.max_size)
+            ).all()
+    except Exception:
+        _persist_failed = True
+        logger.warning("Not using the merchant_profiles table", exc_info=True)
+        return
+    # Oldest first, so the most recent rows end up least likely to be evicted
+    for r in reversed(rows):
+        cats = tuple(r.categories_key.split("|")) if r.categories_key else ()
+        cache.put((r.merchant_key, cats), MerchantProfile(
+            key=r.merchant_key,
+            categories=cats,
+            mixed=bool(r.is_mixed),
+            kg_co2e_per_usd=float(r.kg_co2e_per_usd),
+            factor_key=r.factor_key,
+            sector_hints=tuple(r.sector_hints or ()),
+        ))
+    cache.hits = cache.misses = 0
+
+
+def _persist(profile: MerchantProfile) -> None:
+    """Queue one profile for the background writer; returns at once."""
+    if _persist_failed or len(profile.key) > 255 or len(profile.categories_key) > 255:
+        return
+    _writer.put({
+        "merchant_key": profile.key,
+        "categories_key": profile.categories_key,
+        "rules_version": rules_version(),
+        "is_mixed": profile.mixed,
+        "kg_co2e_per_usd": profile.kg_co2e_per_usd,
+        "factor_key": profile.factor_key,
+        "sector_hints": list(profile.sector_hints),
+        "updated_at": datetime.utcnow(),
+    })
+
+
+def _upsert_profiles(rows: list[dict]) -> None:
+    from ..db.session import engine
+    from ..models.merchant import MerchantProfileRecord
+
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return
+    stmt = insert(MerchantProfileRecord)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["merchant_key", "categories_key"],
+        set_={k: stmt.excluded[k] for k in rows[0] if k not in ("merchant_key", "categories_key")},
+    )
+    with engine.begin() as conn:
+        for i in range(0, len(rows), _PERSIST_BATCH):
+            conn.execute(stmt, rows[i:i + _PERSIST_BATCH])
+
+
+class _ProfileWriter:
+    """Writes queued profile upserts from a daemon thread.
+
+    Rows wait keyed by (merchant_key, categories_key), so a profile queued twice
+    before a flush is written once. A failed flush (e.g. SQLite busy behind a
+    request's open write transaction) is logged and retried with backoff; rows past
+    _PERSIST_MAX_PENDING are dropped, as the table is only a warm-up source.
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+
+    def put(self, row: dict) -> None:
+        key = (row["merchant_key"], row["categories_key"])
+        with self._lock:
+            if len(self._pending) >= _PERSIST_MAX_PENDING and key not in self._pending:
+                return
+            self._pending[key] = row
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name="merchant-profile-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self, stop: threading.Event) -> None:
+        delay = _PERSIST_INTERVAL
+        while not stop.wait(delay):
+            delay = _PERSIST_INTERVAL if self.flush() else min(delay * 2, _PERSIST_MAX_BACKOFF)
+
+    def flush(self) -> bool:
+        """Write everything queued; False if the write failed and the rows were requeued."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return True
+        try:
+            _upsert_profiles(list(batch.values()))
+        except Exception:
+            logger.warning("Could not persist %d merchant profiles; will retry", len(batch), exc_info=True)
+            with self._lock:
+                # Rows queued meanwhile are newer; keep those
+                for key, row in batch.items():
+                    if len(self._pending) < _PERSIST_MAX_PENDING:
+                        self._pending.setdefault(key, row)
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Stop the thread and make a last attempt to write what is queued."""
+        with self._lock:
+            thread, stop = self._thread, self._stop
+            self._thread = self._stop = None
+        if thread is not None:
+            stop.set()
+            thread.join(timeout=10)
+        self.flush()
+
+
+_writer = _ProfileWriter()
+atexit.register(_writer.stop)
+
+
+def shutdown_profile_writer() -> None:
+    """Stop the background writer and write what is still queued."""
+    _writer.stop()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Iterable, Optional
@@ -19,7 +20,10 @@ from plaid.model.sandbox_public_token_create_request import SandboxPublicTokenCr
 
 from ..core.config import get_settings
 from ..core.crypto import encrypt_to_bytes, decrypt_to_str
+from ..core.metrics import PLAID_SYNC_DURATION, PLAID_SYNC_UPSERTED, track_external
 from ..models.plaid import PlaidItem, Transaction
+from .eco_scoring import apply_quick_scores
+from .fingerprint import transaction_fingerprint
 
 
 def _plaid_client() -> plaid_api.PlaidApi:
@@ -30,7 +34,7 @@ def _plaid_client() -> plaid_api.PlaidApi:
         "development": "https://development.plaid.com",
         "production": "https://production.plaid.com",
     }
-    host = host_map.get(env, host_map["sandbox"])
+    host = settings.plaid_base_url.rstrip("/") if settings.plaid_base_url else host_map.get(env, host_map["sandbox"])
 
     config = Configuration(host=host, api_key={'clientId': settings.plaid_client_id, 'secret': settings.plaid_secret})
     api_client = plaid_api.ApiClient(config)
@@ -44,7 +48,8 @@ def exchange_public_token(public_token: str) -> tuple[str, str]:
     """
     client = _plaid_client()
     req = ItemPublicTokenExchangeRequest(public_token=public_token)
-    resp = client.item_public_token_exchange(req)
+    with track_external("plaid", "item_public_token_exchange"):
+        resp = client.item_public_token_exchange(req)
     # resp has access_token and item_id
     return resp.item_id, resp.access_token
 
@@ -88,24 +93,57 @@ def _coerce_date(value) -> date:
 
 
 def _upsert_transactions(db: Session, *, user_id: int, plaid_item_id: Optional[int], txns: Iterable[dict]) -> int:
+    txns = [t for t in txns if t.get("transaction_id")]
+    if not txns:
+        return 0
+    # Resolve the whole page with one IN query instead of a SELECT per row
+    ext_ids = [t["transaction_id"] for t in txns]
+    existing_by_ext = {
+        tx.external_id: tx
+        for tx in db.query(Transaction).filter(Transaction.external_id.in_(ext_ids)).all()
+    }
+    to_score: list[Transaction] = []
     count = 0
     for t in txns:
-        external_id = t.get("transaction_id")
-        if not external_id:
-            continue
-        existing = db.query(Transaction).filter(Transaction.external_id == external_id).first()
+        external_id = t["transaction_id"]
+        existing = existing_by_ext.get(external_id)
         amount_raw = t.get("amount", 0)
         amount = Decimal(str(amount_raw if amount_raw is not None else 0))
+        content_hash = transaction_fingerprint(
+            account_id=t.get("account_id"),
+            date=t.get("date"),
+            name=t.get("name"),
+            merchant_name=t.get("merchant_name"),
+            amount=amount,
+            iso_currency_code=t.get("iso_currency_code"),
+            category=t.get("category"),
+            location=t.get("location"),
+        )
+        if existing and existing.content_hash == content_hash:
+            # Unchanged history: no UPDATE, not counted
+            continue
         if existing:
-            existing.name = t.get("name") or existing.name
+            # Only rows whose scoring inputs changed need a new score. The name counts
+            # too: quick scores fall back to it when there is no merchant_name.
+            name = t.get("name") or existing.name
+            inputs_changed = (
+                existing.merchant_name != t.get("merchant_name")
+                or existing.name != name
+                or existing.amount != amount
+                or existing.category != t.get("category")
+            )
+            existing.name = name
             existing.merchant_name = t.get("merchant_name")
             existing.amount = amount
             existing.iso_currency_code = t.get("iso_currency_code")
             existing.category = t.get("category")
             existing.location = t.get("location")
+            existing.content_hash = content_hash
             db.add(existing)
+            if inputs_changed or (existing.eco_score is None and not existing.needs_receipt):
+                to_score.append(existing)
         else:
-            db.add(Transaction(
+            row = Transaction(
                 user_id=user_id,
                 plaid_item_id=plaid_item_id,
                 external_id=external_id,
@@ -117,8 +155,14 @@ def _upsert_transactions(db: Session, *, user_id: int, plaid_item_id: Optional[i
                 iso_currency_code=t.get("iso_currency_code"),
                 category=t.get("category"),
                 location=t.get("location"),
-            ))
+                content_hash=content_hash,
+            )
+            db.add(row)
+            existing_by_ext[external_id] = row
+            to_score.append(row)
         count += 1
+    # Score this page's added/modified rows so no separate backfill is needed
+    apply_quick_scores(to_score)
     db.commit()
     return count
 
@@ -128,6 +172,18 @@ def fetch_and_store_transactions(db: Session, *, plaid_item: PlaidItem, start_da
 
     Returns number of transactions upserted.
     """
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        total = _sync_transactions(db, plaid_item)
+        outcome = "ok"
+    finally:
+        PLAID_SYNC_DURATION.labels(outcome).observe(time.perf_counter() - t0)
+    PLAID_SYNC_UPSERTED.inc(total)
+    return total
+
+
+def _sync_transactions(db: Session, plaid_item: PlaidItem) -> int:
     client = _plaid_client()
     access_token = decrypt_to_str(plaid_item.access_token_encrypted)
 
@@ -142,7 +198,8 @@ def fetch_and_store_transactions(db: Session, *, plaid_item: PlaidItem, start_da
         if next_cursor is not None:
             req_kwargs["cursor"] = next_cursor
         req = TransactionsSyncRequest(**req_kwargs)
-        resp: TransactionsSyncResponse = client.transactions_sync(req)
+        with track_external("plaid", "transactions_sync"):
+            resp: TransactionsSyncResponse = client.transactions_sync(req)
         added = [t.to_dict() for t in resp.added]
         modified = [t.to_dict() for t in resp.modified]
         removed = [t.to_dict() for t in resp.removed]
@@ -185,7 +242,8 @@ def create_link_token(user_id: int) -> str:
         country_codes=[CountryCode("US")],
         language="en",
     )
-    resp = client.link_token_create(req)
+    with track_external("plaid", "link_token_create"):
+        resp = client.link_token_create(req)
     return resp.link_token
 
 
@@ -201,5 +259,6 @@ def sandbox_create_public_token(institution_id: str = "ins_109508", products: Op
         institution_id=institution_id,
         initial_products=[Products(p) for p in products],
     )
-    resp = client.sandbox_public_token_create(req)
+    with track_external("plaid", "sandbox_public_token_create"):
+        resp = client.sandbox_public_token_create(req)
     return resp.public_token
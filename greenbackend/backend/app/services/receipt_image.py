@@ -0,0 +1,201 @@
+"""Receipt upload ingest: size cap and OCR-sized images.
+
+Starlette spools a multipart upload to a temp file before the route runs, so
+UploadSizeLimitMiddleware turns away requests whose Content-Length is over
+RECEIPT_MAX_UPLOAD_BYTES before the body is read. The handler checks the
+parsed file's size again and then reads that spooled file directly; it is not
+copied. Images are opened from it:
+
+- JPEG uses draft mode, which decodes at 1/2, 1/4 or 1/8 scale straight from
+  the DCT coefficients, so a 12MP photo never materialises at full resolution.
+- Orientation is normalised from EXIF.
+- The image is downscaled to RECEIPT_OCR_DPI when the file records a higher DPI,
+  and to at most RECEIPT_OCR_MAX_SIDE pixels either way.
+- The result is re-encoded as a grayscale JPEG.
+
+Vision and local OCR both get the smaller image. PDFs and unreadable files
+pass through unchanged. The original upload is kept in the blob store (see
+blob_store.py) under its SHA-256.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import BinaryIO, Optional, Union
+
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+
+from ..core import tracing
+from ..core.config import get_settings
+from .blob_store import BlobRef, get_blob_store
+
+try:
+    from PIL import Image, ImageOps
+    HAS_PIL = True
+except Exception:
+    HAS_PIL = False
+
+_CHUNK = 1 << 20
+# Multipart boundaries, part headers and the small form fields around the file
+_MULTIPART_OVERHEAD = 64 * 1024
+UPLOAD_PATHS = ("/receipts/upload",)
+
+
+class ReceiptTooLarge(ValueError):
+    """Upload exceeds receipt_max_upload_bytes or receipt_max_image_pixels."""
+
+
+@dataclass
+class PreparedReceipt:
+    data: bytes  # bytes to OCR: recompressed image, or the original upload
+    original_bytes: int
+    original_width: Optional[int] = None
+    original_height: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    transformed: bool = False
+    sha256: Optional[str] = None  # digest of the original upload
+    blob: Optional[BlobRef] = None  # set when the original was written to the blob store
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware answering 413 for receipt uploads with an oversized Content-Length.
+
+    FastAPI reads the whole multipart body before the route runs, so this is the only
+    place that can refuse a large upload before it is received. Requests without a
+    Content-Length (chunked) are still caught by the size check in prepare_upload.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in UPLOAD_PATHS:
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.max_bytes + _MULTIPART_OVERHEAD:
+                response = JSONResponse({"detail": f"Receipt upload exceeds {self.max_bytes} bytes"}, status_code=413)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def _upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+    return file.file.seek(0, os.SEEK_END)
+
+
+def _sha256_file(f: BinaryIO) -> str:
+    f.seek(0)
+    digest = hashlib.sha256()
+    while chunk := f.read(_CHUNK):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_all(src: Union[str, BinaryIO]) -> bytes:
+    if isinstance(src, str):
+        with open(src, "rb") as f:
+            return f.read()
+    src.seek(0)
+    return src.read()
+
+
+def _target_scale(img, size: tuple[int, int], dpi_target: int, max_side: int) -> float:
+    scale = 1.0
+    dpi = img.info.get("dpi")
+    try:
+        dpi_x = float(dpi[0]) if dpi else 0.0
+    except (TypeError, ValueError, IndexError):
+        dpi_x = 0.0
+    if dpi_x > dpi_target:
+        scale = dpi_target / dpi_x
+    longest = max(size)
+    if longest * scale > max_side:
+        scale = max_side / float(longest)
+    return scale
+
+
+def prepare_image_file(src: Union[str, BinaryIO]) -> PreparedReceipt:
+    """Read an upload (a path or an open binary file) and return OCR-ready bytes
+    (blocking; run in a thread)."""
+    settings = get_settings()
+    if isinstance(src, str):
+        size = os.path.getsize(src)
+        with open(src, "rb") as f:
+            head = f.read(5)
+    else:
+        size = src.seek(0, os.SEEK_END)
+        src.seek(0)
+        head = src.read(5)
+        src.seek(0)
+    if head == b"%PDF-" or not HAS_PIL:
+        return PreparedReceipt(data=_read_all(src), original_bytes=size)
+
+    try:
+        img = Image.open(src)
+    except Image.DecompressionBombError as e:
+        raise ReceiptTooLarge(str(e))
+    except Exception:
+        return PreparedReceipt(data=_read_all(src), original_bytes=size)
+
+    with img:
+        orig_w, orig_h = img.size
+        if orig_w * orig_h > settings.receipt_max_image_pixels:
+            raise ReceiptTooLarge(f"Receipt image is {orig_w}x{orig_h}; limit is {settings.receipt_max_image_pixels} pixels")
+        scale = _target_scale(img, (orig_w, orig_h), settings.receipt_ocr_dpi, settings.receipt_ocr_max_side)
+        orientation = img.getexif().get(0x0112, 1)
+        if scale >= 1.0 and orientation in (None, 1) and img.format == "JPEG" and img.mode == "L":
+            # Already an upright grayscale JPEG of a sensible size: send it as-is
+            return PreparedReceipt(_read_all(src), size, orig_w, orig_h, orig_w, orig_h)
+
+        target = (max(1, int(orig_w * scale)), max(1, int(orig_h * scale)))
+        if img.format == "JPEG":
+            # Decode at the smallest 1/2^n scale that is still >= target
+            img.draft("L", target)
+        out = ImageOps.exif_transpose(img)
+        out = out.convert("L")
+        # exif_transpose may have swapped axes
+        if orientation in (5, 6, 7, 8):
+            target = (target[1], target[0])
+        if out.size != target and (out.size[0] > target[0] or out.size[1] > target[1]):
+            out = out.resize(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        buf = BytesIO()
+        out.save(buf, format="JPEG", quality=settings.receipt_jpeg_quality, optimize=True)
+        data = buf.getvalue()
+        width, height = out.size
+
+    if scale >= 1.0 and orientation in (None, 1) and len(data) >= size:
+        # Re-encoding didn't shrink anything; keep the original bytes
+        return PreparedReceipt(_read_all(src), size, orig_w, orig_h, orig_w, orig_h)
+    return PreparedReceipt(data, size, orig_w, orig_h, width, height, transformed=True)
+
+
+async def prepare_upload(file: UploadFile) -> PreparedReceipt:
+    """Check `file` against the size cap, keep the original in the blob store and
+    return OCR-ready bytes. Works on the file Starlette already spooled."""
+    settings = get_settings()
+    store = get_blob_store()
+    with tracing.span("upload.prepare") as sp:
+        max_bytes = settings.receipt_max_upload_bytes
+        if _upload_size(file) > max_bytes:
+            raise ReceiptTooLarge(f"Receipt upload exceeds {max_bytes} bytes")
+        sha256 = await asyncio.to_thread(_sha256_file, file.file)
+        prepared = await asyncio.to_thread(prepare_image_file, file.file)
+        prepared.sha256 = sha256
+        if store is not None:
+            with tracing.span("blob.put", backend=store.backend) as bsp:
+                prepared.blob = await asyncio.to_thread(store.put_file, file.file, sha256, file.content_type)
+                if bsp is not None:
+                    bsp.set("created", prepared.blob.created)
+        if sp is not None:
+            sp.set("input_bytes", prepared.original_bytes)
+            sp.set("output_bytes", len(prepared.data))
+            sp.set("image_width", prepared.width)
+            sp.set("image_height", prepared.height)
+    return prepared
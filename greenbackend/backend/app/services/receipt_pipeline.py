@@ -0,0 +1,324 @@
+"""Receipt item scoring and offline re-parsing of stored receipts.
+
+`score_items` turns parsed items into scored rows; uploads and the batch re-parse
+share it. `reparse_receipts` drives the batch re-parse:
+
+- It selects transactions whose stored receipt (see blob_store.py) has no items
+  from the current PARSER_VERSION. Receipts the current version already ran on
+  and could not parse (or failed on) are skipped unless `retry_failed=True`;
+  `Transaction.receipt_parser_version` records the last attempt.
+- A process pool fetches each blob, prepares the image, then runs OCR, parsing
+  and footprint estimation.
+- The main process swaps each transaction's items in one DB transaction. The swap
+  is skipped if the user uploaded a different receipt in the meantime.
+
+A run is resumable as-is: finished transactions carry the current version and are
+not selected again. With `force=True` (every stored receipt, whatever its
+version), pass a checkpoint path to resume after the last finished batch.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from multiprocessing import get_context
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, delete, exists, func, insert, or_, select, update
+
+from ..core import tracing
+from ..db.session import SessionLocal
+from ..models.plaid import Transaction
+from ..models.receipt import ReceiptItem
+from .blob_store import BlobNotFound, blob_key, get_blob_store
+from .eco_scoring import compute_cashback, score_from_co2e_per_dollar
+from .integrations.climatiq_client import estimate_item_footprint
+from .integrations.ocr_google_vision import PARSER_VERSION, parse_receipt_diagnostics
+from .receipt_image import prepare_image_file
+
+
+@dataclass
+class ScoredItem:
+    name: str
+    price: Optional[Decimal]
+    qty: Optional[int]
+    kg_co2e: Decimal
+    item_score: int
+
+    def row(self, transaction_id: int) -> dict:
+        return {
+            "transaction_id": transaction_id,
+            "name": self.name,
+            "price": self.price,
+            "qty": self.qty,
+            "kg_co2e": self.kg_co2e,
+            "item_score": self.item_score,
+            "parser_version": PARSER_VERSION,
+        }
+
+
+async def score_items(items: Iterable[dict]) -> tuple[list[ScoredItem], int]:
+    """Estimate each item's footprint and score it; returns (items, transaction eco score).
+
+    The transaction score is the price-weighted mean of item scores, or the plain
+    mean when no item has a price.
+    """
+    scored: list[ScoredItem] = []
+    total_price = Decimal("0")
+    weighted_score_sum = Decimal("0")
+    for it in items:
+        name = it.get("name") or "Unknown"
+        price = it.get("price")
+        qty = it.get("qty")
+        with tracing.span("footprint", item=name[:64]):
+            est = estimate_item_footprint(name, price, qty)
+            res = await est if inspect.isawaitable(est) else est
+        kg = res[0] if isinstance(res, tuple) else res
+        # Score by kgCO2e per dollar if a price is available; otherwise 5
+        if price and price > 0:
+            item_score = score_from_co2e_per_dollar(float(kg) / float(price))
+            p = Decimal(str(price))
+            total_price += p
+            weighted_score_sum += p * Decimal(item_score)
+        else:
+            item_score = 5
+        scored.append(ScoredItem(
+            name=name,
+            price=Decimal(str(price)) if price is not None else None,
+            qty=qty,
+            kg_co2e=Decimal(str(kg)),
+            item_score=item_score,
+        ))
+
+    if total_price > 0:
+        tx_score = int((weighted_score_sum / total_price).quantize(Decimal("1")))
+    else:
+        tx_score = int(sum(s.item_score for s in scored) / len(scored)) if scored else 5
+    return scored, max(0, min(10, tx_score))
+
+
+@dataclass
+class ReparseResult:
+    transaction_id: int
+    sha256: str
+    items: list[ScoredItem] = field(default_factory=list)
+    eco_score: Optional[int] = None
+    parser_used: Optional[str] = None
+    error: Optional[str] = None
+    unparsed: bool = False  # OCR produced nothing usable; existing items are kept
+    seconds: float = 0.0
+
+
+async def _parse_and_score(data: bytes) -> tuple[list[ScoredItem], int, dict]:
+    items, diag = await parse_receipt_diagnostics(data)
+    if diag.get("fallback") == "mock":
+        return [], 0, diag
+    scored, tx_score = await score_items(items)
+    return scored, tx_score, diag
+
+
+def reparse_blob(transaction_id: int, sha256: str) -> ReparseResult:
+    """Worker entry point: fetch a stored receipt, prepare, parse and score it."""
+    t0 = time.perf_counter()
+    result = ReparseResult(transaction_id, sha256)
+    fd, path = tempfile.mkstemp(prefix="reparse-", suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in get_blob_store().open(blob_key(sha256)):
+                out.write(chunk)
+        prepared = prepare_image_file(path)
+        scored, tx_score, diag = asyncio.run(_parse_and_score(prepared.data))
+        result.parser_used = diag.get("parser_used")
+        if scored:
+            result.items, result.eco_score = scored, tx_score
+        else:
+            result.unparsed = True
+    except BlobNotFound:
+        result.error = "blob missing"
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"[:500]
+    finally:
+        os.unlink(path)
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+@dataclass
+class ReparseStats:
+    selected: int = 0
+    done: int = 0
+    reparsed: int = 0
+    items: int = 0
+    unparsed: int = 0
+    failed: int = 0
+    changed: int = 0  # receipt replaced by a new upload while being re-parsed
+    worker_seconds: float = 0.0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def line(self) -> str:
+        elapsed = self.elapsed
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.selected - self.done) / rate if rate > 0 else 0.0
+        return (
+            f"{self.done}/{self.selected} receipts, {rate:.2f}/s, {self.items / elapsed if elapsed > 0 else 0:.1f} items/s, "
+            f"unparsed={self.unparsed} failed={self.failed} changed={self.changed}, eta {eta:.0f}s"
+        )
+
+
+def _stale_filter(force: bool, retry_failed: bool, user_id: Optional[int]):
+    cond = [Transaction.receipt_sha256.isnot(None)]
+    if user_id is not None:
+        cond.append(Transaction.user_id == user_id)
+    if not force:
+        # Items of one transaction are swapped together, so one current row means all are current
+        cond.append(~exists().where(
+            ReceiptItem.transaction_id == Transaction.id,
+            ReceiptItem.parser_version == PARSER_VERSION,
+        ))
+        if not retry_failed:
+            # No current items although this version already ran: unparsed or failed last time
+            cond.append(or_(
+                Transaction.receipt_parser_version.is_(None),
+                Transaction.receipt_parser_version != PARSER_VERSION,
+            ))
+    return and_(*cond)
+
+
+def _swap_items(db, result: ReparseResult, amount: Decimal) -> bool:
+    """Replace a transaction's items and score in one DB transaction; False if its receipt changed."""
+    res = db.execute(
+        update(Transaction)
+        .where(Transaction.id == result.transaction_id, Transaction.receipt_sha256 == result.sha256)
+        .values(
+            eco_score=result.eco_score,
+            needs_receipt=False,
+            cashback_usd=compute_cashback(amount, result.eco_score),
+            factor_key=None,
+            receipt_parser_version=PARSER_VERSION,
+            updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        db.rollback()
+        return False
+    db.execute(delete(ReceiptItem).where(ReceiptItem.transaction_id == result.transaction_id))
+    db.execute(insert(ReceiptItem), [item.row(result.transaction_id) for item in result.items])
+    db.commit()
+    return True
+
+
+def _mark_attempted(db, result: ReparseResult) -> None:
+    """Record that PARSER_VERSION ran on this receipt without a result, so plain runs skip it."""
+    db.execute(
+        update(Transaction)
+        .where(Transaction.id == result.transaction_id, Transaction.receipt_sha256 == result.sha256)
+        .values(receipt_parser_version=PARSER_VERSION)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _load_checkpoint(path: Optional[str], force: bool, retry_failed: bool) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        state = json.load(f)
+    if (
+        state.get("parser_version") != PARSER_VERSION
+        or state.get("force") != force
+        or state.get("retry_failed", False) != retry_failed
+    ):
+        print(f"[reparse] ignoring checkpoint {path}: written for another version or mode")
+        return 0
+    return int(state.get("last_id") or 0)
+
+
+def _save_checkpoint(path: Optional[str], force: bool, retry_failed: bool, last_id: int) -> None:
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"parser_version": PARSER_VERSION, "force": force, "retry_failed": retry_failed, "last_id": last_id}, f)
+    os.replace(tmp, path)
+
+
+def reparse_receipts(
+    *,
+    workers: int = 4,
+    batch_size: int = 200,
+    force: bool = False,
+    retry_failed: bool = False,
+    user_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    checkpoint: Optional[str] = None,
+    report_every: float = 10.0,
+) -> ReparseStats:
+    """Re-parse stored receipts in a process pool; `workers=0` runs inline."""
+    if get_blob_store() is None:
+        raise RuntimeError("Receipt blob store is disabled (RECEIPT_BLOB_STORE_ENABLED=false)")
+    stats = ReparseStats()
+    cond = _stale_filter(force, retry_failed, user_id)
+    last_id = _load_checkpoint(checkpoint, force, retry_failed)
+    db = SessionLocal()
+    # spawn: workers must not inherit the parent's DB connections
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) if workers > 0 else None
+    try:
+        stats.selected = db.execute(select(func.count()).select_from(Transaction).where(cond, Transaction.id > last_id)).scalar_one()
+        if limit is not None:
+            stats.selected = min(stats.selected, limit)
+        print(f"[reparse] parser {PARSER_VERSION}: {stats.selected} receipts to process"
+              f"{f' (resuming after id {last_id})' if last_id else ''}")
+        last_report = time.perf_counter()
+        while stats.done < stats.selected:
+            n = min(batch_size, stats.selected - stats.done)
+            rows = db.execute(
+                select(Transaction.id, Transaction.receipt_sha256, Transaction.amount)
+                .where(cond, Transaction.id > last_id)
+                .order_by(Transaction.id)
+                .limit(n)
+            ).all()
+            db.rollback()  # don't hold a read transaction open while the batch runs
+            if not rows:
+                break
+            amounts = {r.id: r.amount for r in rows}
+            if pool is not None:
+                results = (f.result() for f in as_completed([pool.submit(reparse_blob, r.id, r.receipt_sha256) for r in rows]))
+            else:
+                results = (reparse_blob(r.id, r.receipt_sha256) for r in rows)
+            for res in results:
+                stats.done += 1
+                stats.worker_seconds += res.seconds
+                if res.error:
+                    stats.failed += 1
+                    print(f"[reparse] transaction {res.transaction_id}: {res.error}")
+                    _mark_attempted(db, res)
+                elif res.unparsed:
+                    stats.unparsed += 1
+                    _mark_attempted(db, res)
+                elif _swap_items(db, res, amounts[res.transaction_id]):
+                    stats.reparsed += 1
+                    stats.items += len(res.items)
+                else:
+                    stats.changed += 1
+                if time.perf_counter() - last_report >= report_every:
+                    print(f"[reparse] {stats.line()}")
+                    last_report = time.perf_counter()
+            last_id = rows[-1].id
+            _save_checkpoint(checkpoint, force, retry_failed, last_id)
+    finally:
+        db.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return stats
@@ -0,0 +1,267 @@
+"""Deterministic synthetic data for load testing.
+
+Rows are generated in memory from a seeded RNG and written in large batches:
+COPY on PostgreSQL (psycopg), executemany elsewhere. Ids are assigned up front
+so receipt items can reference their transaction without a round trip per row.
+The same seed, users, days and mix always produce the same rows.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Iterator, Optional
+
+import orjson
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from ..core.security import hash_password
+from ..models.plaid import Transaction
+from ..models.receipt import ReceiptItem
+from ..models.user import User
+from .eco_scoring import compute_cashback, is_mixed_merchant, quick_factor_key, quick_merchant_score, score_from_co2e_per_dollar
+from .emission_factors import current_factors
+from .integrations.item_category_map import lookup_kg_co2e_per_usd
+
+# (merchant, name suffix, base amount, categories) per spend class
+MERCHANTS = {
+    "green": [
+        ("CATA Bus", "Public Transit", 2.75, ["Travel", "Public Transit"]),
+        ("SEPTA", "Transit", 2.50, ["Travel", "Public Transit"]),
+        ("EVgo", "EV Charging", 8.50, ["Auto", "Electric Charging"]),
+        ("Local Farmers Market", "Organic Produce", 22.0, ["Shops", "Groceries", "Organic"]),
+        ("Local Bike Shop", "Bike Repair", 18.0, ["Shops", "Sports", "Bicycle"]),
+        ("Goodwill", "Second-hand", 12.0, ["Shops", "Thrift"]),
+        ("Amtrak", "Rail", 45.0, ["Travel", "Rail"]),
+    ],
+    "neutral": [
+        ("Walgreens", "Pharmacy", 14.0, ["Health", "Pharmacy"]),
+        ("PG&E", "Utilities", 65.0, ["Bills", "Utilities", "Electric"]),
+        ("Apple", "Apps", 4.99, ["Digital", "Apps"]),
+        ("Starbucks", "Coffee", 5.25, ["Food and Drink", "Coffee Shop"]),
+        ("Whole Foods Market", "Groceries", 38.0, ["Shops", "Groceries"]),
+        ("Sweetgreen", "Salad", 13.0, ["Food and Drink", "Restaurant"]),
+    ],
+    "impact": [
+        ("Shell", "Gasoline", 42.0, ["Auto", "Gas"]),
+        ("United Airlines", "Flight", 280.0, ["Travel", "Air"]),
+        ("Uber", "Ride", 13.0, ["Travel", "Ride Share"]),
+        ("Lyft", "Ride", 12.0, ["Travel", "Ride Share"]),
+        ("McDonald's", "Fast Food", 9.0, ["Food", "Fast Food"]),
+    ],
+    # Mixed retailers: scored from receipt items when a receipt is generated
+    "mixed": [
+        ("Walmart", "Superstore", 63.0, ["Shops", "Retail", "Superstore"]),
+        ("Target", "Household", 28.0, ["Shops", "Retail"]),
+        ("Costco", "Wholesale", 84.0, ["Shops", "Wholesale"]),
+        ("Amazon", "Online", 35.0, ["Shops", "Online"]),
+    ],
+}
+
+# (item name, base unit price)
+RECEIPT_ITEMS = [
+    ("Bananas", 1.29), ("Apples", 3.99), ("Spinach", 2.99), ("Milk", 3.49), ("Eggs", 4.29),
+    ("Ground Beef", 9.99), ("Chicken Breast", 7.99), ("Salmon", 12.99), ("Rice", 5.49),
+    ("Pasta", 1.99), ("Bread", 3.29), ("Cheese", 5.99), ("Paper Towels", 11.99),
+    ("Laundry Detergent", 13.49), ("Batteries", 9.99), ("Shampoo", 6.49), ("Coffee Beans", 10.99),
+    ("Tofu", 2.79), ("Frozen Pizza", 6.99), ("Soda 12-pack", 7.49),
+]
+
+DEFAULT_MIX = {"green": 0.25, "neutral": 0.40, "impact": 0.20, "mixed": 0.15}
+
+_TX_COLUMNS = [
+    "id", "user_id", "plaid_item_id", "external_id", "account_id", "date", "name", "merchant_name",
+    "amount", "iso_currency_code", "category", "location", "eco_score", "cashback_usd",
+    "needs_receipt", "factor_key", "content_hash", "created_at", "updated_at",
+]
+_ITEM_COLUMNS = ["id", "transaction_id", "name", "price", "qty", "kg_co2e", "item_score", "created_at"]
+_JSON_COLUMNS = {"category", "location"}
+
+
+@dataclass
+class SeedConfig:
+    users: int = 10
+    days: int = 90
+    seed: int = 42
+    tx_per_day: float = 3.0  # mean transactions per user per day
+    receipt_ratio: float = 0.5  # share of mixed-merchant transactions that get receipt items
+    mix: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    email_prefix: str = "load_user"
+    end_date: Optional[date] = None
+    batch_size: int = 20_000
+
+    def external_prefix(self) -> str:
+        return f"load-{self.seed}-"
+
+
+@dataclass
+class SeedStats:
+    users_created: int = 0
+    transactions: int = 0
+    receipt_items: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.transactions + self.receipt_items
+        return rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _ensure_users(conn: Connection, cfg: SeedConfig) -> list[int]:
+    emails = [f"{cfg.email_prefix}+{i}@example.com" for i in range(1, cfg.users + 1)]
+    existing = dict(conn.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+    missing = [(i, e) for i, e in enumerate(emails, start=1) if e not in existing]
+    if missing:
+        hashed = hash_password("password123")  # one hash shared by every seeded user
+        conn.execute(User.__table__.insert(), [
+            {"email": e, "hashed_password": hashed, "full_name": f"Load User {i}"} for i, e in missing
+        ])
+        existing.update(conn.execute(
+            select(User.email, User.id).where(User.email.in_([e for _, e in missing]))
+        ).all())
+    return [existing[e] for e in emails]
+
+
+def _generate(cfg: SeedConfig, user_ids: list[int], next_tx_id: int, next_item_id: int) -> Iterator[tuple[list, list]]:
+    """Yield (transaction rows, receipt item rows) batches as column-ordered tuples."""
+    rng = random.Random(cfg.seed)
+    classes = [c for c in cfg.mix if cfg.mix[c] > 0 and c in MERCHANTS]
+    cum_weights = list(itertools.accumulate(cfg.mix[c] for c in classes))
+    mixed = {m[0]: is_mixed_merchant(m[0]) for group in MERCHANTS.values() for m in group}
+    end = cfg.end_date or date.today()
+    start = end - timedelta(days=cfg.days - 1)
+    now = datetime.utcnow()
+    prefix = cfg.external_prefix()
+
+    score_cache: dict[tuple, tuple[int, str]] = {}
+    item_cache: dict[str, float] = {}
+    max_per_item = current_factors().max_per_item
+    tx_rows: list[tuple] = []
+    item_rows: list[tuple] = []
+
+    for u_idx, user_id in enumerate(user_ids, start=1):
+        n = 0
+        for d in range(cfg.days):
+            tx_date = start + timedelta(days=d)
+            count = max(0, int(rng.gauss(cfg.tx_per_day, cfg.tx_per_day / 3) + 0.5))
+            for _ in range(count):
+                cls = rng.choices(classes, cum_weights=cum_weights)[0]
+                merchant, suffix, base_amt, cats = rng.choice(MERCHANTS[cls])
+                # Weekends shift some green spend to the impact class
+                if tx_date.weekday() >= 5 and cls == "green" and rng.random() < 0.3:
+                    merchant, suffix, base_amt, cats = rng.choice(MERCHANTS["impact"])
+                amount = Decimal(str(round(base_amt * rng.uniform(0.6, 1.6), 2)))
+                n += 1
+                tx_id = next_tx_id
+                next_tx_id += 1
+
+                needs_receipt, eco_score, factor_key = False, None, None
+                if mixed[merchant]:
+                    needs_receipt = True
+                    if rng.random() < cfg.receipt_ratio:
+                        total_price, weighted = Decimal("0"), Decimal("0")
+                        for _ in range(rng.randint(2, 8)):
+                            item, unit = rng.choice(RECEIPT_ITEMS)
+                            price = Decimal(str(round(unit * rng.uniform(0.8, 1.3), 2)))
+                            factor = item_cache.get(item)
+                            if factor is None:
+                                factor = item_cache[item] = lookup_kg_co2e_per_usd(item)
+                            kg = min(factor * float(price), max_per_item)
+                            item_score = score_from_co2e_per_dollar(kg / float(price))
+                            item_rows.append((next_item_id, tx_id, item, price, rng.randint(1, 3),
+                                              Decimal(str(round(kg, 6))), item_score, now))
+                            next_item_id += 1
+                            total_price += price
+                            weighted += price * item_score
+                        eco_score = max(0, min(10, int((weighted / total_price).quantize(Decimal("1")))))
+                        needs_receipt = False
+                else:
+                    key = (merchant, tuple(cats))
+                    cached = score_cache.get(key)
+                    if cached is None:
+                        cached = score_cache[key] = (quick_merchant_score(merchant, cats), quick_factor_key(merchant, cats))
+                    eco_score, factor_key = cached
+
+                tx_rows.append((
+                    tx_id, user_id, None, f"{prefix}{u_idx}-{n}", "load-account", tx_date,
+                    f"{merchant} {suffix}", merchant, amount, "USD", cats, None, eco_score,
+                    compute_cashback(amount, eco_score), needs_receipt, factor_key, None, now, now,
+                ))
+                if len(tx_rows) >= cfg.batch_size:
+                    yield tx_rows, item_rows
+                    tx_rows, item_rows = [], []
+    if tx_rows:
+        yield tx_rows, item_rows
+
+
+def _copy_rows(conn: Connection, table: str, columns: list[str], rows: list[tuple]) -> None:
+    json_idx = [i for i, c in enumerate(columns) if c in _JSON_COLUMNS]
+    cursor = conn.connection.driver_connection.cursor()
+    with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        for row in rows:
+            if json_idx:
+                row = list(row)
+                for i in json_idx:
+                    if row[i] is not None:
+                        row[i] = orjson.dumps(row[i]).decode()
+            copy.write_row(row)
+
+
+def _insert_rows(conn: Connection, table, columns: list[str], rows: list[tuple]) -> None:
+    conn.execute(table.insert(), [dict(zip(columns, r)) for r in rows])
+
+
+def _use_copy(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg"
+
+
+def seed(eng: Engine, cfg: SeedConfig, progress: Optional[Callable[[SeedStats], None]] = None) -> SeedStats:
+    """Create the configured users and their transactions/receipt items; one transaction per batch.
+
+    Refuses to run twice for the same seed (external_ids would collide); delete the
+    `load-<seed>-` rows or pick another seed.
+    """
+    stats = SeedStats()
+    started = time.perf_counter()
+    with eng.begin() as conn:
+        taken = conn.execute(
+            select(Transaction.id).where(Transaction.external_id.like(f"{cfg.external_prefix()}%")).limit(1)
+        ).first()
+        if taken:
+            raise ValueError(f"Seed {cfg.seed} was already loaded (external_id prefix '{cfg.external_prefix()}')")
+        before = conn.execute(select(func.count()).select_from(User.__table__)).scalar()
+        user_ids = _ensure_users(conn, cfg)
+        stats.users_created = conn.execute(select(func.count()).select_from(User.__table__)).scalar() - before
+        next_tx_id = (conn.execute(select(func.max(Transaction.id))).scalar() or 0) + 1
+        next_item_id = (conn.execute(select(func.max(ReceiptItem.id))).scalar() or 0) + 1
+
+    for tx_rows, item_rows in _generate(cfg, user_ids, next_tx_id, next_item_id):
+        with eng.begin() as conn:
+            if _use_copy(conn):
+                _copy_rows(conn, "transactions", _TX_COLUMNS, tx_rows)
+                if item_rows:
+                    _copy_rows(conn, "receipt_items", _ITEM_COLUMNS, item_rows)
+            else:
+                _insert_rows(conn, Transaction.__table__, _TX_COLUMNS, tx_rows)
+                if item_rows:
+                    _insert_rows(conn, ReceiptItem.__table__, _ITEM_COLUMNS, item_rows)
+        stats.transactions += len(tx_rows)
+        stats.receipt_items += len(item_rows)
+        stats.seconds = time.perf_counter() - started
+        if progress:
+            progress(stats)
+
+    if eng.dialect.name == "postgresql":
+        # Ids were assigned explicitly; move the sequences past them
+        with eng.begin() as conn:
+            for table in ("transactions", "receipt_items"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"GREATEST((SELECT COALESCE(MAX(id), 0) FROM {table}), 1))"
+                ))
+    stats.seconds = time.perf_counter() - started
+    return stats
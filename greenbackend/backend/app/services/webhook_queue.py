@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from ..core.config import get_settings
+from ..core.metrics import PLAID_SYNC_QUEUE
+from ..db.session import SessionLocal
+from .plaid_service import sync_by_item_id
+
+logger = logging.getLogger(__name__)
+
+
+def _sync_item(item_id: str) -> int:
+    # Each sync gets its own session; the webhook request's session is long gone
+    with SessionLocal() as db:
+        return sync_by_item_id(db, item_id)
+
+
+class CoalescingSyncQueue:
+    """Debounced, per-item deduplicating queue of Plaid syncs.
+
+    - A webhook for an item that is already waiting is merged into the waiting entry.
+    - A webhook for an item that is currently syncing schedules exactly one follow-up sync,
+      so updates that land mid-sync are not lost.
+    - Items become ready `debounce` seconds after their first webhook and are drained
+      by `workers` tasks; the blocking sync runs in a thread.
+    """
+
+    def __init__(self, *, debounce: float, workers: int, sync_fn: Callable[[str], int] = _sync_item):
+        self.debounce = max(0.0, debounce)
+        self.workers = max(1, workers)
+        self._sync_fn = sync_fn
+        self._pending: set[str] = set()
+        self._in_flight: set[str] = set()
+        self._rerun: set[str] = set()
+        self._ready: Optional[asyncio.Queue[str]] = None
+        self._tasks: list[asyncio.Task] = []
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self.stats_counters = {"received": 0, "coalesced": 0, "synced": 0, "failed": 0, "upserted": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"plaid-sync-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for h in self._timers.values():
+            h.cancel()
+        self._timers.clear()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
+        # Whatever was waiting or syncing is dropped with the workers; left in these sets,
+        # those items would be reported "coalesced" after a restart and never sync again
+        self._pending.clear()
+        self._in_flight.clear()
+        self._rerun.clear()
+
+    def enqueue(self, item_id: str) -> str:
+        """Register a webhook for `item_id`. Returns 'queued' or 'coalesced'."""
+        if not self.running:
+            self.start()
+        self.stats_counters["received"] += 1
+        if item_id in self._pending:
+            self.stats_counters["coalesced"] += 1
+            return "coalesced"
+        if item_id in self._in_flight:
+            if item_id in self._rerun:
+                self.stats_counters["coalesced"] += 1
+                return "coalesced"
+            self._rerun.add(item_id)
+            return "queued"
+        self._schedule(item_id)
+        return "queued"
+
+    def _schedule(self, item_id: str) -> None:
+        self._pending.add(item_id)
+        self._timers[item_id] = asyncio.get_running_loop().call_later(self.debounce, self._mark_ready, item_id)
+
+    def _mark_ready(self, item_id: str) -> None:
+        self._timers.pop(item_id, None)
+        if self._ready is not None:
+            self._ready.put_nowait(item_id)
+
+    async def _worker(self) -> None:
+        assert self._ready is not None
+        while True:
+            item_id = await self._ready.get()
+            self._pending.discard(item_id)
+            self._in_flight.add(item_id)
+            try:
+                upserted = await asyncio.to_thread(self._sync_fn, item_id)
+                self.stats_counters["synced"] += 1
+                self.stats_counters["upserted"] += int(upserted or 0)
+            except Exception:
+                self.stats_counters["failed"] += 1
+                logger.exception("Plaid sync for item %s failed", item_id)
+            finally:
+                self._in_flight.discard(item_id)
+                self._ready.task_done()
+            if item_id in self._rerun:
+                self._rerun.discard(item_id)
+                self._schedule(item_id)
+
+    async def drain(self) -> None:
+        """Wait until nothing is pending or syncing (used by tests/benchmarks)."""
+        while self._pending or self._in_flight or self._rerun:
+            await asyncio.sleep(0.01)
+
+    def stats(self) -> dict:
+        return {
+            "debounce_seconds": self.debounce,
+            "workers": self.workers,
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            **self.stats_counters,
+        }
+
+
+_settings = get_settings()
+sync_queue = CoalescingSyncQueue(
+    debounce=_settings.plaid_webhook_debounce_seconds,
+    workers=_settings.plaid_webhook_workers,
+)
+PLAID_SYNC_QUEUE.labels("pending").set_function(lambda: len(sync_queue._pending))
+PLAID_SYNC_QUEUE.labels("in_flight").set_function(lambda: len(sync_queue._in_flight))
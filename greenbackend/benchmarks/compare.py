@@ -0,0 +1,49 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare OLD.json NEW.json [--threshold 10]
+
+Exits with status 1 when any p50/p95 latency grows, or throughput drops, by more
+than the threshold percentage.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+
+def _pct(old: float, new: float) -> float:
+    return (new - old) / old * 100.0 if old else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    print(f"old: {old['meta'].get('commit')} {old['meta'].get('label', '')}  "
+          f"new: {new['meta'].get('commit')} {new['meta'].get('label', '')}")
+
+    regressions = 0
+    for suite in ("micro", "macro"):
+        for name in sorted(set(old.get(suite, {})) & set(new.get(suite, {}))):
+            o, n = old[suite][name], new[suite][name]
+            p50, p95 = _pct(o["p50_ms"], n["p50_ms"]), _pct(o["p95_ms"], n["p95_ms"])
+            thr = _pct(o["throughput_per_s"], n["throughput_per_s"])
+            bad = p50 > args.threshold or p95 > args.threshold or thr < -args.threshold
+            regressions += bad
+            print(f"{'!!' if bad else '  '} {suite:<5} {name:<30} p50 {p50:+7.1f}%  p95 {p95:+7.1f}%  "
+                  f"throughput {thr:+7.1f}%")
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0f}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Macro load scenarios: concurrent HTTP traffic against a live uvicorn server.
+
+The server runs in-process (so the stubs apply) on a random local port; clients
+are a thread pool of `requests` sessions.
+"""
+from __future__ import annotations
+
+import io
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import requests
+
+from .stats import summarize
+from .stubs import RECEIPT_BYTES
+
+
+class LiveServer:
+    def __init__(self, app):
+        import uvicorn
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 30
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("benchmark server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = _local.session = requests.Session()
+    return s
+
+
+def _load(op: Callable[[requests.Session, int], requests.Response], total: int, concurrency: int) -> dict:
+    """Run `op` `total` times across `concurrency` threads; non-2xx responses count as errors."""
+    samples: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            ok = op(_session(), i).ok
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - t0
+        with lock:
+            if ok:
+                samples.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    out = summarize(samples, time.perf_counter() - started, errors=errors)
+    out["concurrency"] = concurrency
+    return out
+
+
+def _csv_body(user_id: int, i: int, rows: int) -> bytes:
+    lines = ["date,name,merchant_name,amount,external_id,category"]
+    rng = random.Random(i)
+    for n in range(rows):
+        merchant = rng.choice(["Uber", "Starbucks", "Shell", "Target", "SEPTA"])
+        lines.append(f"2026-0{rng.randint(1, 9)}-1{rng.randint(0, 9)},{merchant},{merchant},"
+                     f"{rng.uniform(2, 90):.2f},bench-csv-{user_id}-{i}-{n},Shops")
+    return "\n".join(lines).encode()
+
+
+def run(ctx: dict, requests_per_scenario: int, concurrency: int) -> dict:
+    """`ctx` carries base_url, users (ids), token, receipt_tx_ids and plaid items from run.py."""
+    base = ctx["base_url"]
+    users = ctx["users"]
+    auth = {"Authorization": f"Bearer {ctx['token']}"}
+    receipt_ids = ctx["receipt_tx_ids"]
+    items = ctx["plaid_items"]  # [(user_id, item_id)]
+    n = requests_per_scenario
+
+    def list_tx(s, i):
+        return s.get(f"{base}/transactions/", params={"user_id": users[i % len(users)], "limit": 200})
+
+    def upload_receipt(s, i):
+        return s.post(
+            f"{base}/receipts/upload",
+            data={"transaction_id": receipt_ids[i % len(receipt_ids)]},
+            files={"file": ("receipt.pdf", io.BytesIO(RECEIPT_BYTES), "application/pdf")},
+            headers=auth,
+        )
+
+    def upload_csv(s, i):
+        uid = users[i % len(users)]
+        return s.post(
+            f"{base}/transactions/upload_csv",
+            data={"user_id": uid},
+            files={"file": ("tx.csv", io.BytesIO(_csv_body(uid, i, 200)), "text/csv")},
+        )
+
+    # Syncs of one item are serialized, as the webhook queue does in production
+    item_locks = [threading.Lock() for _ in items]
+
+    def plaid_sync(s, i):
+        idx = i % len(items)
+        uid, item_id = items[idx]
+        with item_locks[idx]:
+            return s.post(f"{base}/plaid/sync", params={"user_id": uid, "item_id": item_id})
+
+    results = {
+        "list_transactions": _load(list_tx, n, concurrency),
+        "upload_receipt": _load(upload_receipt, min(n, len(receipt_ids)), concurrency),
+        "upload_csv_200_rows": _load(upload_csv, max(1, n // 5), concurrency),
+        "plaid_sync": _load(plaid_sync, max(len(items), n // 10), min(concurrency, len(items))),
+    }
+
+    # Mixed traffic: mostly reads with uploads and syncs interleaved
+    ops = [list_tx] * 7 + [upload_receipt, upload_csv, plaid_sync]
+    results["mixed"] = _load(lambda s, i: ops[i % len(ops)](s, i), n, concurrency)
+    return results
@@ -0,0 +1,57 @@
+"""Micro-benchmarks: pure functions on the hot paths, no database or HTTP."""
+from __future__ import annotations
+
+import itertools
+from decimal import Decimal
+from types import SimpleNamespace
+
+from .stats import time_calls
+from .stubs import RECEIPT_TEXT
+
+_NAMES = [
+    ("Uber", ["Travel", "Ride Share"]), ("Starbucks", ["Food and Drink", "Coffee Shop"]),
+    ("Shell", ["Auto", "Gas"]), ("Whole Foods Market", ["Shops", "Groceries"]),
+    ("Ground Beef", None), ("Bananas", None), ("Paper Towels", None), ("SEPTA", ["Travel", "Public Transit"]),
+]
+
+
+def run(iterations: int) -> dict:
+    from backend.app.services.eco_scoring import (
+        apply_quick_scores,
+        compute_cashback,
+        quick_merchant_score,
+        score_from_co2e_per_dollar,
+    )
+    from backend.app.services.fingerprint import transaction_fingerprint
+    from backend.app.services.integrations.item_category_map import lookup_kg_co2e_per_usd
+    from backend.app.services.integrations.ocr_google_vision import parse_items_from_text
+
+    names = itertools.cycle(_NAMES)
+    values = itertools.cycle([0.01, 0.12, 0.4, 0.95, 2.5])
+    amounts = itertools.cycle([Decimal("4.75"), Decimal("63.18"), Decimal("1200.00")])
+
+    def batch_rows():
+        return [
+            SimpleNamespace(merchant_name=n, name=n, category=c, amount=Decimal("12.50"),
+                            eco_score=None, needs_receipt=False, cashback_usd=None)
+            for n, c in itertools.islice(itertools.cycle(_NAMES), 1000)
+        ]
+
+    results = {
+        "parse_items_from_text": time_calls(lambda: parse_items_from_text(RECEIPT_TEXT), iterations, warmup=10),
+        "lookup_kg_co2e_per_usd": time_calls(lambda: lookup_kg_co2e_per_usd(*next(names)), iterations * 10, warmup=100),
+        "quick_merchant_score": time_calls(lambda: quick_merchant_score(*next(names)), iterations * 10, warmup=100),
+        "score_from_co2e_per_dollar": time_calls(lambda: score_from_co2e_per_dollar(next(values)), iterations * 10),
+        "compute_cashback": time_calls(lambda: compute_cashback(next(amounts), 7), iterations * 10),
+        "transaction_fingerprint": time_calls(
+            lambda: transaction_fingerprint(
+                user_id=1, date="2026-01-02", name="Uber", merchant_name="Uber", amount=next(amounts),
+                iso_currency_code="USD", category=["Travel", "Ride Share"], location={"country": "USA"},
+            ),
+            iterations * 10,
+        ),
+    }
+    rows = [batch_rows() for _ in range(max(1, iterations // 20))]
+    it = iter(rows)
+    results["apply_quick_scores_1000_rows"] = time_calls(lambda: apply_quick_scores(next(it)), len(rows))
+    return results
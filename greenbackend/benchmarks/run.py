@@ -0,0 +1,188 @@
+"""Run the benchmark suite and write the results as JSON.
+
+    cd greenbackend
+    python -m benchmarks.run                 # micro + macro, full size
+    python -m benchmarks.run --quick         # smaller run for a fast check
+    python -m benchmarks.run --suite micro
+    python -m benchmarks.run --fakes         # external calls go over HTTP to fake_services
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Runs against a throwaway SQLite database with stubbed Plaid, Vision and
+Cerebras calls (see stubs.py); Climatiq uses its built-in offline estimator.
+With --fakes the real clients are used instead, talking to the local
+fake_services servers, so HTTP overhead and the live Climatiq path are measured.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _configure_env(args, workdir: str, fakes_url: str | None = None) -> None:
+    # Must run before the app is imported: settings are read once and cached
+    from cryptography.fernet import Fernet
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+    os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+    os.environ["USE_REAL_OCR"] = "true"
+    os.environ["GOOGLE_VISION_API_KEY"] = "stub"
+    os.environ["USE_REAL_CLIMATIQ"] = "false"
+    os.environ["USE_CEREBRAS_PARSER"] = "true" if args.cerebras else "false"
+    os.environ["CEREBRAS_API_KEY"] = "stub"
+    os.environ["DEBUG"] = "false"
+    if fakes_url:
+        os.environ["PLAID_CLIENT_ID"] = os.environ["PLAID_SECRET"] = "stub"
+        os.environ["PLAID_BASE_URL"] = f"{fakes_url}/plaid"
+        os.environ["GOOGLE_VISION_BASE_URL"] = f"{fakes_url}/vision"
+        os.environ["CEREBRAS_BASE_URL"] = f"{fakes_url}/cerebras"
+        os.environ["CLIMATIQ_BASE_URL"] = f"{fakes_url}/climatiq"
+        os.environ["USE_REAL_CLIMATIQ"] = "true"
+        os.environ["CLIMATIQ_API_KEY"] = "stub"
+
+
+def _prepare_db(args) -> dict:
+    from sqlalchemy import select
+
+    import backend.app.models  # noqa: F401
+    import backend.app.models.receipt  # noqa: F401
+    from backend.app.db.base import Base
+    from backend.app.db.session import SessionLocal, engine
+    from backend.app.models.plaid import Transaction
+    from backend.app.services.plaid_service import store_access_token
+    from backend.app.services.seed import SeedConfig, seed
+
+    Base.metadata.create_all(engine)
+    stats = seed(engine, SeedConfig(users=args.users, days=args.days, seed=1, end_date=date(2026, 9, 30)))
+    with SessionLocal() as db:
+        from backend.app.models.user import User
+        users = list(db.scalars(select(User.id).where(User.email.like("load_user+%")).order_by(User.id)))
+        receipt_tx_ids = list(db.scalars(
+            select(Transaction.id).where(Transaction.user_id == users[0]).order_by(Transaction.id).limit(args.requests)
+        ))
+        plaid_items = []
+        for uid in users[: max(1, min(len(users), args.concurrency))]:
+            item = store_access_token(db, user_id=uid, item_id=f"bench-item-{uid}", access_token=f"token-{uid}")
+            plaid_items.append((uid, item.item_id))
+    return {
+        "users": users,
+        "receipt_tx_ids": receipt_tx_ids,
+        "plaid_items": plaid_items,
+        "seeded_rows": stats.transactions + stats.receipt_items,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="GreenBucks benchmark suite")
+    parser.add_argument("--suite", choices=["micro", "macro", "all"], default="all")
+    parser.add_argument("--quick", action="store_true", help="Small sizes for a fast sanity run")
+    parser.add_argument("--iterations", type=int, default=2000, help="Micro-benchmark iterations")
+    parser.add_argument("--requests", type=int, default=400, help="Requests per macro scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20, help="Seeded users for macro scenarios")
+    parser.add_argument("--days", type=int, default=180, help="Seeded days per user")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to each stubbed external call")
+    parser.add_argument("--fakes", action="store_true",
+                        help="Serve external APIs from fake_services over HTTP instead of in-process stubs")
+    parser.add_argument("--plaid-history", type=int, default=2000, help="Transactions per stubbed Plaid item")
+    parser.add_argument("--cerebras", action="store_true", help="Parse receipts with the (stubbed) Cerebras path")
+    parser.add_argument("--database-url", help="Benchmark against this database instead of a temp SQLite file")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--output", help="Results path (default: benchmarks/results/<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+    if args.quick:
+        args.iterations, args.requests, args.users, args.days, args.plaid_history = 200, 60, 5, 60, 500
+
+    sys.path.insert(0, str(ROOT))
+    workdir = tempfile.mkdtemp(prefix="greenbucks-bench-")
+    fakes = None
+    if args.fakes and args.suite in ("macro", "all"):
+        from fake_services import Behavior, Latency, create_app
+        from fake_services import plaid as fake_plaid
+
+        from .macro import LiveServer
+        fake_plaid.settings["history"] = args.plaid_history
+        behavior = Behavior(latency=Latency("fixed", args.latency_ms))
+        fakes = LiveServer(create_app({name: behavior for name in ("plaid", "climatiq", "vision", "cerebras")}))
+    _configure_env(args, workdir, fakes.base_url if fakes else None)
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "dirty": bool(_git("status", "--porcelain", "--", ".")),
+            "label": args.label,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "micro": {},
+        "macro": {},
+    }
+
+    if args.suite in ("micro", "all"):
+        from . import micro
+        print("Running micro-benchmarks...")
+        report["micro"] = micro.run(args.iterations)
+
+    if args.suite in ("macro", "all"):
+        from . import macro, stubs
+        from backend.app.main import app
+
+        if fakes:
+            fakes.__enter__()
+        else:
+            stubs.install(latency_ms=args.latency_ms, plaid_history=args.plaid_history, cerebras=args.cerebras)
+        print(f"Seeding {args.users} users x {args.days} days...")
+        t0 = time.perf_counter()
+        ctx = _prepare_db(args)
+        report["meta"]["seed_seconds"] = round(time.perf_counter() - t0, 2)
+        report["meta"]["seeded_rows"] = ctx["seeded_rows"]
+        with macro.LiveServer(app) as server:
+            import requests
+            login = requests.post(f"{server.base_url}/auth/login",
+                                  json={"email": "load_user+1@example.com", "password": "password123"})
+            login.raise_for_status()
+            ctx.update(base_url=server.base_url, token=login.json()["access_token"])
+            print(f"Running macro scenarios ({args.requests} requests, concurrency {args.concurrency})...")
+            report["macro"] = macro.run(ctx, args.requests, args.concurrency)
+        if fakes:
+            import requests
+            report["meta"]["fake_services"] = requests.get(f"{fakes.base_url}/_admin/stats").json()
+            fakes.__exit__(None, None, None)
+
+    for suite in ("micro", "macro"):
+        for name, r in report[suite].items():
+            print(f"  {suite:<5} {name:<30} p50 {r['p50_ms']:>9.3f}ms  p95 {r['p95_ms']:>9.3f}ms  "
+                  f"p99 {r['p99_ms']:>9.3f}ms  {r['throughput_per_s']:>11,.1f}/s"
+                  + (f"  errors {r['errors']}" if r.get("errors") else ""))
+
+    out = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Timing helpers shared by the micro and macro suites."""
+from __future__ import annotations
+
+import statistics
+import time
+from typing import Callable
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    k = (len(sorted_samples) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_samples) - 1)
+    return sorted_samples[lo] + (sorted_samples[hi] - sorted_samples[lo]) * (k - lo)
+
+
+def summarize(samples_s: list[float], wall_s: float, ops_per_sample: int = 1, errors: int = 0) -> dict:
+    """Latency percentiles in milliseconds plus throughput (ops/s over wall time)."""
+    ordered = sorted(samples_s)
+    ms = lambda v: round(v * 1000.0, 4)  # noqa: E731
+    return {
+        "samples": len(ordered),
+        "errors": errors,
+        "mean_ms": ms(statistics.fmean(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) * ops_per_sample / wall_s, 2) if wall_s > 0 else 0.0,
+    }
+
+
+def time_calls(fn: Callable[[], object], iterations: int, warmup: int = 0) -> dict:
+    """Call `fn` repeatedly and summarize per-call latency."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - started)
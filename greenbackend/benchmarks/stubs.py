@@ -0,0 +1,129 @@
+"""In-process stand-ins for Plaid, Google Vision and Cerebras.
+
+They replace the network call sites only, so everything around them (OCR text
+parsing, upserts, scoring) runs for real. `latency_ms` adds a fixed delay per
+call to mimic the remote service.
+"""
+from __future__ import annotations
+
+import random
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+RECEIPT_TEXT = """WALMART SUPERCENTER
+STORE 1234  PHONE 555-0100
+BANANAS            1.29
+2 x GREEK YOGURT   5.98
+GROUND BEEF 1LB    9.99
+SPINACH            2.99
+MILK 1 GAL         3.49
+PAPER TOWELS      11.99
+EGGS DOZEN         4.29
+COFFEE BEANS      10.99
+SUBTOTAL          51.01
+TAX                2.04
+TOTAL             53.05
+VISA **** 1234
+"""
+
+# Uploading bytes that look like a PDF skips local Tesseract OCR, so the
+# benchmark measures the Vision -> parser -> scoring path only
+RECEIPT_BYTES = b"%PDF-1.4 benchmark receipt"
+
+_PLAID_MERCHANTS = [
+    ("Uber", ["Travel", "Ride Share"]),
+    ("Starbucks", ["Food and Drink", "Coffee Shop"]),
+    ("Shell", ["Auto", "Gas"]),
+    ("Whole Foods Market", ["Shops", "Groceries"]),
+    ("Walmart", ["Shops", "Retail", "Superstore"]),
+    ("SEPTA", ["Travel", "Public Transit"]),
+    ("PG&E", ["Bills", "Utilities", "Electric"]),
+]
+
+
+class _Txn(dict):
+    def to_dict(self) -> dict:
+        return dict(self)
+
+
+class FakePlaidClient:
+    """Serves `history` transactions per access token through transactions_sync.
+
+    Every call after the first for a token modifies `churn` of the rows, so
+    repeated syncs exercise both the unchanged-skip and the update paths.
+    """
+
+    def __init__(self, history: int = 2000, page_size: int = 500, churn: float = 0.05, latency_ms: float = 0.0):
+        self.history = history
+        self.page_size = page_size
+        self.churn = churn
+        self.latency_ms = latency_ms
+        self._rounds: dict[str, int] = {}
+
+    def _rows(self, token: str, round_no: int) -> list[_Txn]:
+        rng = random.Random(token)
+        start = date(2026, 1, 1)
+        rows = []
+        for i in range(self.history):
+            merchant, cats = rng.choice(_PLAID_MERCHANTS)
+            amount = round(rng.uniform(2, 120), 2)
+            if round_no and (i * 7919 + round_no) % 100 < self.churn * 100:
+                amount = round(amount + round_no * 0.5, 2)
+            rows.append(_Txn(
+                transaction_id=f"bench-{token}-{i}",
+                account_id=f"acct-{token}",
+                date=(start + timedelta(days=i % 270)).isoformat(),
+                name=merchant,
+                merchant_name=merchant,
+                amount=amount,
+                iso_currency_code="USD",
+                category=cats,
+                location={"country": "USA"},
+            ))
+        return rows
+
+    def transactions_sync(self, req):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        token = req.access_token
+        cursor = int(getattr(req, "cursor", None) or 0)
+        if cursor == 0:
+            self._rounds[token] = self._rounds.get(token, -1) + 1
+        rows = self._rows(token, self._rounds[token])
+        page = rows[cursor:cursor + self.page_size]
+        nxt = cursor + len(page)
+        return SimpleNamespace(added=page, modified=[], removed=[], next_cursor=str(nxt), has_more=nxt < len(rows))
+
+
+def install(latency_ms: float = 0.0, plaid_history: int = 2000, cerebras: bool = False) -> FakePlaidClient:
+    """Patch the external call sites. Call after the app modules are imported."""
+    from backend.app.api.routes import receipts as receipts_routes
+    from backend.app.services import plaid_service
+    from backend.app.services.integrations import ocr_google_vision
+
+    def _delay():
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+    def fake_vision(image_bytes: bytes):
+        _delay()
+        return RECEIPT_TEXT, {"status_code": 200, "stub": True}
+
+    def fake_cerebras(text: str):
+        _delay()
+        return [
+            {"name": "Bananas", "price": 1.29, "qty": 1},
+            {"name": "Greek Yogurt", "price": 5.98, "qty": 2},
+            {"name": "Ground Beef", "price": 9.99, "qty": 1},
+            {"name": "Spinach", "price": 2.99, "qty": 1},
+        ]
+
+    ocr_google_vision._extract_text_vision = fake_vision
+    if cerebras:
+        ocr_google_vision.parse_items_with_cerebras = fake_cerebras
+        receipts_routes.parse_items_with_cerebras = fake_cerebras
+
+    client = FakePlaidClient(history=plaid_history, latency_ms=latency_ms)
+    plaid_service._plaid_client = lambda: client
+    return client
@@ -1,109 +1,79 @@
 #!/usr/bin/env python3
 """
-Utility script to delete transactions that have no category.
-This will clean up the database by removing transactions without proper categorization.
+Delete transactions that have no category (NULL, JSON null or an empty list).
+
+Deletes in batches of set-based DELETE statements, each committed on its own;
+receipt items and stage timings go with their transaction through ON DELETE
+CASCADE. Counts and examples come from SQL, so nothing is loaded in bulk.
+
+Usage:
+    python delete_no_category_transactions.py --dry-run
+    python delete_no_category_transactions.py --yes --batch-size 10000
 """
 
+import argparse
 import sys
 import os
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
-from backend.app.db.session import SessionLocal
 from backend.app.models.plaid import Transaction
-from backend.app.models.receipt import ReceiptItem
+from backend.app.services.maintenance import (
+    batched_delete,
+    count_rows,
+    top_categories,
+    uncategorized_preview,
+    uncategorized_transactions,
+)
 
-def delete_no_category_transactions():
-    """Delete transactions that have no category"""
-    
-    db = SessionLocal()
-    try:
-        # Find transactions with no category (null or empty)
-        no_category_transactions = db.query(Transaction).filter(
-            (Transaction.category.is_(None)) | 
-            (Transaction.category == []) |
-            (Transaction.category == "[]")
-        ).all()
-        
-        print(f"Found {len(no_category_transactions)} transactions with no category...")
-        
-        if len(no_category_transactions) == 0:
-            print("No transactions to delete.")
-            return
-        
-        # Show some examples before deletion
-        print("\nExamples of transactions to be deleted:")
-        for i, tx in enumerate(no_category_transactions[:5]):
-            print(f"  {i+1}. {tx.merchant_name or tx.name} - ${abs(float(tx.amount)):.2f} - {tx.date}")
-        
-        if len(no_category_transactions) > 5:
-            print(f"  ... and {len(no_category_transactions) - 5} more")
-        
-        # Ask for confirmation
-        response = input(f"\nDo you want to delete these {len(no_category_transactions)} transactions? (y/N): ")
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete transactions with no category")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Transactions deleted per commit")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    tx_count, item_count, examples = uncategorized_preview()
+    print(f"Found {tx_count} transactions with no category ({item_count} receipt items)")
+    if tx_count == 0:
+        print("No transactions to delete.")
+        return
+
+    print("\nExamples of transactions to be deleted:")
+    for i, tx in enumerate(examples):
+        print(f"  {i+1}. {tx.merchant_name or tx.name} - ${abs(float(tx.amount)):.2f} - {tx.date}")
+    if tx_count > len(examples):
+        print(f"  ... and {tx_count - len(examples)} more")
+
+    if args.dry_run:
+        print("\nDry run: nothing deleted.")
+        return
+    if not args.yes:
+        response = input(f"\nDo you want to delete these {tx_count} transactions? (y/N): ")
         if response.lower() != 'y':
             print("Deletion cancelled.")
             return
-        
-        deleted_count = 0
-        receipt_items_deleted = 0
-        
-        for tx in no_category_transactions:
-            try:
-                # First delete any associated receipt items
-                receipt_items = db.query(ReceiptItem).filter(ReceiptItem.transaction_id == tx.id).all()
-                for item in receipt_items:
-                    db.delete(item)
-                    receipt_items_deleted += 1
-                
-                # Then delete the transaction
-                db.delete(tx)
-                deleted_count += 1
-                
-                if deleted_count % 100 == 0:
-                    print(f"Deleted {deleted_count} transactions so far...")
-                
-            except Exception as e:
-                print(f"Error deleting transaction {tx.id}: {e}")
-                continue
-        
-        # Commit all deletions
-        db.commit()
-        
-        print(f"\nSuccessfully deleted:")
-        print(f"  - {deleted_count} transactions")
-        print(f"  - {receipt_items_deleted} associated receipt items")
-        
-        # Show remaining transaction count
-        remaining_transactions = db.query(Transaction).count()
-        print(f"\nRemaining transactions in database: {remaining_transactions}")
-        
-        # Show category distribution of remaining transactions
-        transactions_with_categories = db.query(Transaction).filter(
-            Transaction.category.isnot(None),
-            Transaction.category != [],
-            Transaction.category != "[]"
-        ).all()
-        
-        print(f"Transactions with categories: {len(transactions_with_categories)}")
-        
-        # Show some category examples
-        category_counts = {}
-        for tx in transactions_with_categories[:100]:  # Sample first 100
-            if tx.category and len(tx.category) > 0:
-                main_category = tx.category[0] if isinstance(tx.category, list) else str(tx.category)
-                category_counts[main_category] = category_counts.get(main_category, 0) + 1
-        
-        if category_counts:
-            print(f"\nTop categories in remaining transactions:")
-            for category, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
-                print(f"  - {category}: {count} transactions")
-        
-    except Exception as e:
-        print(f"Error during deletion: {e}")
-        db.rollback()
-    finally:
-        db.close()
+
+    last = [time.perf_counter()]
+
+    def progress(stats):
+        if time.perf_counter() - last[0] >= args.report_every:
+            print(f"[delete] {stats.line()}")
+            last[0] = time.perf_counter()
+
+    stats = batched_delete(Transaction, uncategorized_transactions(), batch_size=args.batch_size, progress=progress)
+    print(f"\nDeleted {stats.deleted} transactions (and their receipt items) "
+          f"in {stats.batches} batches, {stats.elapsed:.1f}s")
+
+    print(f"\nRemaining transactions in database: {count_rows(Transaction)}")
+    categories = top_categories()
+    if categories:
+        print("\nTop categories in remaining transactions:")
+        for category, count in categories:
+            print(f"  - {category}: {count} transactions")
+
 
 if __name__ == "__main__":
-    print("Deleting transactions with no category...")
-    delete_no_category_transactions()
+    main()
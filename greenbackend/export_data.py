@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Export transactions or receipt items to a Parquet, Arrow IPC or gzipped CSV file.
+
+Streams rows with a server-side cursor, so memory use does not grow with table size.
+
+Usage:
+    python export_data.py transactions --format parquet --output transactions.parquet
+    python export_data.py receipt_items --format csv --user-id 3 --start-date 2025-01-01
+"""
+
+import argparse
+import sys
+import os
+import time
+from datetime import date
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from backend.app.services.export import FORMATS, TABLES, available_formats, stream_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export GreenBucks tables")
+    parser.add_argument("table", choices=list(TABLES))
+    parser.add_argument("--format", default="parquet", choices=list(FORMATS))
+    parser.add_argument("--output", help="Output path (default: <table>.<ext>)")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--start-date", type=date.fromisoformat)
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    parser.add_argument("--batch-size", type=int, help="Rows per fetch/row group")
+    args = parser.parse_args()
+
+    if args.format not in available_formats():
+        print(f"Format '{args.format}' needs pyarrow (pip install pyarrow); use --format csv instead.")
+        sys.exit(1)
+
+    output = args.output or f"{args.table}.{FORMATS[args.format][0]}"
+    stats = {}
+    started = time.perf_counter()
+    with open(output, "wb") as f:
+        for chunk in stream_export(
+            args.table,
+            args.format,
+            user_id=args.user_id,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            batch_size=args.batch_size,
+            stats=stats,
+        ):
+            f.write(chunk)
+    elapsed = time.perf_counter() - started
+
+    rate = stats["rows"] / elapsed if elapsed > 0 else 0
+    print(f"Exported {stats['rows']} rows ({stats['bytes'] / 1e6:.1f} MB) to {output} "
+          f"in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
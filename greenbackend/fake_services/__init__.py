@@ -0,0 +1,10 @@
+"""Local stand-ins for Plaid, Climatiq, Google Vision and Cerebras.
+
+They speak the same HTTP shapes as the real APIs, so the backend's client code
+(sessions, retries, parsing) runs unchanged against them with injected latency,
+errors and rate limits. Run with `python -m fake_services`.
+"""
+from .app import SERVICES, create_app
+from .behavior import Behavior, Latency
+
+__all__ = ["SERVICES", "Behavior", "Latency", "create_app"]
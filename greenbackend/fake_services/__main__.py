@@ -0,0 +1,86 @@
+"""Run the fake provider APIs.
+
+Examples:
+  python -m fake_services --port 9100
+  python -m fake_services --latency plaid=lognormal:250:0.5 --latency vision=uniform:300:900 \
+      --error-rate vision=0.02 --rate-limit cerebras=5:2
+  python -m fake_services --config fakes.json
+
+The config file holds {"services": {"<name>": {"latency": "...", "error_rate": ..., ...}},
+"plaid": {"history": ..., "churn": ...}}; flags override it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+import uvicorn
+
+from . import plaid
+from .app import SERVICES, create_app
+from .behavior import Behavior, Latency
+
+
+def _pairs(values: list[str], flag: str) -> dict[str, str]:
+    out = {}
+    for v in values or []:
+        name, _, spec = v.partition("=")
+        targets = list(SERVICES) if name == "all" else [name]
+        for t in targets:
+            if t not in SERVICES or not spec:
+                raise SystemExit(f"{flag}: expected <service|all>=<value>, got '{v}'")
+            out[t] = spec
+    return out
+
+
+def env_lines(host: str, port: int) -> list[str]:
+    base = f"http://{host}:{port}"
+    return [
+        f"PLAID_BASE_URL={base}/plaid",
+        f"CLIMATIQ_BASE_URL={base}/climatiq",
+        f"GOOGLE_VISION_BASE_URL={base}/vision",
+        f"CEREBRAS_BASE_URL={base}/cerebras",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake Plaid, Climatiq, Vision and Cerebras APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--config", help="JSON file with per-service behaviour")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=SPEC",
+                        help="fixed:MS, uniform:LO:HI or lognormal:MEDIAN:SIGMA (repeatable; 'all' for every service)")
+    parser.add_argument("--error-rate", action="append", metavar="SERVICE=FRACTION")
+    parser.add_argument("--rate-limit", action="append", metavar="SERVICE=RPS[:BURST]")
+    parser.add_argument("--plaid-history", type=int, help="Transactions per access token")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error sampling")
+    args = parser.parse_args()
+
+    config: dict = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    behaviors = {name: Behavior.from_dict(b) for name, b in (config.get("services") or {}).items()}
+    plaid.settings.update(config.get("plaid") or {})
+    if args.plaid_history is not None:
+        plaid.settings["history"] = args.plaid_history
+
+    for name, spec in _pairs(args.latency, "--latency").items():
+        behaviors.setdefault(name, Behavior()).latency = Latency.parse(spec)
+    for name, spec in _pairs(args.error_rate, "--error-rate").items():
+        behaviors.setdefault(name, Behavior()).error_rate = float(spec)
+    for name, spec in _pairs(args.rate_limit, "--rate-limit").items():
+        rps, _, burst = spec.partition(":")
+        b = behaviors.setdefault(name, Behavior())
+        b.rate_limit = float(rps)
+        if burst:
+            b.burst = int(burst)
+
+    print("[fake_services] point the backend here with:")
+    for line in env_lines(args.host, args.port):
+        print(f"  {line}")
+    uvicorn.run(create_app(behaviors, seed=args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
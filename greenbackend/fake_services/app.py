@@ -0,0 +1,98 @@
+"""One FastAPI app serving every fake provider under its own path prefix.
+
+Point the backend at it with the *_BASE_URL settings, e.g.
+PLAID_BASE_URL=http://127.0.0.1:9100/plaid. Each prefix has its own Behavior
+(latency, error rate, rate limit), changeable at runtime through /_admin/config.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from . import cerebras, climatiq, plaid, vision
+from .behavior import Behavior, ServiceState, ServiceStats
+
+SERVICES = {
+    "plaid": plaid.router,
+    "climatiq": climatiq.router,
+    "vision": vision.router,
+    "cerebras": cerebras.router,
+}
+
+
+def _error_body(service: str, status: int) -> dict:
+    if service == "plaid":
+        return {
+            "error_type": "RATE_LIMIT_EXCEEDED" if status == 429 else "API_ERROR",
+            "error_code": "RATE_LIMIT" if status == 429 else "INTERNAL_SERVER_ERROR",
+            "error_message": "injected by fake_services",
+            "display_message": None,
+            "request_id": "fake",
+        }
+    return {"error": {"code": status, "message": "injected by fake_services"}}
+
+
+def create_app(behaviors: Optional[dict[str, Behavior]] = None, seed: int = 0) -> FastAPI:
+    behaviors = behaviors or {}
+    states = {name: ServiceState(behaviors.get(name, Behavior()), seed=seed + i) for i, name in enumerate(SERVICES)}
+    app = FastAPI(title="GreenBucks fake services")
+    app.state.services = states
+
+    @app.middleware("http")
+    async def inject_behavior(request: Request, call_next):
+        service = request.url.path.strip("/").split("/", 1)[0]
+        state = states.get(service)
+        if state is None:
+            return await call_next(request)
+        retry_after, error_status, delay_ms = state.decide()
+        if retry_after is not None:
+            return JSONResponse(
+                _error_body(service, 429),
+                status_code=429,
+                headers={"Retry-After": f"{max(retry_after, 0.001):.3f}"},
+            )
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+        if error_status is not None:
+            return JSONResponse(_error_body(service, error_status), status_code=error_status)
+        return await call_next(request)
+
+    for name, router in SERVICES.items():
+        app.include_router(router, prefix=f"/{name}")
+
+    @app.get("/_admin/config")
+    def get_config():
+        return {
+            "services": {name: s.behavior.to_dict() for name, s in states.items()},
+            "plaid": dict(plaid.settings),
+        }
+
+    @app.put("/_admin/config")
+    def put_config(payload: dict = Body(...)):
+        """Update behaviours: {"services": {"vision": {"latency": "lognormal:300:0.4"}}, "plaid": {...}}."""
+        for name, changes in (payload.get("services") or {}).items():
+            if name not in states:
+                raise HTTPException(status_code=404, detail=f"Unknown service '{name}'")
+            merged = {**states[name].behavior.to_dict(), **changes}
+            try:
+                states[name].configure(Behavior.from_dict(merged))
+            except (TypeError, ValueError) as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        plaid.settings.update({k: v for k, v in (payload.get("plaid") or {}).items() if k in plaid.settings})
+        return get_config()
+
+    @app.get("/_admin/stats")
+    def get_stats():
+        return {name: s.stats.to_dict() for name, s in states.items()}
+
+    @app.post("/_admin/reset")
+    def reset_stats():
+        for s in states.values():
+            s.stats = ServiceStats()
+        plaid.reset()
+        return get_stats()
+
+    return app
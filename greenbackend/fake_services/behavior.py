@@ -0,0 +1,123 @@
+"""Per-service latency, error and rate-limit behaviour for the fake servers."""
+from __future__ import annotations
+
+import math
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+
+@dataclass
+class Latency:
+    """Response delay in milliseconds.
+
+    kind: "fixed" (a), "uniform" (a..b) or "lognormal" (median a, sigma b).
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parse "50", "fixed:50", "uniform:20:80" or "lognormal:120:0.5"."""
+        parts = spec.strip().split(":")
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]))
+        kind, args = parts[0].lower(), [float(p) for p in parts[1:]]
+        if kind not in ("fixed", "uniform", "lognormal") or not args:
+            raise ValueError(f"Bad latency spec '{spec}'")
+        return cls(kind, args[0], args[1] if len(args) > 1 else 0.0)
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, max(self.a, self.b))
+        if self.kind == "lognormal":
+            return self.a * math.exp(rng.gauss(0.0, self.b)) if self.a > 0 else 0.0
+        return self.a
+
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> Optional[float]:
+        """Consume a token; returns None on success or seconds until one is free."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate
+
+
+@dataclass
+class Behavior:
+    latency: Latency = field(default_factory=Latency)
+    error_rate: float = 0.0  # fraction of requests answered with error_status
+    error_status: int = 503
+    rate_limit: Optional[float] = None  # requests/second; None = unlimited
+    burst: int = 10
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Behavior":
+        data = dict(data)
+        lat = data.pop("latency", None)
+        if isinstance(lat, str):
+            lat = Latency.parse(lat)
+        elif isinstance(lat, dict):
+            lat = Latency(**lat)
+        return cls(latency=lat or Latency(), **data)
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    total_delay_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ServiceState:
+    """Live behaviour, limiter and counters for one fake service."""
+
+    def __init__(self, behavior: Behavior, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.stats = ServiceStats()
+        self._lock = threading.Lock()
+        self.configure(behavior)
+
+    def configure(self, behavior: Behavior) -> None:
+        self.behavior = behavior
+        self.bucket = TokenBucket(behavior.rate_limit, behavior.burst) if behavior.rate_limit else None
+
+    def decide(self) -> tuple[Optional[float], Optional[int], float]:
+        """Return (retry_after_s, error_status, delay_ms) for the next request."""
+        with self._lock:
+            self.stats.requests += 1
+            if self.bucket is not None:
+                wait = self.bucket.take()
+                if wait is not None:
+                    self.stats.throttled += 1
+                    return wait, None, 0.0
+            delay = self.behavior.latency.sample_ms(self.rng)
+            self.stats.total_delay_ms += delay
+            if self.behavior.error_rate and self.rng.random() < self.behavior.error_rate:
+                self.stats.errors += 1
+                return None, self.behavior.error_status, delay
+            return None, None, delay
@@ -0,0 +1,56 @@
+"""Fake Cerebras chat completions that parse the receipt text in the prompt.
+
+Lines ending in a price become items ("2 x NAME 5.98" sets qty); totals, tax and
+payment lines are skipped. The reply has the OpenAI-compatible shape with a JSON
+`{"items": [...]}` message, like the real model is asked to produce.
+"""
+from __future__ import annotations
+
+import json
+import re
+import time
+import uuid
+
+from fastapi import APIRouter, Request
+
+router = APIRouter()
+
+_MARKER = "Receipt Text:\n"
+_LINE = re.compile(r"^(?:(\d+)\s*[xX@]\s+)?(.+?)\s+\$?(\d+\.\d{2})\s*$")
+_SKIP = re.compile(r"\b(SUB\s*TOTAL|TOTAL|TAX|CHANGE|CASH|VISA|MASTERCARD|AMEX|DEBIT|BALANCE)\b", re.I)
+
+
+def parse_receipt(text: str) -> list[dict]:
+    items = []
+    for line in text.splitlines():
+        m = _LINE.match(line.strip())
+        if not m or _SKIP.search(m.group(2)):
+            continue
+        item = {"name": m.group(2).strip().title(), "price": float(m.group(3))}
+        if m.group(1):
+            item["qty"] = int(m.group(1))
+        items.append(item)
+    return items
+
+
+@router.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = ""
+    for msg in body.get("messages") or []:
+        if msg.get("role") == "user":
+            prompt = msg.get("content") or ""
+    text = prompt.split(_MARKER, 1)[1] if _MARKER in prompt else prompt
+    content = json.dumps({"items": parse_receipt(text)})
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model") or "llama3.1-8b",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+    }
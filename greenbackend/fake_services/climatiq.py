@@ -0,0 +1,77 @@
+"""Fake Climatiq: /emission-factors search and spend-based /estimate.
+
+Search returns money-based factors whose intensity (kgCO2e per USD) is picked
+from keywords in the query. The intensity is encoded in the factor id, so
+/estimate needs no server-side state.
+"""
+from __future__ import annotations
+
+import re
+
+from fastapi import APIRouter, HTTPException, Request
+
+router = APIRouter()
+
+# keyword -> kgCO2e per USD spent
+INTENSITIES = [
+    ("gasoline", 1.20),
+    ("petroleum", 1.20),
+    ("electric", 0.90),
+    ("taxi", 0.35),
+    ("ride hailing", 0.35),
+    ("rail", 0.15),
+    ("transit", 0.15),
+    ("grocery", 0.45),
+    ("food", 0.40),
+    ("coffee", 0.30),
+    ("beef", 2.50),
+    ("dairy", 1.10),
+    ("produce", 0.25),
+    ("paper", 0.60),
+]
+DEFAULT_INTENSITY = 0.25
+
+
+def _intensity(query: str) -> float:
+    q = query.lower()
+    for key, value in INTENSITIES:
+        if key in q:
+            return value
+    return DEFAULT_INTENSITY
+
+
+@router.get("/emission-factors")
+async def search_emission_factors(query: str = "", results_per_page: int = 10):
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:40] or "spend"
+    kg = _intensity(query)
+    factor = {
+        "id": f"fake-{kg:.3f}-{slug}",
+        "activity_id": f"fake-{slug}",
+        "name": query or "Spend",
+        "category": "Fake",
+        "source": "fake_services",
+        "year": 2024,
+        "region": "US",
+        "unit": "kg/USD",
+        "unit_type": "Money",
+        "factor": kg,
+    }
+    return {"results": [factor][:max(results_per_page, 0)], "current_page": 1, "last_page": 1, "total_results": 1}
+
+
+@router.post("/estimate")
+async def estimate(request: Request):
+    body = await request.json()
+    factor_id = str((body.get("emission_factor") or {}).get("id") or "")
+    money = ((body.get("parameters") or {}).get("money") or {})
+    try:
+        kg = float(factor_id.split("-")[1])
+        amount = float(money["amount"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Unknown emission factor or missing parameters.money")
+    return {
+        "co2e": round(kg * amount, 4),
+        "co2e_unit": "kg",
+        "co2e_calculation_method": "ar5",
+        "emission_factor": {"id": factor_id, "source": "fake_services"},
+    }
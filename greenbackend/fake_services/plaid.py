@@ -0,0 +1,152 @@
+"""Fake Plaid API: token exchange, Link and /transactions/sync.
+
+Each access token owns a deterministic history of `history` transactions. A sync
+without a cursor starts a new round; from the second round on, `churn` of the
+rows come back under `modified` with a changed amount, so repeated syncs
+exercise both the unchanged-skip and the update paths.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Request
+
+router = APIRouter()
+
+MERCHANTS = [
+    ("Uber", ["Travel", "Ride Share"], "online"),
+    ("Starbucks", ["Food and Drink", "Coffee Shop"], "in store"),
+    ("Shell", ["Auto", "Gas"], "in store"),
+    ("Whole Foods Market", ["Shops", "Groceries"], "in store"),
+    ("Walmart", ["Shops", "Retail", "Superstore"], "in store"),
+    ("SEPTA", ["Travel", "Public Transit"], "in store"),
+    ("PG&E", ["Bills", "Utilities", "Electric"], "online"),
+    ("Amazon", ["Shops", "Online Marketplace"], "online"),
+]
+
+# Mutable via the admin endpoint
+settings = {"history": 2000, "churn": 0.05, "start_date": "2026-01-01"}
+
+_rounds: dict[str, int] = {}
+
+
+def reset() -> None:
+    """Forget sync rounds so every token starts over with `added` rows."""
+    _rounds.clear()
+
+
+def _request_id() -> str:
+    return uuid.uuid4().hex[:15]
+
+
+def _location(country: str = "US") -> dict:
+    return {
+        "address": None, "city": None, "region": None, "postal_code": None,
+        "country": country, "lat": None, "lon": None, "store_number": None,
+    }
+
+
+def _payment_meta() -> dict:
+    return {
+        "reference_number": None, "ppd_id": None, "payee": None, "by_order_of": None,
+        "payer": None, "payment_method": None, "payment_processor": None, "reason": None,
+    }
+
+
+def _transaction(token: str, i: int, rng: random.Random, round_no: int, start: date) -> tuple[dict, bool]:
+    merchant, cats, channel = rng.choice(MERCHANTS)
+    amount = round(rng.uniform(2, 120), 2)
+    changed = round_no > 0 and (i * 7919 + round_no) % 100 < settings["churn"] * 100
+    if changed:
+        amount = round(amount + round_no * 0.5, 2)
+    day = (start + timedelta(days=i % 365)).isoformat()
+    return {
+        "account_id": f"acct-{token[:12]}",
+        "amount": amount,
+        "iso_currency_code": "USD",
+        "unofficial_currency_code": None,
+        "category": cats,
+        "category_id": None,
+        "check_number": None,
+        "date": day,
+        "datetime": None,
+        "authorized_date": day,
+        "authorized_datetime": None,
+        "location": _location(),
+        "name": merchant.upper(),
+        "merchant_name": merchant,
+        "payment_meta": _payment_meta(),
+        "payment_channel": channel,
+        "pending": False,
+        "pending_transaction_id": None,
+        "account_owner": None,
+        "transaction_id": f"fake-{hashlib.sha1(token.encode()).hexdigest()[:10]}-{i}",
+        "transaction_code": None,
+        "transaction_type": "place",
+        "logo_url": None,
+        "website": None,
+        "personal_finance_category": None,
+    }, changed
+
+
+@router.post("/item/public_token/exchange")
+async def item_public_token_exchange(request: Request):
+    body = await request.json()
+    digest = hashlib.sha1(str(body.get("public_token", "")).encode()).hexdigest()[:16]
+    return {"access_token": f"access-fake-{digest}", "item_id": f"item-fake-{digest}", "request_id": _request_id()}
+
+
+@router.post("/link/token/create")
+async def link_token_create(request: Request):
+    expiration = datetime.now(timezone.utc) + timedelta(hours=4)
+    return {
+        "link_token": f"link-fake-{uuid.uuid4()}",
+        "expiration": expiration.isoformat().replace("+00:00", "Z"),
+        "request_id": _request_id(),
+    }
+
+
+@router.post("/sandbox/public_token/create")
+async def sandbox_public_token_create(request: Request):
+    return {"public_token": f"public-fake-{uuid.uuid4()}", "request_id": _request_id()}
+
+
+@router.post("/transactions/sync")
+async def transactions_sync(request: Request):
+    body = await request.json()
+    token = str(body.get("access_token", ""))
+    count = max(1, min(int(body.get("count") or 100), 500))
+    cursor = body.get("cursor") or ""
+    if cursor:
+        round_no, offset = (int(p) for p in cursor.split(":"))
+    else:
+        round_no = _rounds[token] = _rounds.get(token, -1) + 1
+        offset = 0
+
+    history = int(settings["history"])
+    rng = random.Random(token)
+    start = date.fromisoformat(settings["start_date"])
+    added, modified = [], []
+    # Rows are generated in order from the token seed; skip the earlier pages
+    for i in range(min(offset + count, history)):
+        txn, changed = _transaction(token, i, rng, round_no, start)
+        if i < offset:
+            continue
+        if round_no == 0:
+            added.append(txn)
+        elif changed:
+            modified.append(txn)
+    nxt = min(offset + count, history)
+    return {
+        "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+        "accounts": [],
+        "added": added,
+        "modified": modified,
+        "removed": [],
+        "next_cursor": f"{round_no}:{nxt}",
+        "has_more": nxt < history,
+        "request_id": _request_id(),
+    }
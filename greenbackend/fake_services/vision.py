@@ -0,0 +1,67 @@
+"""Fake Google Vision: images:annotate and files:annotate.
+
+Content that decodes to UTF-8 text (other than a PDF header) is echoed back as the
+recognised text, so callers control what the parser sees; anything else returns
+RECEIPT_TEXT.
+"""
+from __future__ import annotations
+
+import base64
+
+from fastapi import APIRouter, Request
+
+router = APIRouter()
+
+RECEIPT_TEXT = """WALMART SUPERCENTER
+STORE 1234  PHONE 555-0100
+BANANAS            1.29
+2 x GREEK YOGURT   5.98
+GROUND BEEF 1LB    9.99
+SPINACH            2.99
+MILK 1 GAL         3.49
+PAPER TOWELS      11.99
+EGGS DOZEN         4.29
+COFFEE BEANS      10.99
+SUBTOTAL          51.01
+TAX                2.04
+TOTAL             53.05
+VISA **** 1234
+"""
+
+
+def _text_for(content_b64: str) -> str:
+    try:
+        raw = base64.b64decode(content_b64 or "")
+        text = raw.decode("utf-8")
+    except Exception:
+        return RECEIPT_TEXT
+    if not text.strip() or text.startswith("%PDF"):
+        return RECEIPT_TEXT
+    return text
+
+
+def _annotation(text: str) -> dict:
+    return {
+        "fullTextAnnotation": {"text": text},
+        "textAnnotations": [{"description": text}],
+    }
+
+
+@router.post("/v1/images:annotate")
+async def images_annotate(request: Request):
+    body = await request.json()
+    responses = [
+        _annotation(_text_for((r.get("image") or {}).get("content", "")))
+        for r in body.get("requests") or []
+    ]
+    return {"responses": responses}
+
+
+@router.post("/v1/files:annotate")
+async def files_annotate(request: Request):
+    body = await request.json()
+    responses = []
+    for r in body.get("requests") or []:
+        text = _text_for((r.get("inputConfig") or {}).get("content", ""))
+        responses.append({"responses": [_annotation(text)], "totalPages": 1})
+    return {"responses": responses}
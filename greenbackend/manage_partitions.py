@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Maintain the monthly partitions of the transactions table (PostgreSQL only).
+
+Usage:
+    python manage_partitions.py list
+    python manage_partitions.py ensure [--months-ahead 3]
+    python manage_partitions.py detach --before 2024-01 [--drop]
+    python manage_partitions.py orphans
+"""
+
+import argparse
+import sys
+import os
+from datetime import date
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from backend.app.core.config import get_settings
+from backend.app.db import partitions
+from backend.app.db.session import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage monthly transaction partitions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show attached partitions")
+    ensure = sub.add_parser("ensure", help="Create partitions for upcoming months")
+    ensure.add_argument("--months-ahead", type=int, default=get_settings().transactions_partition_months_ahead)
+    detach = sub.add_parser("detach", help="Detach (archive) partitions older than a month")
+    detach.add_argument("--before", required=True, help="YYYY-MM; months before this are detached")
+    detach.add_argument("--drop", action="store_true", help="Drop the detached tables instead of keeping them")
+    sub.add_parser("orphans", help="Count receipt items and stage timings whose transaction is gone")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("Partitioning only applies to PostgreSQL; nothing to do.")
+        return
+
+    with engine.begin() as conn:
+        if not partitions.is_partitioned(conn):
+            print("transactions is not partitioned yet; run `alembic upgrade head` first.")
+            return
+
+        if args.command == "list":
+            for p in partitions.list_partitions(conn):
+                print(f"{p['name']:<28} ~{p['estimated_rows']:>10} rows  {p['bounds']}")
+        elif args.command == "ensure":
+            created = partitions.ensure_partitions(conn, args.months_ahead)
+            print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+        elif args.command == "detach":
+            year, month = (int(x) for x in args.before.split("-"))
+            names = partitions.detach_partitions_before(conn, date(year, month, 1), drop=args.drop)
+            action = "Dropped" if args.drop else "Detached"
+            print(f"{action} {len(names)} partition(s): {', '.join(names) or '-'}")
+        elif args.command == "orphans":
+            for table, count in partitions.orphaned_child_rows(conn).items():
+                print(f"{table:<24} {count} orphaned row(s)")
+
+
+if __name__ == "__main__":
+    main()
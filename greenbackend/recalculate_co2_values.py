@@ -1,81 +1,74 @@
 #!/usr/bin/env python3
 """
-Utility script to recalculate CO2 values for existing receipt items
-to ensure they're within the 0-30 range with the new capping logic.
+Recalculate CO2 values and item scores for existing receipt items, e.g. after
+changes to the capping logic or the category map.
+
+Streams items in chunks, estimates each distinct (name, price, qty) once with a
+concurrency limit, and commits one bulk UPDATE per chunk, so memory stays flat
+on tables with millions of rows.
+
+Usage:
+    python recalculate_co2_values.py
+    python recalculate_co2_values.py --chunk-size 10000 --concurrency 16
+    python recalculate_co2_values.py --dry-run
 """
 
+import argparse
+import asyncio
 import sys
 import os
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
-from backend.app.db.session import SessionLocal
-from backend.app.models.receipt import ReceiptItem
-from backend.app.services.integrations.climatiq_client import estimate_item_footprint
-from backend.app.services.eco_scoring import score_from_co2e_per_dollar
-from decimal import Decimal
-import asyncio
+from backend.app.services.maintenance import receipt_item_co2_stats, recalculate_item_co2
+
+
+def print_stats(title: str, s: dict):
+    print(f"\n{title}:")
+    if not s["with_co2"]:
+        print(f"No CO2 values ({s['items']} items)")
+        return
+    print(f"Items: {s['items']} ({s['with_co2']} with CO2)")
+    print(f"Min CO2: {s['min']:.2f} kg")
+    print(f"Max CO2: {s['max']:.2f} kg")
+    print(f"Avg CO2: {s['avg']:.2f} kg")
+    print(f"Items over {s['cap']:.0f}kg: {s['over_cap']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalculate CO2 values for receipt items")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Items per fetch and per commit")
+    parser.add_argument("--concurrency", type=int, default=8, help="Footprint estimates in flight")
+    parser.add_argument("--cache-size", type=int, default=100_000, help="Distinct (name, price, qty) results kept")
+    parser.add_argument("--min-change", type=float, default=0.1, help="Only rewrite items whose CO2 moves by more than this (kg)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    print_stats("CO2 statistics before update", receipt_item_co2_stats())
+
+    last = [time.perf_counter()]
+
+    def progress(stats):
+        if time.perf_counter() - last[0] >= args.report_every:
+            print(f"[recalc] {stats.line()}")
+            last[0] = time.perf_counter()
+
+    stats = asyncio.run(recalculate_item_co2(
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        cache_size=args.cache_size,
+        min_change=args.min_change,
+        dry_run=args.dry_run,
+        progress=progress,
+    ))
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"\n{verb} {stats.updated} of {stats.scanned} receipt items in {stats.elapsed:.1f}s "
+          f"({stats.estimated} estimates, {stats.cache_hits} cache hits, {stats.errors} errors)")
+
+    if not args.dry_run:
+        print_stats("CO2 statistics after update", receipt_item_co2_stats())
 
-async def recalculate_co2_values():
-    """Recalculate CO2 values for all existing receipt items"""
-    
-    db = SessionLocal()
-    try:
-        # Get all receipt items
-        items = db.query(ReceiptItem).all()
-        
-        print(f"Found {len(items)} receipt items to recalculate...")
-        
-        updated_count = 0
-        
-        for item in items:
-            if item.name and item.price:
-                try:
-                    # Recalculate CO2 footprint with new capping logic
-                    kg_co2e, source, factor_id = await estimate_item_footprint(
-                        item.name, 
-                        float(item.price), 
-                        item.qty
-                    )
-                    
-                    # Recalculate eco score
-                    co2_per_dollar = kg_co2e / float(item.price) if float(item.price) > 0 else 0
-                    new_score = score_from_co2e_per_dollar(co2_per_dollar)
-                    
-                    # Update if values changed significantly
-                    old_co2e = float(item.kg_co2e) if item.kg_co2e else 0
-                    
-                    if abs(old_co2e - kg_co2e) > 0.1 or item.item_score != new_score:
-                        print(f"Updating {item.name}: CO2 {old_co2e:.2f} -> {kg_co2e:.2f}, Score {item.item_score} -> {new_score}")
-                        
-                        item.kg_co2e = Decimal(str(kg_co2e))
-                        item.item_score = new_score
-                        updated_count += 1
-                
-                except Exception as e:
-                    print(f"Error processing item {item.name}: {e}")
-                    continue
-        
-        # Commit changes
-        db.commit()
-        print(f"Successfully updated {updated_count} receipt items")
-        
-        # Show some statistics
-        items_after = db.query(ReceiptItem).all()
-        co2_values = [float(item.kg_co2e) for item in items_after if item.kg_co2e]
-        
-        if co2_values:
-            print(f"\nCO2 Statistics after update:")
-            print(f"Min CO2: {min(co2_values):.2f} kg")
-            print(f"Max CO2: {max(co2_values):.2f} kg")
-            print(f"Avg CO2: {sum(co2_values)/len(co2_values):.2f} kg")
-            print(f"Items over 30kg: {len([v for v in co2_values if v > 30])}")
-        
-    except Exception as e:
-        print(f"Error during recalculation: {e}")
-        db.rollback()
-    finally:
-        db.close()
 
 if __name__ == "__main__":
-    print("Recalculating CO2 values with new capping logic...")
-    asyncio.run(recalculate_co2_values())
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Re-parse stored receipts with the current parser and swap in the new items.
+
+Selects transactions whose stored receipt has no items from the current
+PARSER_VERSION, runs OCR/parsing/footprint estimation in a process pool and
+replaces each transaction's items atomically. Receipts this version already
+ran on without a result (unparsed or failed) are skipped; --retry-failed
+includes them again. Interrupted runs can simply be
+restarted; with --force use --checkpoint to resume where the last batch ended.
+
+Usage:
+    python reparse_receipts.py --workers 8
+    python reparse_receipts.py --user-id 3 --limit 100
+    python reparse_receipts.py --retry-failed
+    python reparse_receipts.py --force --checkpoint reparse.json
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from backend.app.services.integrations.ocr_google_vision import PARSER_VERSION
+from backend.app.services.receipt_pipeline import reparse_receipts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Re-parse stored receipts with parser {PARSER_VERSION}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes (0 = run inline)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Transactions selected per batch")
+    parser.add_argument("--force", action="store_true", help="Re-parse every stored receipt, even if already current")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Also retry receipts this parser version already failed on or could not parse")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--limit", type=int, help="Stop after this many receipts")
+    parser.add_argument("--checkpoint", help="JSON file recording the last finished batch, for resuming")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    stats = reparse_receipts(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        force=args.force,
+        retry_failed=args.retry_failed,
+        user_id=args.user_id,
+        limit=args.limit,
+        checkpoint=args.checkpoint,
+        report_every=args.report_every,
+    )
+    elapsed = stats.elapsed
+    workers = max(1, args.workers)
+    busy = stats.worker_seconds / (elapsed * workers) * 100 if elapsed > 0 else 0
+    print(f"Re-parsed {stats.reparsed} receipts ({stats.items} items) in {elapsed:.1f}s: "
+          f"{stats.done / elapsed if elapsed > 0 else 0:.2f} receipts/s, "
+          f"{stats.worker_seconds / stats.done if stats.done else 0:.2f}s per receipt, workers {busy:.0f}% busy")
+    print(f"Unparsed (kept existing items): {stats.unparsed}, failed: {stats.failed}, "
+          f"skipped (receipt replaced meanwhile): {stats.changed}")
+    if stats.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
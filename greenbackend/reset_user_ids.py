@@ -34,11 +34,12 @@ def main() -> None:
             db.query(User).filter(User.id.in_(ids_to_delete)).delete(synchronize_session=False)
             db.commit()
 
-        # 2) Create fresh users with fixed IDs
+        # 2) Create fresh users with fixed IDs (same default password, hashed once)
+        default_hash = hash_password("password123")
         for uid, (email, name) in TARGET_USERS.items():
             # Ensure no conflicting row
             db.query(User).filter((User.id == uid) | (User.email == email)).delete(synchronize_session=False)
-            user = User(id=uid, email=email, full_name=name, hashed_password=hash_password("password123"))
+            user = User(id=uid, email=email, full_name=name, hashed_password=default_hash)
             db.add(user)
         db.commit()
 
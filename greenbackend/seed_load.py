@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Load a large, deterministic synthetic dataset for performance testing.
+
+Rows are generated from a seeded RNG and written in batches (COPY on PostgreSQL,
+executemany on SQLite). The same arguments always produce the same data.
+
+Usage:
+    python seed_load.py --users 1000 --days 365 --seed 7
+    python seed_load.py --users 50 --days 90 --mix green=0.5,neutral=0.3,impact=0.1,mixed=0.1
+"""
+
+import argparse
+import sys
+import os
+from datetime import date
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from backend.app.db.session import engine
+from backend.app.services.seed import DEFAULT_MIX, MERCHANTS, SeedConfig, seed
+
+
+def parse_mix(raw: str) -> dict:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in MERCHANTS:
+            raise argparse.ArgumentTypeError(f"unknown merchant class '{name}' (choose from {', '.join(MERCHANTS)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a load-testing dataset")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tx-per-day", type=float, default=3.0, help="Mean transactions per user per day")
+    parser.add_argument("--receipt-ratio", type=float, default=0.5, help="Share of mixed-merchant transactions with receipt items")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="Merchant class weights, e.g. green=0.3,neutral=0.4,impact=0.2,mixed=0.1")
+    parser.add_argument("--email-prefix", default="load_user")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Last generated day (default: today)")
+    parser.add_argument("--batch-size", type=int, default=20_000, help="Transactions per write batch")
+    args = parser.parse_args()
+
+    cfg = SeedConfig(
+        users=args.users,
+        days=args.days,
+        seed=args.seed,
+        tx_per_day=args.tx_per_day,
+        receipt_ratio=args.receipt_ratio,
+        mix=args.mix,
+        email_prefix=args.email_prefix,
+        end_date=args.end_date,
+        batch_size=args.batch_size,
+    )
+
+    def progress(stats):
+        print(f"  {stats.transactions:,} transactions, {stats.receipt_items:,} receipt items "
+              f"({stats.rows_per_second:,.0f} rows/s)")
+
+    print(f"Seeding {cfg.users} users x {cfg.days} days (seed {cfg.seed}) into {engine.url.render_as_string(hide_password=True)}")
+    try:
+        stats = seed(engine, cfg, progress=progress)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Done: {stats.users_created} new users, {stats.transactions:,} transactions, "
+          f"{stats.receipt_items:,} receipt items in {stats.seconds:.1f}s ({stats.rows_per_second:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
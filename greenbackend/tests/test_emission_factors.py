@@ -0,0 +1,114 @@
+import itertools
+import random
+
+from backend.app.services.emission_factors import DEFAULT_KEY, FactorTable, affected_keys
+
+CATEGORIES = [("gas", 2.0), ("groceries", 0.6), ("restaurant", 0.9)]
+NAMES = [("whole foods", 0.4), ("uber", 1.2), ("mart", 0.7), ("walmart", 0.5)]
+
+
+def table(categories=CATEGORIES, names=NAMES, default=0.3, version=1):
+    return FactorTable.build(version, categories, names, default, 50.0)
+
+
+# --- matcher precedence ---
+
+def test_category_beats_name():
+    assert table().match("uber ride", ["gas"]) == (2.0, "category:gas")
+
+
+def test_categories_are_ranked_by_table_order_not_input_order():
+    assert table().match("x", ["restaurant", "Groceries"]) == (0.6, "category:groceries")
+
+
+def test_first_listed_name_keyword_wins_wherever_it_appears():
+    # "mart" is listed before "walmart", and "uber" before both
+    assert table().match("Walmart Supercenter", None) == (0.7, "name:mart")
+    assert table().match("walmart via uber", None) == (1.2, "name:uber")
+
+
+def test_overlapping_keywords_at_the_same_position():
+    t = table(names=[("walmart", 0.5), ("wal", 0.1)])
+    assert t.match("walmart", None) == (0.5, "name:walmart")
+
+
+def test_repeated_keyword_keeps_its_first_entry():
+    t = table(categories=[("gas", 2.0), ("gas", 9.0)], names=[("uber", 1.2), ("uber", 9.0)])
+    assert t.match("", ["gas"]) == (2.0, "category:gas")
+    assert t.match("uber", None) == (1.2, "name:uber")
+
+
+def test_default_when_nothing_matches():
+    assert table().match("acme", ["hardware"]) == (0.3, DEFAULT_KEY)
+    assert table().match("", None) == (0.3, DEFAULT_KEY)
+    assert table(names=[]).match("uber", None) == (0.3, DEFAULT_KEY)
+
+
+# --- affected_keys ---
+
+def test_identical_tables_affect_nothing():
+    assert affected_keys(table(), table(version=2)) == set()
+
+
+def test_value_change_affects_only_its_key():
+    new = table(categories=[("gas", 2.5)] + CATEGORIES[1:])
+    assert affected_keys(table(), new) == {"category:gas"}
+    new = table(names=NAMES[:2] + [("mart", 0.8)] + NAMES[3:])
+    assert affected_keys(table(), new) == {"name:mart"}
+    assert affected_keys(table(), table(default=0.35)) == {DEFAULT_KEY}
+
+
+def test_name_appended_affects_only_default():
+    new = table(names=NAMES + [("lyft", 1.1)])
+    assert affected_keys(table(), new) == {DEFAULT_KEY}
+
+
+def test_name_inserted_affects_everything_after_it():
+    new = table(names=NAMES[:1] + [("lyft", 1.1)] + NAMES[1:])
+    assert affected_keys(table(), new) == {"name:uber", "name:mart", "name:walmart", DEFAULT_KEY}
+
+
+def test_name_removed_or_reordered():
+    new = table(names=NAMES[:1] + NAMES[2:])
+    assert affected_keys(table(), new) == {"name:uber", "name:mart", "name:walmart", DEFAULT_KEY}
+    new = table(names=NAMES[:2] + [NAMES[3], NAMES[2]])
+    assert affected_keys(table(), new) == {"name:mart", "name:walmart", DEFAULT_KEY}
+
+
+def test_category_structure_change_affects_all_names_and_default():
+    new = table(categories=CATEGORIES[:2])
+    assert affected_keys(table(), new) == (
+        {"category:restaurant", DEFAULT_KEY} | {f"name:{k}" for k, _ in NAMES}
+    )
+
+
+def test_affected_keys_cover_every_changed_match():
+    # Any row whose (factor, key) changes between versions must carry an affected old key
+    rng = random.Random(7)
+    words = ["gas", "groceries", "restaurant", "rail", "whole foods", "uber", "mart", "walmart", "lyft", "acme"]
+    samples = [
+        (" ".join(rng.sample(words, rng.randint(0, 3))), rng.sample(words, rng.randint(0, 2)))
+        for _ in range(300)
+    ]
+    base_cats = CATEGORIES + [("rail", 0.2)]
+    base_names = NAMES + [("lyft", 1.1)]
+    for _ in range(200):
+        cats = [(k, rng.choice([v, v + 0.1])) for k, v in rng.sample(base_cats, rng.randint(0, len(base_cats)))]
+        names = [(k, rng.choice([v, v + 0.1])) for k, v in rng.sample(base_names, rng.randint(0, len(base_names)))]
+        old = table()
+        new = table(cats, names, rng.choice([0.3, 0.4]), version=2)
+        keys = affected_keys(old, new)
+        for name, categories in samples:
+            before, after = old.match(name, categories), new.match(name, categories)
+            if before != after:
+                assert before[1] in keys, (name, categories, before, after, cats, names)
+
+
+def test_permutations_of_names_are_covered():
+    old = table()
+    for perm in itertools.permutations(NAMES):
+        new = table(names=list(perm), version=2)
+        keys = affected_keys(old, new)
+        for name in ("whole foods market", "walmart", "uber mart", "mart"):
+            if old.match(name) != new.match(name):
+                assert old.match(name)[1] in keys
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Publish a new version of the emission-factor tables and rescore what it changes.
+
+The tables are JSON files (export the active version for the layout). A new
+version becomes active in this process at once and in running app processes
+within EMISSION_FACTORS_RELOAD_SECONDS. Then the transactions whose stored
+factor_key can score differently are rescored. Run --backfill-keys once after
+migrating: it tags rows that were quick-scored before factor_key existed, and
+leaves receipt-based and live-estimate scores untouched.
+
+Usage:
+    python update_emission_factors.py --backfill-keys
+    python update_emission_factors.py --export factors.json
+    python update_emission_factors.py --publish factors.json --note "lower rail factor"
+    python update_emission_factors.py --publish factors.json --dry-run
+    python update_emission_factors.py --rescore-from 3
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from backend.app.core.config import get_settings
+from backend.app.models.plaid import Transaction
+from backend.app.services.emission_factors import (
+    FactorTable,
+    affected_keys,
+    current_factors,
+    load_version,
+    publish_factors,
+)
+from backend.app.services.maintenance import backfill_factor_keys, count_rows, rescore_factor_change
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish emission-factor tables and rescore affected transactions")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--export", metavar="PATH", help="Write the active version as JSON")
+    group.add_argument("--publish", metavar="PATH", help="Publish the tables in this JSON file as a new version")
+    group.add_argument("--rescore-from", type=int, metavar="VERSION", help="Rescore the changes from VERSION to the active version")
+    group.add_argument("--backfill-keys", action="store_true",
+                       help="Set factor_key on quick-scored transactions that have none (scores are not changed)")
+    parser.add_argument("--note", help="Stored with the published version")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would change without publishing or writing")
+    parser.add_argument("--no-rescore", action="store_true", help="Publish only")
+    parser.add_argument("--wait", type=float, default=None,
+                        help="Seconds to wait before rescoring, so running processes pick up the new version "
+                             "(default: EMISSION_FACTORS_RELOAD_SECONDS)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="(merchant, category) pairs per UPDATE")
+    args = parser.parse_args()
+
+    if args.backfill_keys:
+        stats = backfill_factor_keys(chunk_size=args.chunk_size, dry_run=args.dry_run)
+        verb = "Would tag" if args.dry_run else "Tagged"
+        print(f"{verb} {stats.updated} transactions with a factor_key "
+              f"({stats.keys} merchant/category pairs) in {stats.elapsed:.1f}s")
+        return
+
+    active = current_factors()
+    if args.export:
+        with open(args.export, "w") as f:
+            json.dump(active.to_json(), f, indent=2)
+        print(f"Wrote version {active.version} to {args.export}")
+        return
+
+    if args.publish:
+        with open(args.publish) as f:
+            data = json.load(f)
+        proposed = FactorTable.from_json(active.version + 1, data)
+        keys = affected_keys(active, proposed)
+        print(f"Active version: {active.version}. Affected factor keys ({len(keys)}): {', '.join(sorted(keys)) or 'none'}")
+        print(f"Transactions to rescore: {count_rows(Transaction, Transaction.factor_key.in_(keys)) if keys else 0}")
+        if args.dry_run:
+            print("Dry run: nothing published.")
+            return
+        old = active
+        new = publish_factors(data, note=args.note)
+        print(f"Published version {new.version}")
+        if args.no_rescore:
+            print(f"Skipped rescoring; run with --rescore-from {old.version} later.")
+            return
+        wait = get_settings().emission_factors_reload_seconds if args.wait is None else args.wait
+        if wait > 0:
+            print(f"Waiting {wait:.0f}s for running processes to load version {new.version}...")
+            time.sleep(wait)
+    else:
+        old = load_version(args.rescore_from)
+
+    keys, stats = rescore_factor_change(old, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    verb = "Would rescore" if args.dry_run else "Rescored"
+    print(f"{verb} {stats.updated} transactions ({stats.keys} merchant/category pairs, "
+          f"{len(keys)} factor keys) in {stats.elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()